@@ -1,40 +1,103 @@
+import atexit
+import hashlib
 import os
-from flask import Flask, jsonify, request
+import secrets
+import threading
+from datetime import datetime
+from collections import Counter
+from typing import Callable, Iterable, List, Optional
+from flask import Flask, Response, g, jsonify, request, stream_with_context
+from flask.json.provider import JSONProvider
 from werkzeug.exceptions import NotFound
 
-from src.serwis.task_service import TaskService
-from src.repo.memory_repo import InMemoryUsers, InMemoryTasks, InMemoryEvents
+from src.serwis.task_service import TaskService, DEFAULT_PAGE_SIZE, task_projection
+from src.serwis.change_feed import ChangeFeed, Subscription
+from src.repo.task_stats import ALL_TASKS, stats_to_dict
+from src.integrations.emailer import TaskHistoryEmailer
+from src.integrations.email_queue import EmailQueue, EmailQueueFull, job_to_dict
+from src.integrations.smtp import SMTPClient, SMTPRelayClient
+from src.repo.memory_repo import InMemoryUsers, InMemoryTasks, InMemoryEvents, InMemoryUnitOfWork, InMemoryTaskStats
+from src.repo.cached_users import CachedUsers
+from src.repo.unit_of_work import RepositoryUnitOfWork
+from src.repo.identity_map import ScopedUsers, ScopedTasks, ScopedEvents
+from src.repo.request_scope import begin_scope, end_scope, current_scope
 from src.utils.idgen import IdGenerator
 from src.utils.clock import Clock
+from src.utils.serialization import task_to_dict, task_serializer, event_to_dict, dumps as json_dumps, loads as json_loads
 from src.domain.user import User, Role, Status
 from src.domain.task import Task
-from src.domain.event import TaskEvent, EventType
 from src.repo.memory_repo import InMemoryUsers, InMemoryTasks, InMemoryEvents
 
 from src.utils.idgen import IdGenerator
 idgen = IdGenerator()
 
-def _task_to_dict(t: Task) -> dict:
-    return {
-        "id": t.id,
-        "title": t.title,
-        "description": t.description,
-        "status": t.status.name,
-        "priority": t.priority.name,
-        "owner_id": t.owner_id,
-        "assignee_id": t.assignee_id,
-        "due_date": t.due_date.isoformat() if t.due_date else None,
-        "is_deleted": bool(getattr(t, "is_deleted", False)),
-    }
-
-def _event_to_dict(e: TaskEvent) -> dict:
-    return {
-        "id": e.id,
-        "task_id": e.task_id,
-        "timestamp": e.timestamp.isoformat(),
-        "type": e.type.name,
-        "meta": e.meta,
-    }
+class _FastJSONProvider(JSONProvider):
+    # jsonify przez src.utils.serialization (orjson, jeśli jest zainstalowany)
+    def dumps(self, obj, **kwargs) -> str:
+        return json_dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return json_loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(json_dumps(obj), mimetype="application/json")
+
+_STREAM_BATCH = 256  # obiektów na jeden kawałek odpowiedzi
+
+def _stream_json_array(items: Iterable, dump: Callable[[object], dict]) -> Response:
+    # tablica JSON wysyłana kawałkami (chunked) w trakcie iteracji po repozytorium —
+    # w pamięci jest tylko bieżąca paczka, niezależnie od liczby wyników
+    def generate():
+        yield b"["
+        sep, batch = b"", []
+        for item in items:
+            batch.append(dump(item))
+            if len(batch) >= _STREAM_BATCH:
+                # jedna serializacja na paczkę; [1:-1] zdejmuje nawiasy tablicy
+                yield sep + json_dumps(batch)[1:-1]
+                sep, batch = b",", []
+        if batch:
+            yield sep + json_dumps(batch)[1:-1]
+        yield b"]"
+
+    return Response(stream_with_context(generate()), status=200, mimetype="application/json")
+
+def _etag(kind: str, version: int, actor_id: str, epoch: str = "") -> str:
+    # wersja magazynu + wszystko, od czego zależy treść odpowiedzi (aktor, parametry);
+    # `epoch` — identyfikator uruchomienia dla magazynów, które nie utrwalają wersji
+    key = "\x1f".join([epoch, actor_id, request.path, *sorted(f"{k}={v}" for k, v in request.args.items(multi=True))])
+    return f"{kind}{version}-{hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()}"
+
+def _not_modified(etag: str) -> Optional[Response]:
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={"ETag": f'"{etag}"', **_REVALIDATE})
+    return None
+
+# przeglądarka trzyma odpowiedź, ale zawsze pyta serwer (If-None-Match) — fetch() w web/
+# dostaje wtedy 304 obsłużone przez cache HTTP bez zmian w kliencie
+_REVALIDATE = {"Cache-Control": "private, no-cache", "Vary": "X-Actor-Id"}
+
+def _with_etag(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    response.headers.update(_REVALIDATE)
+    return response
+
+def _sse_events(sub: Subscription, keepalive: float):
+    # text/event-stream: jedna zmiana = jedno zdarzenie "task"; komentarz co `keepalive` s
+    # podtrzymuje połączenie i pozwala wykryć rozłączonego klienta
+    with sub:
+        yield b"retry: 3000\n\n"
+        while True:
+            if sub.overflowed:
+                # klient nie nadążał i zgubił zmiany — niech pobierze stan od nowa
+                yield b"event: resync\ndata: {}\n\n"
+                return
+            change = sub.get(timeout=keepalive)
+            if change is None:
+                yield b": keepalive\n\n"
+                continue
+            yield b"id: %d\nevent: task\ndata: %s\n\n" % (change.id, change.payload)
 
 def _actor_id() -> str:
     aid = request.headers.get("X-Actor-Id")
@@ -42,23 +105,173 @@ def _actor_id() -> str:
         raise ValueError("Missing X-Actor-Id header")
     return aid
 
+def _int_arg(name: str, default: Optional[int]) -> Optional[int]:
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+def _time_arg(name: str) -> Optional[datetime]:
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return None
+    try:
+        ts = datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 timestamp")
+    # zdarzenia mają lokalny czas bez strefy (Clock.now()) — strefa podana w zapytaniu jest przeliczana
+    return ts.astimezone().replace(tzinfo=None) if ts.tzinfo is not None else ts
+
+def _list_arg(name: str) -> Optional[List[str]]:
+    raw = request.args.get(name)
+    if raw is None or raw.strip() == "":
+        return None
+    return [f.strip() for f in raw.split(",") if f.strip()]
+
 def create_app() -> Flask:
     app = Flask(__name__)
+    app.json = _FastJSONProvider(app)
 
     storage = os.getenv("STORAGE", "memory").lower()
+    # pamięć bez MEMORY_PERSIST_PATH liczy wersje (i seq zdarzeń) od zera po każdym starcie —
+    # po restarcie i tej samej liczbie zapisów stary ETag klienta pasowałby do innych danych
+    durable_tasks = durable_events = storage in ("mongo", "sqlite")
     if storage == "mongo":
-        from src.repo.mongo_repo import MongoUsers, MongoTasks, MongoEvents
+        from src.repo.mongo_repo import MongoUsers, MongoTasks, MongoEvents, MongoTaskStats, MongoUnitOfWork, create_client
         uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
         db  = os.getenv("MONGO_DB", "taskmgr")
+        # jeden klient = jedna pula połączeń i jeden zestaw wątków monitorujących
+        client = create_client(uri)
+        app.extensions["mongo_client"] = client
+        atexit.register(client.close)
+        transactions = os.getenv("MONGO_TRANSACTIONS", "0") == "1"
         users, tasks, events = (
-            MongoUsers(uri=uri, db_name=db),
-            MongoTasks(uri=uri, db_name=db),
-            MongoEvents(uri=uri, db_name=db),
+            MongoUsers(client=client, db_name=db),
+            MongoTasks(client=client, db_name=db, transactions=transactions),
+            MongoEvents(client=client, db_name=db),
+        )
+        stats = MongoTaskStats(client=client, db_name=db)
+        # idempotentne — create_index nie robi nic, jeśli indeks już istnieje
+        for repo in (users, tasks, events, stats):
+            repo.ensure_indexes()
+        uow = lambda: MongoUnitOfWork(tasks, events, client=client, transactions=transactions)
+    elif storage == "sqlite":
+        from src.repo.sqlite_repo import (
+            SqliteDatabase, SqliteUsers, SqliteTasks, SqliteEvents, SqliteTaskStats, SqliteUnitOfWork,
         )
+        # schemat i indeksy tworzone przy otwarciu (IF NOT EXISTS)
+        sqlite_db = SqliteDatabase(
+            os.getenv("SQLITE_PATH", "data/taskmgr.db"),
+            synchronous=os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+            pool_size=int(os.getenv("SQLITE_POOL_SIZE", "8")),
+        )
+        app.extensions["sqlite"] = sqlite_db
+        atexit.register(sqlite_db.close)
+        users, tasks, events = SqliteUsers(sqlite_db), SqliteTasks(sqlite_db), SqliteEvents(sqlite_db)
+        stats = SqliteTaskStats(sqlite_db)
+        uow = lambda: SqliteUnitOfWork(tasks, events)
     else:
         users, tasks, events = InMemoryUsers(), InMemoryTasks(), InMemoryEvents()
+        stats = InMemoryTaskStats()
+        uow = lambda: InMemoryUnitOfWork(tasks, events)
+        persist_path = os.getenv("MEMORY_PERSIST_PATH")
+        if persist_path:
+            # snapshot + WAL: stan wczytany tu, przed seedem; dalsze zapisy trafiają do WAL
+            from src.repo.memory_persistence import MemoryPersistence
+            persistence = MemoryPersistence(
+                persist_path, users, tasks, events,
+                snapshot_interval=float(os.getenv("MEMORY_SNAPSHOT_INTERVAL", "300")),
+                fsync_interval=float(os.getenv("MEMORY_WAL_FSYNC_INTERVAL", "0")),
+            )
+            app.extensions["memory_persistence"] = persistence
+            atexit.register(persistence.close)
+            durable_tasks = durable_events = True
+
+    if os.getenv("EVENTS_STORAGE", "").lower() == "file":
+        # trwała historia bez Mongo: lokalny log segmentowy; zadania zostają w STORAGE
+        from src.repo.file_events import FileEvents, DEFAULT_SEGMENT_BYTES
+        events = FileEvents(
+            os.getenv("EVENTS_PATH", "data/events"),
+            segment_bytes=int(os.getenv("EVENTS_SEGMENT_BYTES", str(DEFAULT_SEGMENT_BYTES))),
+            fsync_interval=float(os.getenv("EVENTS_FSYNC_INTERVAL", "0")),
+        )
+        app.extensions["file_events"] = events
+        atexit.register(events.close)
+        uow = lambda: RepositoryUnitOfWork(tasks, events)
+        durable_events = True
 
-    svc = TaskService(users, tasks, events, IdGenerator(), Clock())
+    boot_id = secrets.token_hex(8)
+    tasks_epoch = "" if durable_tasks else boot_id
+    events_epoch = "" if durable_events else boot_id
+
+    # liczniki przesuwa repozytorium zadań przy każdym zapisie, ze stanu sprzed zmiany
+    tasks.stats = stats
+    if not stats.get(ALL_TASKS):
+        # brak liczników (pamięć po starcie, baza sprzed statystyk) — jednorazowe przeliczenie z zadań
+        tasks.rebuild_stats()
+
+    if os.getenv("USER_CACHE", "0") == "1":
+        users = CachedUsers(
+            users,
+            max_size=int(os.getenv("USER_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("USER_CACHE_TTL", "30")),
+        )
+        app.extensions["user_cache"] = users
+
+    # mapa tożsamości per request: każdy user/task czytany z repozytorium najwyżej raz
+    # (uow dostaje surowe repozytoria zadań/zdarzeń — zapisy idą przez niego)
+    users = ScopedUsers(users)
+    feed = ChangeFeed(max_queue=int(os.getenv("STREAM_QUEUE_SIZE", "256")))
+    app.extensions["change_feed"] = feed
+    keepalive = float(os.getenv("STREAM_KEEPALIVE", "15"))
+    # maile wysyłane w tle; bez SMTP_HOST zostaje stub SMTPClient (nic nie wysyła, zadania kończą się FAILED)
+    smtp_host = os.getenv("SMTP_HOST")
+    smtp = SMTPRelayClient(
+        smtp_host,
+        port=int(os.getenv("SMTP_PORT", "25")),
+        sender=os.getenv("SMTP_SENDER", "taskmgr@localhost"),
+        timeout=float(os.getenv("SMTP_TIMEOUT", "10")),
+    ) if smtp_host else SMTPClient()
+    mailer = EmailQueue(
+        TaskHistoryEmailer(smtp),
+        workers=int(os.getenv("EMAIL_WORKERS", "2")),
+        capacity=int(os.getenv("EMAIL_QUEUE_SIZE", "1000")),
+        max_attempts=int(os.getenv("EMAIL_MAX_ATTEMPTS", "5")),
+        backoff=float(os.getenv("EMAIL_RETRY_BACKOFF", "1")),
+        digest_window=float(os.getenv("EMAIL_DIGEST_WINDOW", "0")),
+    )
+    app.extensions["email_queue"] = mailer
+    atexit.register(mailer.close)
+    svc = TaskService(users, ScopedTasks(tasks), ScopedEvents(events), IdGenerator(), Clock(), uow=uow, feed=feed,
+                      mailer=mailer, stats=stats)
+
+    @app.before_request
+    def _open_repo_scope():
+        g.repo_scope_token = begin_scope()
+
+    if os.getenv("REPO_CALL_METRICS", "0") == "1":
+        # diagnostyka: liczniki wywołań repozytoriów w nagłówku i sumy per endpoint (domyślnie wyłączone)
+        app.extensions["repo_calls"] = {}
+        repo_calls_lock = threading.Lock()  # serwer wątkowy — Counter.update nie jest atomowy
+
+        @app.after_request
+        def _report_repo_calls(response):
+            scope = current_scope()
+            if scope is not None:
+                response.headers["X-Repo-Calls"] = scope.format_calls()
+                with repo_calls_lock:
+                    totals = app.extensions["repo_calls"].setdefault(request.endpoint, Counter())
+                    totals.update(scope.calls)
+            return response
+
+    @app.teardown_request
+    def _close_repo_scope(_exc):
+        token = g.pop("repo_scope_token", None)
+        if token is not None:
+            end_scope(token)
 
     users.add(User(id="m1", email="m@example.com", role=Role.MANAGER, status=Status.ACTIVE,
                 first_name="Manager", last_name="One", nickname="mm1"))
@@ -69,7 +282,14 @@ def create_app() -> Flask:
 
     @app.route("/health", methods=["GET"])
     def health():
-        return {"status": "ok"}, 200
+        body = {"status": "ok"}
+        if "user_cache" in app.extensions:
+            body["user_cache"] = app.extensions["user_cache"].stats()
+        body["stream"] = feed.stats()
+        body["email_queue"] = mailer.stats()
+        if "memory_persistence" in app.extensions:
+            body["persistence"] = app.extensions["memory_persistence"].stats()
+        return body, 200
 
     @app.errorhandler(ValueError)
     def _value_error(e: ValueError):
@@ -79,6 +299,10 @@ def create_app() -> Flask:
     def _perm_error(e: PermissionError):
         return jsonify({"message": str(e)}), 403
 
+    @app.errorhandler(EmailQueueFull)
+    def _queue_full(e: EmailQueueFull):
+        return jsonify({"message": str(e)}), 503, {"Retry-After": "5"}
+
     @app.errorhandler(NotFound)
     def _not_found(e: NotFound):
         return jsonify({"message": "Not found"}), 404
@@ -126,7 +350,20 @@ def create_app() -> Flask:
             description=data.get("description", ""),
             priority=data.get("priority", "NORMAL"),
         )
-        return jsonify(_task_to_dict(t)), 201
+        return jsonify(task_to_dict(t)), 201
+
+    @app.route("/api/tasks/bulk", methods=["POST"])
+    def create_tasks_bulk():
+        actor_id = _actor_id()
+        data = request.get_json(force=True)
+        results = svc.create_tasks(actor_id, data)
+        body = [
+            {"index": i, "ok": True, "task": task_to_dict(r)} if isinstance(r, Task)
+            else {"index": i, "ok": False, "message": str(r)}
+            for i, r in enumerate(results)
+        ]
+        all_ok = all(item["ok"] for item in body)
+        return jsonify({"results": body}), 201 if all_ok else 207
 
     @app.route("/api/tasks/<task_id>", methods=["PATCH"])
     def update_task(task_id: str):
@@ -138,7 +375,7 @@ def create_app() -> Flask:
             description=data.get("description"),
             priority=data.get("priority"),
         )
-        return jsonify(_task_to_dict(t)), 200
+        return jsonify(task_to_dict(t)), 200
 
     @app.route("/api/tasks/<task_id>/assign", methods=["POST"])
     def assign_task(task_id: str):
@@ -148,7 +385,7 @@ def create_app() -> Flask:
         if not assignee_id:
             raise ValueError("Missing assignee_id")
         t = svc.assign_task(actor_id, task_id, assignee_id)
-        return jsonify(_task_to_dict(t)), 200
+        return jsonify(task_to_dict(t)), 200
 
     @app.route("/api/tasks/<task_id>/status", methods=["POST"])
     def change_status(task_id: str):
@@ -158,30 +395,74 @@ def create_app() -> Flask:
         if not status:
             raise ValueError("Missing status")
         t = svc.change_status(actor_id, task_id, status)
-        return jsonify(_task_to_dict(t)), 200
+        return jsonify(task_to_dict(t)), 200
 
     @app.route("/api/tasks", methods=["GET"])
     def list_tasks():
         actor_id = _actor_id()
-        items = svc.list_tasks(
-            actor_id,
-            status=request.args.get("status"),
-            priority=request.args.get("priority"),
-        )
-        return jsonify([_task_to_dict(t) for t in items]), 200
+        fields = _list_arg("fields")
+        status, priority = request.args.get("status"), request.args.get("priority")
+        paged = "limit" in request.args or "cursor" in request.args
+        limit = _int_arg("limit", DEFAULT_PAGE_SIZE) if paged else None
+        cursor = request.args.get("cursor")
+        # walidacja parametrów przed ETagiem — błędny parametr to 400 także z If-None-Match
+        svc.validate_list_args(status=status, priority=priority, fields=fields, limit=limit, cursor=cursor)
+        # wersja czytana PRZED danymi: przy równoległym zapisie ETag najwyżej się zdezaktualizuje
+        etag = _etag("t", svc.tasks_version(actor_id), actor_id, tasks_epoch)
+        cached = _not_modified(etag)
+        if cached is not None:
+            return cached
+        if paged:
+            items, next_cursor = svc.list_tasks_page(
+                actor_id, status=status, priority=priority, limit=limit, cursor=cursor, fields=fields,
+            )
+            dump = task_serializer(task_projection(fields))
+            return _with_etag(jsonify({"items": [dump(t) for t in items], "next_cursor": next_cursor}), etag)
+        items = svc.iter_tasks(actor_id, status=status, priority=priority, fields=fields)
+        return _with_etag(_stream_json_array(items, task_serializer(task_projection(fields))), etag)
+
+    @app.route("/api/tasks/stats", methods=["GET"])
+    def task_stats():
+        return jsonify(stats_to_dict(svc.get_task_stats(_actor_id()), stale=stats.stale)), 200
+
+    @app.route("/api/tasks/stats/rebuild", methods=["POST"])
+    def rebuild_task_stats():
+        return jsonify(stats_to_dict(svc.rebuild_task_stats(_actor_id()), stale=stats.stale)), 200
 
     @app.route("/api/tasks/<task_id>", methods=["DELETE"])
     def delete_task(task_id: str):
         actor_id = _actor_id()
         t = svc.delete_task(actor_id, task_id)
-        return jsonify(_task_to_dict(t)), 200
+        return jsonify(task_to_dict(t)), 200
 
     @app.route("/api/tasks/<task_id>/events", methods=["GET"])
     def get_events(task_id: str):
         actor_id = _actor_id()
-        evs = svc.get_events(actor_id, task_id)
-        return jsonify([_event_to_dict(e) for e in evs]), 200
+        after_seq = _int_arg("after_seq", 0)
+        filters = dict(after=_time_arg("after"), before=_time_arg("before"), types=_list_arg("types"),
+                       limit=_int_arg("limit", None))
+        # walidacja filtrów przed ETagiem — błędny filtr to 400 także z If-None-Match
+        svc.validate_event_filters(**filters)
+        etag = _etag("e", svc.events_version(actor_id, task_id), actor_id, events_epoch)
+        cached = _not_modified(etag)
+        if cached is not None:
+            return cached
+        evs = svc.iter_events(actor_id, task_id, after_seq, **filters)
+        return _with_etag(_stream_json_array(evs, event_to_dict), etag)
     
+    @app.route("/api/stream", methods=["GET"])
+    def stream():
+        # EventSource w przeglądarce nie ustawia nagłówków — aktor także z ?actor_id=
+        actor_id = request.headers.get("X-Actor-Id") or request.args.get("actor_id")
+        if not actor_id:
+            raise ValueError("Missing X-Actor-Id header")
+        sub = svc.subscribe_changes(actor_id)
+        response = Response(_sse_events(sub, keepalive), mimetype="text/event-stream",
+                            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        # także gdy generator nie zdążył wystartować (klient rozłączył się od razu)
+        response.call_on_close(sub.close)
+        return response
+
     @app.route("/api/tasks/<task_id>/email-history", methods=["POST"])
     def email_history(task_id: str):
         actor_id = _actor_id()
@@ -189,8 +470,13 @@ def create_app() -> Flask:
         email = data.get("email")
         if not email:
             raise ValueError("Missing email")
-        _ = svc.email_task_history(actor_id, task_id, email)
-        return jsonify({"sent": True}), 200
+        job_id = svc.queue_task_history_email(actor_id, task_id, email)
+        return jsonify({"job_id": job_id, "status": "QUEUED"}), 202, {"Location": f"/api/email-jobs/{job_id}"}
+
+    @app.route("/api/email-jobs/<job_id>", methods=["GET"])
+    def email_job(job_id: str):
+        actor_id = _actor_id()
+        return jsonify(job_to_dict(svc.get_email_job(actor_id, job_id), actor_id)), 200
     
     @app.route("/api/register", methods=["POST"])
     def register():
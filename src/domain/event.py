@@ -9,10 +9,23 @@ class EventType(Enum):
     STATUS_CHANGED = auto()
     DELETED = auto()
 
-@dataclass
+@dataclass(slots=True)
 class TaskEvent:
     id: str
     task_id: str
     timestamp: datetime
     type: EventType
-    meta: dict
\ No newline at end of file
+    meta: dict
+    seq: int = 0  # numer kolejny w obrębie zadania, nadawany przez repozytorium przy zapisie
+
+    @classmethod
+    def from_storage(cls, id, task_id, timestamp, type, meta, seq) -> "TaskEvent":
+        # zaufana ścieżka dla repozytoriów (bez narzutu __init__ z argumentami nazwanymi)
+        e = object.__new__(cls)
+        e.id = id
+        e.task_id = task_id
+        e.timestamp = timestamp
+        e.type = type
+        e.meta = meta
+        e.seq = seq
+        return e
@@ -14,7 +14,7 @@ class Priority(Enum):
     NORMAL = auto()
     HIGH = auto()
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     id: str
     title: str
@@ -38,4 +38,35 @@ class Task:
         if not isinstance(self.owner_id, str) or not self.owner_id.strip():
             raise ValueError("owner_id must be non-empty")
         if self.due_date is not None and not isinstance(self.due_date, datetime):
-            raise ValueError("due_date must be datetime or None")
\ No newline at end of file
+            raise ValueError("due_date must be datetime or None")
+
+    @classmethod
+    def from_storage(cls, id, title, description, status, priority, owner_id, assignee_id, due_date, is_deleted) -> "Task":
+        # zaufana ścieżka dla repozytoriów: dane zwalidowano przy zapisie, więc
+        # pomijamy __post_init__; wejście z API zawsze idzie przez konstruktor
+        t = object.__new__(cls)
+        t.id = id
+        t.title = title
+        t.description = description
+        t.status = status
+        t.priority = priority
+        t.owner_id = owner_id
+        t.assignee_id = assignee_id
+        t.due_date = due_date
+        t.is_deleted = is_deleted
+        return t
+
+TASK_FIELDS = ("id", "title", "description", "status", "priority", "owner_id", "assignee_id", "due_date", "is_deleted")
+
+class PartialTask:
+    # lekki widok zadania z podzbiorem pól (projekcja listy); bez walidacji —
+    # nieustawione pola po prostu nie istnieją
+    __slots__ = TASK_FIELDS
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def __repr__(self) -> str:
+        shown = ", ".join(f"{n}={getattr(self, n)!r}" for n in TASK_FIELDS if hasattr(self, n))
+        return f"PartialTask({shown})"
@@ -14,7 +14,7 @@ _EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 _NAME_RE = re.compile(r"^(?=.*\p{L})[\p{L}' -]{1,50}$")
 _NICK_RE = re.compile(r"^[A-Za-z0-9_-]{3,32}$")
 
-@dataclass
+@dataclass(slots=True)
 class User:
     id: str
     email: str
@@ -38,4 +38,17 @@ class User:
         if not isinstance(self.last_name, str) or not _NAME_RE.match(self.last_name):
             raise ValueError("invalid last_name")
         if not isinstance(self.nickname, str) or not _NICK_RE.match(self.nickname):
-            raise ValueError("invalid nickname")
\ No newline at end of file
+            raise ValueError("invalid nickname")
+
+    @classmethod
+    def from_storage(cls, id, email, role, status, first_name, last_name, nickname) -> "User":
+        # zaufana ścieżka dla repozytoriów — bez ponownych dopasowań regex
+        u = object.__new__(cls)
+        u.id = id
+        u.email = email
+        u.role = role
+        u.status = status
+        u.first_name = first_name
+        u.last_name = last_name
+        u.nickname = nickname
+        return u
@@ -0,0 +1,232 @@
+import dataclasses
+import heapq
+import itertools
+import logging
+import random
+import smtplib
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from src.integrations.emailer import TaskHistoryEmailer
+from src.utils.idgen import IdGenerator
+
+log = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_CAPACITY = 1000
+DEFAULT_MAX_ATTEMPTS = 5
+
+class JobStatus(Enum):
+    QUEUED = auto()
+    SENDING = auto()
+    RETRYING = auto()
+    SENT = auto()
+    FAILED = auto()
+
+class EmailQueueFull(Exception):
+    pass
+
+@dataclass
+class EmailJob:
+    id: str
+    email: str
+    # kto zlecił i które zadania (w trybie digest może być kilku zlecających) — actor_id -> [task_id]
+    requested_by: Dict[str, List[str]] = field(default_factory=dict)
+    items: Dict[str, Tuple[str, List[str]]] = field(default_factory=dict)  # task_id -> (tytuł, typy zdarzeń)
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    error: Optional[str] = None
+
+    @property
+    def actor_ids(self) -> List[str]:
+        return list(self.requested_by)
+
+def job_to_dict(job: EmailJob, actor_id: str) -> dict:
+    # tylko zadania zlecone przez pytającego — digest może łączyć prośby różnych użytkowników
+    return {"id": job.id, "status": job.status.name, "attempts": job.attempts, "error": job.error,
+            "tasks": list(job.requested_by.get(actor_id, ()))}
+
+def _is_permanent(exc: Exception) -> bool:
+    # odpowiedzi 5xx (np. nieistniejąca skrzynka) nie zmienią się przy ponowieniu; 4xx i błędy sieci — tak
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code >= 500
+
+class EmailQueue:
+    # wysyłka maili w tle: pula wątków, ograniczona liczba oczekujących zadań,
+    # ponowienia z wykładniczym backoffem i status zadania do odpytania.
+    # Kolejka żyje w pamięci procesu — niewysłane zadania giną przy restarcie.
+    def __init__(
+        self,
+        emailer: Optional[TaskHistoryEmailer] = None,
+        workers: int = DEFAULT_WORKERS,
+        capacity: int = DEFAULT_CAPACITY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        keep_finished: int = 10_000,
+        digest_window: float = 0.0,
+        new_id: Callable[[], str] = IdGenerator.new_id,
+    ):
+        if workers < 1 or capacity < 1 or max_attempts < 1:
+            raise ValueError("workers, capacity and max_attempts must be >= 1")
+        self._emailer = emailer or TaskHistoryEmailer()
+        self._capacity = capacity
+        self._max_attempts = max_attempts
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._keep_finished = keep_finished
+        self._digest_window = digest_window
+        self._new_id = new_id
+        self._cond = threading.Condition()
+        self._ready: Deque[EmailJob] = deque()
+        self._delayed: List[Tuple[float, int, EmailJob]] = []  # kopiec (termin, nr, zadanie)
+        self._seq = itertools.count()
+        self._jobs: Dict[str, EmailJob] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()  # zakończone, od najstarszego
+        self._open: Dict[str, EmailJob] = {}  # adresat -> digest zbierany w oknie (jeszcze niepobrany)
+        self._pending = 0  # przyjęte i niezakończone (w kolejce, w trakcie, czekające na ponowienie)
+        self._closed = False
+        self.sent = self.failed = self.retries = self.rejected = 0
+        self.coalesced = self.duplicates = 0
+        self._threads = [
+            threading.Thread(target=self._work, name=f"email-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, actor_id: str, email: str, task_id: str, task_title: str, events: Sequence[str]) -> str:
+        # w trybie digest (digest_window > 0) historie dla adresata zbierane są przez okno
+        # w jedno zadanie — zwracane jest jego id; ta sama historia zadania dwa razy zastępuje poprzednią
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Email queue is closed")
+            job = self._open.get(email)
+            if job is not None:
+                if task_id in job.items:
+                    self.duplicates += 1
+                else:
+                    self.coalesced += 1
+                job.items[task_id] = (task_title, list(events))
+                requested = job.requested_by.setdefault(actor_id, [])
+                if task_id not in requested:
+                    requested.append(task_id)
+                return job.id
+            if self._pending >= self._capacity:
+                self.rejected += 1
+                raise EmailQueueFull("Email queue is full")
+            job = EmailJob(self._new_id(), email, {actor_id: [task_id]}, {task_id: (task_title, list(events))})
+            self._jobs[job.id] = job
+            self._pending += 1
+            if self._digest_window > 0:
+                self._open[email] = job
+                heapq.heappush(self._delayed, (time.monotonic() + self._digest_window, next(self._seq), job))
+            else:
+                self._ready.append(job)
+            self._cond.notify()
+        return job.id
+
+    def get(self, job_id: str) -> Optional[EmailJob]:
+        # kopia — stan zadania zmieniają wątki robocze
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return dataclasses.replace(
+                job, requested_by={a: list(ids) for a, ids in job.requested_by.items()}, items=dict(job.items)
+            )
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": self._pending,
+                "sent": self.sent,
+                "failed": self.failed,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "coalesced": self.coalesced,
+                "duplicates": self.duplicates,
+            }
+
+    def close(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+
+    def _retry_delay(self, attempt: int) -> float:
+        # backoff wykładniczy z losowym rozrzutem (połowa stała, połowa losowa) — ponowienia
+        # wielu zadań po awarii serwera nie uderzają w niego jednocześnie
+        delay = min(self._max_backoff, self._backoff * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _work(self) -> None:
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            self._deliver(job)
+
+    def _next(self) -> Optional[EmailJob]:
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    self._ready.append(heapq.heappop(self._delayed)[2])
+                if self._ready:
+                    job = self._ready.popleft()
+                    if self._open.get(job.email) is job:
+                        del self._open[job.email]  # okno zamknięte — kolejne prośby trafią do nowego digestu
+                    job.status = JobStatus.SENDING
+                    job.attempts += 1
+                    return job
+                self._cond.wait(self._delayed[0][0] - now if self._delayed else None)
+            return None
+
+    def _deliver(self, job: EmailJob) -> None:
+        # wysyłka poza blokadą; pobrane zadanie nie przyjmuje już nowych historii
+        permanent = False
+        try:
+            if len(job.items) == 1:
+                (title, events), = job.items.values()
+                ok = self._emailer.send_task_history(job.email, title, events)
+            else:
+                ok = self._emailer.send_digest(job.email, list(job.items.values()))
+            error = None if ok else "SMTP client reported failure"
+        except Exception as e:
+            ok, error, permanent = False, f"{type(e).__name__}: {e}", _is_permanent(e)
+        with self._cond:
+            job.error = error
+            if ok:
+                job.status = JobStatus.SENT
+                self.sent += 1
+                self._finish(job)
+            elif permanent or job.attempts >= self._max_attempts:
+                job.status = JobStatus.FAILED
+                self.failed += 1
+                self._finish(job)
+                log.warning("Email job %s failed after %d attempt(s): %s", job.id, job.attempts, error)
+            else:
+                job.status = JobStatus.RETRYING
+                self.retries += 1
+                due = time.monotonic() + self._retry_delay(job.attempts)
+                heapq.heappush(self._delayed, (due, next(self._seq), job))
+                self._cond.notify()  # czekający wątek przelicza termin najbliższego ponowienia
+
+    def _finish(self, job: EmailJob) -> None:
+        self._pending -= 1
+        self._finished[job.id] = None
+        # status zakończonych trzymany dla ostatnich `keep_finished` zadań
+        while len(self._finished) > self._keep_finished:
+            old, _ = self._finished.popitem(last=False)
+            del self._jobs[old]
+        self._cond.notify_all()
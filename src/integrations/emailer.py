@@ -1,5 +1,5 @@
 from datetime import date
-from typing import Sequence
+from typing import Sequence, Tuple
 from src.integrations.smtp import SMTPClient
 
 class TaskHistoryEmailer:
@@ -9,4 +9,10 @@ class TaskHistoryEmailer:
     def send_task_history(self, email: str, task_title: str, events: Sequence[str]) -> bool:
         subject = f"Task History {date.today().isoformat()}"
         body = f'Task "{task_title}" events: {list(events)}'
+        return self.smtp.send(subject, body, email)
+
+    def send_digest(self, email: str, histories: Sequence[Tuple[str, Sequence[str]]]) -> bool:
+        # kilka historii dla jednego adresata w jednej wiadomości — jedna sesja SMTP
+        subject = f"Task History {date.today().isoformat()} ({len(histories)} tasks)"
+        body = "\n".join(f'Task "{title}" events: {list(events)}' for title, events in histories)
         return self.smtp.send(subject, body, email)
\ No newline at end of file
@@ -1,7 +1,29 @@
+import smtplib
+from email.message import EmailMessage
+
 class SMTPClient:
     @staticmethod
     def send(subject: str, text: str, email_address: str) -> bool:
         # tutaj byłby kod odpowiedzialny za wysłanie maila
         # return True jezeli wyslanie sie powiodło
         # return False jezeli wyslanie sie nie powiodło
-        return False
\ No newline at end of file
+        return False
+
+class SMTPRelayClient:
+    # prawdziwa wysyłka przez serwer SMTP (smtplib); jedno połączenie na wiadomość.
+    # Błędy protokołu/sieci nie są tłumione — decyzję o ponowieniu podejmuje kolejka (EmailQueue)
+    def __init__(self, host: str, port: int = 25, sender: str = "taskmgr@localhost", timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.timeout = timeout
+
+    def send(self, subject: str, text: str, email_address: str) -> bool:
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = self.sender
+        msg["To"] = email_address
+        msg.set_content(text)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(msg)
+        return True
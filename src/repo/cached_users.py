@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from src.repo.interface import UsersRepository
+from src.domain.user import User
+
+class CachedUsers(UsersRepository):
+    # read-through cache dla get(): LRU o ograniczonym rozmiarze + TTL,
+    # unieważniany przy add() (np. zablokowanie użytkownika)
+    def __init__(
+        self,
+        inner: UsersRepository,
+        max_size: int = 1024,
+        ttl: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self._inner = inner
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[User]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        user = self._inner.get(user_id)
+        if user is None:
+            return None
+        with self._lock:
+            # add() w międzyczasie mógł unieważnić wpis — nie zapisujemy starej wartości
+            if generation == self._generation:
+                self._entries[user_id] = (now + self._ttl, user)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self._max_size:
+                    self._entries.popitem(last=False)
+        return user
+
+    def add(self, user: User) -> None:
+        self._inner.add(user)
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user.id, None)
+
+    def find_by_email_and_nickname(self, email: str, nickname: str) -> Optional[User]:
+        return self._inner.find_by_email_and_nickname(email, nickname)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
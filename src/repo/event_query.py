@@ -0,0 +1,48 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from itertools import islice, pairwise
+from typing import Callable, Collection, Iterable, Iterator, Optional, Tuple
+
+from src.domain.event import TaskEvent, EventType
+
+# Wspólne dla magazynów w procesie (InMemoryEvents, FileEvents): historia zadania to
+# sekwencja w kolejności seq, więc after_seq to przesunięcie, a zakres czasu — bisekcja,
+# o ile znaczniki czasu zadania nie maleją (zwykle: zapisywane z zegara w chwili zmiany).
+
+def time_slice(
+    count: int,
+    timestamp_at: Callable[[int], datetime],
+    start: int,
+    after: Optional[datetime],
+    before: Optional[datetime],
+) -> Tuple[int, int]:
+    # pozycje [start, end) zdarzeń z after < timestamp < before; wymaga niemalejących znaczników
+    end = count
+    if after is not None:
+        start = bisect_right(range(count), after, lo=start, key=timestamp_at)
+    if before is not None:
+        end = bisect_left(range(count), before, lo=start, key=timestamp_at)
+    return start, end
+
+def select_events(
+    events: Iterable[TaskEvent],
+    after: Optional[datetime] = None,
+    before: Optional[datetime] = None,
+    types: Optional[Collection[EventType]] = None,
+    limit: Optional[int] = None,
+) -> Iterator[TaskEvent]:
+    # filtr liniowy: typy oraz zakres czasu, gdy bisekcja nie była możliwa; limit na końcu
+    it = iter(events)
+    if after is not None:
+        it = (e for e in it if e.timestamp > after)
+    if before is not None:
+        it = (e for e in it if e.timestamp < before)
+    if types is not None:
+        wanted = frozenset(types)
+        it = (e for e in it if e.type in wanted)
+    if limit is not None:
+        it = islice(it, limit)
+    return it
+
+def is_ordered(timestamps: Iterable[datetime]) -> bool:
+    return all(a <= b for a, b in pairwise(timestamps))
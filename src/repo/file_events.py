@@ -0,0 +1,293 @@
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from array import array
+from datetime import datetime
+from typing import Collection, Dict, Iterator, List, Optional, Tuple
+
+from src.domain.event import TaskEvent, EventType
+from src.repo.interface import EventsRepository
+from src.repo.event_query import time_slice, select_events
+from src.utils.serialization import dumps, loads
+
+# Rekord: nagłówek <długość payloadu, crc32 payloadu> (2 x uint32 LE) + payload JSON.
+# Segmenty są prealokowane (ftruncate) i mapowane raz w całości, więc odczyt to wycinek
+# mmapy bez kopiowania, a dopisywanie (pwrite) nie wymaga ponownego mapowania.
+# Koniec danych w segmencie = pierwszy nagłówek z długością 0 albo złym CRC.
+_HEADER = struct.Struct("<II")
+_SEGMENT_RE = re.compile(r"^events-(\d{6})\.log$")
+_OFFSET_BITS = 40  # pozycja w indeksie: numer segmentu << 40 | offset
+_OFFSET_MASK = (1 << _OFFSET_BITS) - 1
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+def _event_to_record(e: TaskEvent) -> bytes:
+    payload = dumps({
+        "id": e.id,
+        "task_id": e.task_id,
+        "timestamp": e.timestamp.isoformat(),
+        "type": e.type.name,
+        "meta": e.meta,
+        "seq": e.seq,
+    })
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+def _record_to_event(d: dict) -> TaskEvent:
+    return TaskEvent.from_storage(
+        d["id"],
+        d["task_id"],
+        datetime.fromisoformat(d["timestamp"]),
+        EventType[d["type"]],
+        d.get("meta", {}),
+        d["seq"],
+    )
+
+class _Segment:
+    def __init__(self, number: int, path: str, size: int):
+        self.number = number
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.size = os.fstat(self.fd).st_size
+        self.map = mmap.mmap(self.fd, self.size)
+        self.view = memoryview(self.map)
+        self.end = 0
+
+    def scan(self) -> Iterator[tuple]:
+        # przechodzi po poprawnych rekordach i ustawia self.end za ostatnim z nich
+        off = 0
+        while off + _HEADER.size <= self.size:
+            length, crc = _HEADER.unpack_from(self.map, off)
+            start = off + _HEADER.size
+            if length == 0 or start + length > self.size:
+                break
+            payload = self.view[start:start + length]
+            if zlib.crc32(payload) != crc:
+                break
+            yield off, payload
+            off = start + length
+        self.end = off
+
+    def close(self) -> None:
+        self.view.release()
+        self.map.close()
+        os.fsync(self.fd)
+        os.close(self.fd)
+
+class FileEvents(EventsRepository):
+    # Trwały log zdarzeń na lokalnym dysku: segmentowany, tylko dopisywany.
+    # Indeks per zadanie (array pozycji, 8 B/zdarzenie) odtwarzany przy otwarciu.
+    # fsync_interval=0: jeden fsync na add_many (cały batch z unit of work);
+    # >0: fsync w tle najwyżej co tyle sekund (group commit, okno utraty = interwał).
+    def __init__(self, path: str, segment_bytes: int = DEFAULT_SEGMENT_BYTES, fsync_interval: float = 0.0):
+        if segment_bytes < 4096:
+            raise ValueError("segment_bytes must be >= 4096")
+        os.makedirs(path, exist_ok=True)
+        self._path = path
+        self._segment_bytes = segment_bytes
+        self._fsync_interval = fsync_interval
+        self._segments: Dict[int, _Segment] = {}
+        self._index: Dict[str, array] = {}
+        # task_id -> (czy znaczniki czasu nie maleją, ostatni znacznik); liczone przy pierwszym zapytaniu o czas
+        self._order: Dict[str, Tuple[bool, Optional[datetime]]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._closed = threading.Event()
+        self._recover()
+        self._flusher: Optional[threading.Thread] = None
+        if fsync_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="file-events-fsync", daemon=True)
+            self._flusher.start()
+
+    # --- otwarcie / odtwarzanie ---
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self._path, f"events-{number:06d}.log")
+
+    def _recover(self) -> None:
+        numbers = sorted(int(m.group(1)) for m in map(_SEGMENT_RE.match, os.listdir(self._path)) if m)
+        for number in numbers:
+            # ostatni segment jest aktywny: prealokowany do pełnego rozmiaru
+            size = self._segment_bytes if number == numbers[-1] else 0
+            self._segments[number] = self._index_segment(_Segment(number, self._segment_path(number), size))
+        if not numbers:
+            self._active = self._open_segment(1)
+            return
+        self._active = self._segments[numbers[-1]]
+        # za ostatnim poprawnym rekordem może leżeć urwany zapis — zerujemy ogon
+        # (ftruncate w dół i z powrotem), żeby nowe rekordy nie sąsiadowały ze śmieciami
+        self._reopen_active(self._active.end)
+
+    def _index_segment(self, seg: _Segment) -> _Segment:
+        # osobna funkcja: wycinki mapy z scan() znikają razem z jej ramką
+        base = seg.number << _OFFSET_BITS
+        for off, payload in seg.scan():
+            self._index.setdefault(loads(payload)["task_id"], array("Q")).append(base | off)
+        return seg
+
+    def _open_segment(self, number: int, min_size: int = 0) -> _Segment:
+        seg = _Segment(number, self._segment_path(number), max(self._segment_bytes, min_size))
+        self._segments[number] = seg
+        return seg
+
+    def _reopen_active(self, end: int, min_size: int = 0) -> None:
+        # tylko gdy nikt nie czyta z mapy tego segmentu (odtwarzanie, pusty segment)
+        seg = self._active
+        seg.view.release()
+        seg.map.close()
+        os.ftruncate(seg.fd, end)
+        os.close(seg.fd)
+        self._active = self._open_segment(seg.number, max(end, min_size))
+        self._active.end = end
+
+    # --- zapis ---
+    def add(self, event: TaskEvent) -> None:
+        self.add_many([event])
+
+    def add_many(self, events: List[TaskEvent]) -> None:
+        if not events:
+            return
+        with self._lock:
+            # cały batch jednym pwrite (o ile mieści się w segmencie) i jednym fsync
+            chunks: List[bytes] = []
+            pending: List[tuple] = []
+            last: Dict[str, int] = {}
+            seg = self._active
+            off = seg.end
+            for event in events:
+                tid = event.task_id
+                event.seq = last[tid] = last.get(tid, len(self._index.get(tid, ()))) + 1
+                record = _event_to_record(event)
+                if off + len(record) > seg.size:
+                    self._write(seg, chunks)
+                    seg = self._roll(len(record))
+                    off, chunks = seg.end, []
+                chunks.append(record)
+                pending.append((tid, seg.number << _OFFSET_BITS | off))
+                known = self._order.get(tid)
+                if known is not None and known[0]:
+                    self._order[tid] = (known[1] is None or event.timestamp >= known[1], event.timestamp)
+                off += len(record)
+            self._write(seg, chunks)
+            for tid, pos in pending:
+                self._index.setdefault(tid, array("Q")).append(pos)
+            if self._fsync_interval > 0:
+                self._dirty = True
+            else:
+                os.fsync(seg.fd)
+
+    def _write(self, seg: _Segment, chunks: List[bytes]) -> None:
+        if chunks:
+            data = b"".join(chunks)
+            os.pwrite(seg.fd, data, seg.end)
+            seg.end += len(data)
+
+    def _roll(self, record_size: int) -> _Segment:
+        old = self._active
+        if old.end == 0:
+            # pusty segment mniejszy niż rekord — powiększamy go zamiast zamykać
+            self._reopen_active(0, record_size)
+            return self._active
+        # zamknięty segment zostaje zmapowany (czytelnicy mogą trzymać wycinki);
+        # nieużyty prealokowany ogon to dziura w pliku (sparse), nie zajmuje dysku
+        os.fsync(old.fd)
+        self._active = self._open_segment(old.number + 1, record_size)
+        return self._active
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self._fsync_interval):
+            self.sync()
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._dirty:
+                os.fsync(self._active.fd)
+                self._dirty = False
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            for seg in self._segments.values():
+                seg.close()
+            self._segments.clear()
+
+    # --- odczyt ---
+    def _timestamps_ordered(self, task_id: str) -> bool:
+        # pod self._lock; jednorazowy odczyt historii zadania, potem aktualizowane w add_many
+        known = self._order.get(task_id)
+        if known is None:
+            last = None
+            for pos in self._index.get(task_id, ()):
+                ts = self._read(pos).timestamp
+                if last is not None and ts < last:
+                    known = (False, ts)
+                    break
+                last = ts
+            else:
+                known = (True, last)
+            self._order[task_id] = known
+        return known[0]
+
+    def _select(
+        self,
+        task_id: str,
+        after_seq: int,
+        after: Optional[datetime],
+        before: Optional[datetime],
+        types: Optional[Collection[EventType]],
+        limit: Optional[int],
+    ) -> Iterator[TaskEvent]:
+        timed = after is not None or before is not None
+        with self._lock:
+            positions = self._index.get(task_id)
+            positions = positions[:] if positions is not None else array("Q")  # kopia: 8 B na zdarzenie
+            ordered = timed and self._timestamps_ordered(task_id)
+        start, end = after_seq, len(positions)
+        if ordered:
+            # bisekcja czyta log(n) rekordów zamiast całej historii
+            start, end = time_slice(end, lambda i: self._read(positions[i]).timestamp, start, after, before)
+            after = before = None
+        events = (self._read(positions[i]) for i in range(start, end))
+        return select_events(events, after, before, types, limit)
+
+    def _read(self, pos: int) -> TaskEvent:
+        seg = self._segments[pos >> _OFFSET_BITS]
+        off = pos & _OFFSET_MASK
+        length, _ = _HEADER.unpack_from(seg.map, off)
+        start = off + _HEADER.size
+        # wycinek memoryview na mmapie — parser JSON czyta bezpośrednio ze stron pliku
+        return _record_to_event(loads(seg.view[start:start + length]))
+
+    def list_for_task(
+        self,
+        task_id: str,
+        after_seq: int = 0,
+        *,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        types: Optional[Collection[EventType]] = None,
+        limit: Optional[int] = None,
+    ) -> List[TaskEvent]:
+        return list(self._select(task_id, after_seq, after, before, types, limit))
+
+    def iter_for_task(
+        self,
+        task_id: str,
+        after_seq: int = 0,
+        *,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        types: Optional[Collection[EventType]] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[TaskEvent]:
+        return self._select(task_id, after_seq, after, before, types, limit)
+
+    def last_seq(self, task_id: str) -> int:
+        return len(self._index.get(task_id, ()))
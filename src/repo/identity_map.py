@@ -0,0 +1,107 @@
+from typing import Iterator, List, Optional
+from src.repo.interface import UsersRepository, TasksRepository, EventsRepository
+from src.repo.request_scope import count_call, current_scope
+from src.domain.user import User
+from src.domain.task import Task
+from src.domain.event import TaskEvent
+
+class ScopedUsers(UsersRepository):
+    def __init__(self, inner: UsersRepository):
+        self._inner = inner
+
+    def get(self, user_id: str) -> Optional[User]:
+        scope = current_scope()
+        if scope is None:
+            return self._inner.get(user_id)
+        if user_id not in scope.users:
+            scope.calls["users.get"] += 1
+            scope.users[user_id] = self._inner.get(user_id)
+        return scope.users[user_id]
+
+    def add(self, user: User) -> None:
+        count_call("users.add")
+        self._inner.add(user)
+        scope = current_scope()
+        if scope is not None:
+            scope.users[user.id] = user
+
+    def find_by_email_and_nickname(self, email: str, nickname: str) -> Optional[User]:
+        count_call("users.find_by_email_and_nickname")
+        return self._inner.find_by_email_and_nickname(email, nickname)
+
+class ScopedTasks(TasksRepository):
+    def __init__(self, inner: TasksRepository):
+        self._inner = inner
+
+    def get(self, task_id: str) -> Optional[Task]:
+        scope = current_scope()
+        if scope is None:
+            return self._inner.get(task_id)
+        if task_id not in scope.tasks:
+            scope.calls["tasks.get"] += 1
+            scope.tasks[task_id] = self._inner.get(task_id)
+        return scope.tasks[task_id]
+
+    def _remember(self, tasks: List[Task]) -> None:
+        scope = current_scope()
+        if scope is not None:
+            for t in tasks:
+                scope.tasks[t.id] = t
+
+    def list(self) -> List[Task]:
+        count_call("tasks.list")
+        return self._inner.list()
+
+    def add(self, task: Task) -> None:
+        count_call("tasks.add")
+        self._inner.add(task)
+        self._remember([task])
+
+    def add_many(self, tasks: List[Task]) -> None:
+        count_call("tasks.add_many")
+        self._inner.add_many(tasks)
+        self._remember(tasks)
+
+    def update(self, task: Task, fields=None) -> None:
+        count_call("tasks.update")
+        self._inner.update(task, fields=fields)
+        self._remember([task])
+
+    def query(self, **filters) -> List[Task]:
+        count_call("tasks.query")
+        return self._inner.query(**filters)
+
+    def version(self) -> int:
+        count_call("tasks.version")
+        return self._inner.version()
+
+    def iter_query(self, **filters) -> Iterator[Task]:
+        count_call("tasks.iter_query")
+        return self._inner.iter_query(**filters)
+
+    def rebuild_stats(self) -> None:
+        self._inner.rebuild_stats()
+
+class ScopedEvents(EventsRepository):
+    def __init__(self, inner: EventsRepository):
+        self._inner = inner
+
+    def add(self, event: TaskEvent) -> None:
+        count_call("events.add")
+        self._inner.add(event)
+
+    def add_many(self, events: List[TaskEvent]) -> None:
+        count_call("events.add_many")
+        self._inner.add_many(events)
+
+    def list_for_task(self, task_id: str, after_seq: int = 0, **filters) -> List[TaskEvent]:
+        count_call("events.list_for_task")
+        return self._inner.list_for_task(task_id, after_seq, **filters)
+
+    def last_seq(self, task_id: str) -> int:
+        count_call("events.last_seq")
+        return self._inner.last_seq(task_id)
+
+    def iter_for_task(self, task_id: str, after_seq: int = 0, **filters) -> Iterator[TaskEvent]:
+        count_call("events.iter_for_task")
+        return self._inner.iter_for_task(task_id, after_seq, **filters)
@@ -1,8 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 from src.domain.user import User
-from src.domain.task import Task
-from src.domain.event import TaskEvent
+from src.domain.task import Task, TaskStatus, Priority, PartialTask
+from src.domain.event import TaskEvent, EventType
 
 class UsersRepository(ABC):
     @abstractmethod
@@ -13,6 +14,10 @@ class UsersRepository(ABC):
     def find_by_email_and_nickname(self, email: str, nickname: str) -> Optional[User]: ...
     
 class TasksRepository(ABC):
+    # opcjonalne liczniki statystyk (TaskStatsRepository): zapisy repozytorium przesuwają je
+    # o deltę liczoną z zapisanego stanu zadania sprzed zmiany, w tym samym zapisie co dane
+    stats: Optional["TaskStatsRepository"] = None
+
     @abstractmethod
     def get(self, task_id: str) -> Optional[Task]: ...
     @abstractmethod
@@ -20,10 +25,70 @@ class TasksRepository(ABC):
     @abstractmethod
     def add(self, task: Task) -> None: ...
     @abstractmethod
-    def update(self, task: Task) -> None: ...
+    def add_many(self, tasks: List[Task]) -> None: ...
+    @abstractmethod
+    def update(self, task: Task, fields: Optional[Iterable[str]] = None) -> None: ...
+
+    @abstractmethod
+    def query(
+        self,
+        *,
+        visible_to: Optional[str] = None,
+        status: Optional[TaskStatus] = None,
+        priority: Optional[Priority] = None,
+        include_deleted: bool = False,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[Union[Task, PartialTask]]: ...
+
+    # licznik zapisów magazynu zadań — rośnie po każdym add/update (ETag list)
+    @abstractmethod
+    def version(self) -> int: ...
+
+    def iter_query(self, **filters) -> Iterator[Union[Task, PartialTask]]:
+        # jak query, ale leniwie; domyślnie iteruje po gotowej liście,
+        # backendy z kursorem zwracają obiekty w miarę odczytu
+        return iter(self.query(**filters))
+
+    # przeliczenie liczników (stats) od zera, serializowane względem zapisów zadań
+    @abstractmethod
+    def rebuild_stats(self) -> None: ...
 
 class EventsRepository(ABC):
     @abstractmethod
     def add(self, event: TaskEvent) -> None: ...
     @abstractmethod
-    def list_for_task(self, task_id: str) -> list[TaskEvent]: ...
\ No newline at end of file
+    def add_many(self, events: List[TaskEvent]) -> None: ...
+    # w kolejności seq; filtry łączone (AND): seq > after_seq, after < timestamp < before,
+    # type w types; limit — najwyżej tyle pierwszych pasujących (następna strona: after_seq = ostatni seq)
+    @abstractmethod
+    def list_for_task(
+        self,
+        task_id: str,
+        after_seq: int = 0,
+        *,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        types: Optional[Collection[EventType]] = None,
+        limit: Optional[int] = None,
+    ) -> list[TaskEvent]: ...
+    # seq ostatniego zapisanego zdarzenia zadania (0 gdy brak) — wersja historii
+    @abstractmethod
+    def last_seq(self, task_id: str) -> int: ...
+
+    def iter_for_task(self, task_id: str, after_seq: int = 0, **filters) -> Iterator[TaskEvent]:
+        return iter(self.list_for_task(task_id, after_seq, **filters))
+
+class TaskStatsRepository(ABC):
+    # liczniki statystyk zadań: (zakres, nazwa licznika) -> liczba; zakres to "*" (wszystkie)
+    # albo id użytkownika (zadania, które widzi). Zmiany przyrostowe — apply dodaje delty.
+    # stale: zapis delty nie powiódł się po zapisaniu zadania — liczniki do przeliczenia
+    stale: bool = False
+    @abstractmethod
+    def get(self, scope: str) -> Dict[str, int]: ...
+    @abstractmethod
+    def apply(self, delta: Dict[Tuple[str, str], int]) -> None: ...
+    # odbudowa: wszystkie liczniki zastępowane podanymi (i zdjęte `stale`)
+    @abstractmethod
+    def replace(self, counts: Dict[Tuple[str, str], int]) -> None: ...
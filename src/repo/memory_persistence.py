@@ -0,0 +1,344 @@
+import logging
+import marshal
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.repo.memory_repo import InMemoryUsers, InMemoryTasks, InMemoryEvents
+from src.domain.user import User, Role, Status
+from src.domain.task import Task, TaskStatus, Priority
+from src.domain.event import TaskEvent, EventType
+
+logger = logging.getLogger(__name__)
+
+# Trwałość repozytoriów in-memory: WAL mutacji (wal-NNNNNN.log) + okresowy snapshot (snapshot.bin).
+# Rekordy to krotki prostych wartości (enumy po nazwie, daty ISO 8601) zapisane przez marshal —
+# stdlib, ładowanie ~2x szybsze niż pickle i bez wykonywania kodu. Snapshot z numerem pokolenia
+# WAL, które już zawiera; przy starcie: snapshot + odtworzenie nowszych plików WAL.
+_FRAME = struct.Struct("<II")  # długość payloadu, crc32 payloadu
+_WAL_RE = re.compile(r"^wal-(\d{6})\.log$")
+_SNAPSHOT = "snapshot.bin"
+_SNAPSHOT_MAGIC = b"TMSNAP01"
+_SNAPSHOT_CHUNK = 10_000  # wierszy na jeden marshal.dump — ogranicza pamięć przy zapisie/odczycie
+
+_ROLES = dict(Role.__members__)
+_USER_STATUSES = dict(Status.__members__)
+_STATUSES = dict(TaskStatus.__members__)
+_PRIORITIES = dict(Priority.__members__)
+_EVENT_TYPES = dict(EventType.__members__)
+
+def _user_row(u: User) -> tuple:
+    return (u.id, u.email, u.role.name, u.status.name, u.first_name, u.last_name, u.nickname)
+
+def _row_user(r: tuple) -> User:
+    return User.from_storage(r[0], r[1], _ROLES[r[2]], _USER_STATUSES[r[3]], r[4], r[5], r[6])
+
+def _task_row(t: Task) -> tuple:
+    due = t.due_date
+    return (t.id, t.title, t.description, t.status.name, t.priority.name, t.owner_id, t.assignee_id,
+            due.isoformat() if due is not None else None, bool(t.is_deleted))
+
+def _row_task(r: tuple) -> Task:
+    return Task.from_storage(r[0], r[1], r[2], _STATUSES[r[3]], _PRIORITIES[r[4]], r[5], r[6],
+                             datetime.fromisoformat(r[7]) if r[7] is not None else None, r[8])
+
+def _event_row(e: TaskEvent) -> tuple:
+    return (e.id, e.task_id, e.timestamp.isoformat(), e.type.name, e.meta, e.seq)
+
+def _frame(payload: bytes) -> bytes:
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+def _frames(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    # (koniec rekordu, payload) aż do pierwszej niepełnej ramki albo złego CRC
+    off = 0
+    while off + _FRAME.size <= len(data):
+        length, crc = _FRAME.unpack_from(data, off)
+        start = off + _FRAME.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        off = start + length
+        yield off, payload
+
+class MemoryPersistence:
+    # Dołącza się do repozytoriów jako ich `journal`: każda mutacja to jeden rekord WAL
+    # dopisywany pod blokadą repozytorium (kolejność WAL = kolejność zmian), fsync poza nią.
+    # fsync_interval=0: fsync przed powrotem z zapisu (grupowany między wątkami);
+    # >0: fsync w tle co tyle sekund. snapshot_interval>0: snapshot w tle, gdy WAL urósł.
+    def __init__(
+        self,
+        path: str,
+        users: InMemoryUsers,
+        tasks: InMemoryTasks,
+        events: InMemoryEvents,
+        snapshot_interval: float = 300.0,
+        fsync_interval: float = 0.0,
+    ):
+        os.makedirs(path, exist_ok=True)
+        self._path = path
+        self._users = users
+        self._tasks = tasks
+        self._events = events
+        self._snapshot_interval = snapshot_interval
+        self._fsync_interval = fsync_interval
+        self._lock = threading.Lock()           # deskryptor i liczniki WAL
+        self._sync_lock = threading.Lock()      # jeden fsync naraz; roll czeka na trwający fsync
+        self._snapshot_lock = threading.Lock()  # jeden snapshot naraz
+        self._written = 0
+        self._synced = 0
+        self._since_snapshot = 0
+        self._closed = threading.Event()
+        started = time.perf_counter()
+        snapshot_gen, wal_records = self._recover()
+        self.recovery = {
+            "snapshot_generation": snapshot_gen,
+            "wal_records": wal_records,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        self._open_wal(self._generation + 1)
+        for repo in (users, tasks, events):
+            repo.journal = self
+        self._worker: Optional[threading.Thread] = None
+        if snapshot_interval > 0 or fsync_interval > 0:
+            self._worker = threading.Thread(target=self._background, name="memory-persistence", daemon=True)
+            self._worker.start()
+
+    # --- pliki ---
+    def _wal_path(self, gen: int) -> str:
+        return os.path.join(self._path, f"wal-{gen:06d}.log")
+
+    def _wal_generations(self) -> List[int]:
+        return sorted(int(m.group(1)) for m in map(_WAL_RE.match, os.listdir(self._path)) if m)
+
+    def _open_wal(self, gen: int) -> None:
+        self._generation = gen
+        self._fd = os.open(self._wal_path(gen), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def _fsync_dir(self) -> None:
+        fd = os.open(self._path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # --- zapis WAL (wołane przez repozytoria pod ich blokadą) ---
+    def _append(self, record: tuple) -> None:
+        data = _frame(marshal.dumps(record))
+        with self._lock:
+            os.write(self._fd, data)
+            self._written += 1
+            self._since_snapshot += 1
+
+    def log_users(self, users: List[User]) -> None:
+        self._append(("u", [_user_row(u) for u in users]))
+
+    def log_tasks(self, tasks: List[Task]) -> None:
+        self._append(("t", [_task_row(t) for t in tasks]))
+
+    def log_events(self, events: List[TaskEvent]) -> None:
+        self._append(("e", [_event_row(e) for e in events]))
+
+    def log_commit(self, tasks: List[Task], events: List[TaskEvent]) -> None:
+        self._append(("c", [_task_row(t) for t in tasks], [_event_row(e) for e in events]))
+
+    def sync(self) -> None:
+        if self._fsync_interval <= 0:
+            self._fsync()
+
+    def _fsync(self) -> None:
+        # group commit: wątek, który czekał na _sync_lock, zwykle zastaje już swój rekord na dysku
+        if self._synced >= self._written:
+            return
+        with self._sync_lock:
+            with self._lock:
+                fd, upto = self._fd, self._written
+            if self._synced < upto:
+                os.fsync(fd)
+                self._synced = upto
+
+    def _roll(self) -> int:
+        # zamyka bieżące pokolenie WAL i otwiera następne; zwraca numer zamkniętego
+        with self._sync_lock, self._lock:
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._synced = self._written
+            self._since_snapshot = 0
+            closed = self._generation
+            self._open_wal(closed + 1)
+        return closed
+
+    # --- snapshot ---
+    def snapshot(self) -> None:
+        with self._snapshot_lock:
+            # pod blokadami tylko przecięcie WAL i płytkie kopie kontenerów; serializacja poza nimi.
+            # Obiekty mogą się zmienić przed zapisem — wtedy ich rekordy są w nowszym WAL-u,
+            # a odtwarzanie jest idempotentne (upsert zadań/użytkowników, zdarzenia po seq).
+            with self._tasks._lock, self._events._lock, self._users._lock:
+                covered = self._roll()
+                version = self._tasks._version
+                users = list(self._users._data.values())
+                tasks = list(self._tasks._data.values())
+                events = list(self._events._by_task.items())
+            self._write_snapshot(covered, version, users, tasks, events)
+            for gen in self._wal_generations():
+                if gen <= covered:
+                    os.remove(self._wal_path(gen))
+
+    def _write_snapshot(self, covered: int, version: int, users: List[User], tasks: List[Task], events: list) -> None:
+        # te same ramki co w WAL-u: porcje czytane potem przez marshal.loads z wycinków mmapy
+        # (marshal.load z obiektu pliku czyta małymi kawałkami i jest kilkukrotnie wolniejszy)
+        tmp = os.path.join(self._path, _SNAPSHOT + ".tmp")
+        with open(tmp, "wb") as f:
+            def dump(record: tuple) -> None:
+                f.write(_frame(marshal.dumps(record)))
+            f.write(_SNAPSHOT_MAGIC)
+            dump(("head", covered, version))
+            for i in range(0, len(users), _SNAPSHOT_CHUNK):
+                dump(("u", [_user_row(u) for u in users[i:i + _SNAPSHOT_CHUNK]]))
+            for i in range(0, len(tasks), _SNAPSHOT_CHUNK):
+                dump(("t", [_task_row(t) for t in tasks[i:i + _SNAPSHOT_CHUNK]]))
+            # zdarzenia per zadanie: task_id raz na zadanie, seq = pozycja na liście
+            chunk, size = [], 0
+            for task_id, lst in events:
+                rows = [(e.id, e.timestamp.isoformat(), e.type.name, e.meta) for e in list(lst)]
+                chunk.append((task_id, rows))
+                size += len(rows) + 1
+                if size >= _SNAPSHOT_CHUNK:
+                    dump(("e", chunk))
+                    chunk, size = [], 0
+            if chunk:
+                dump(("e", chunk))
+            dump(("end",))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self._path, _SNAPSHOT))
+        self._fsync_dir()
+
+    # --- odtwarzanie ---
+    def _recover(self) -> Tuple[int, int]:
+        covered = self._load_snapshot()
+        replayed = 0
+        gens = self._wal_generations()
+        for gen in gens:
+            if gen <= covered:
+                os.remove(self._wal_path(gen))  # zawarte w snapshocie (przerwane sprzątanie)
+            else:
+                replayed += self._replay_wal(gen)
+        self._generation = max([covered] + gens)
+        return covered, replayed
+
+    def _load_snapshot(self) -> int:
+        path = os.path.join(self._path, _SNAPSHOT)
+        if not os.path.exists(path):
+            return 0
+        tasks: List[Task] = []
+        by_task = self._events._by_task
+        complete = False
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            try:
+                if view[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+                    raise ValueError(f"Not a snapshot file: {path}")
+                records = (marshal.loads(payload) for _, payload in _frames(view[len(_SNAPSHOT_MAGIC):]))
+                _, covered, version = next(records, ("head", 0, 0))
+                for record in records:
+                    kind = record[0]
+                    if kind == "end":
+                        complete = True
+                    elif kind == "u":
+                        for r in record[1]:
+                            self._users._apply(_row_user(r))
+                    elif kind == "t":
+                        tasks.extend(_row_task(r) for r in record[1])
+                    else:
+                        event, parse, types = TaskEvent.from_storage, datetime.fromisoformat, _EVENT_TYPES
+                        for task_id, rows in record[1]:
+                            by_task[task_id] = [
+                                event(eid, task_id, parse(ts), types[typ], meta, seq)
+                                for seq, (eid, ts, typ, meta) in enumerate(rows, 1)
+                            ]
+                del records
+            finally:
+                view.release()
+        if not complete:
+            # snapshot trafia na miejsce dopiero po fsync, więc uszkodzony plik to błąd dysku, nie awaria
+            raise ValueError(f"Snapshot file is truncated or corrupt: {path}")
+        self._tasks._load(tasks)
+        self._tasks._version = version
+        return covered
+
+    def _replay_wal(self, gen: int) -> int:
+        path = self._wal_path(gen)
+        with open(path, "rb") as f:
+            data = f.read()
+        count, end = 0, 0
+        for end, payload in _frames(data):
+            record = marshal.loads(payload)
+            kind = record[0]
+            if kind == "u":
+                for r in record[1]:
+                    self._users._apply(_row_user(r))
+            elif kind == "t":
+                self._tasks._apply([_row_task(r) for r in record[1]])
+            elif kind == "e":
+                self._replay_events(record[1])
+            else:
+                self._tasks._apply([_row_task(r) for r in record[1]])
+                self._replay_events(record[2])
+            count += 1
+        if end < len(data):
+            # urwany ostatni rekord (awaria w trakcie zapisu) — odcinamy
+            os.truncate(path, end)
+        return count
+
+    def _replay_events(self, rows: List[tuple]) -> None:
+        by_task = self._events._by_task
+        fresh = []
+        last: Dict[str, int] = {}
+        for eid, task_id, ts, typ, meta, seq in rows:
+            have = last.get(task_id)
+            if have is None:
+                have = len(by_task.get(task_id, ()))
+            # zdarzenie mogło już trafić do snapshotu zrobionego po przecięciu WAL
+            if seq > have:
+                fresh.append(TaskEvent.from_storage(eid, task_id, datetime.fromisoformat(ts), _EVENT_TYPES[typ], meta, seq))
+                have = seq
+            last[task_id] = have
+        self._events._apply(fresh)
+
+    # --- w tle / zamknięcie ---
+    def _background(self) -> None:
+        tick = min(i for i in (self._fsync_interval, self._snapshot_interval) if i > 0)
+        last_snapshot = time.monotonic()
+        while not self._closed.wait(tick):
+            if self._fsync_interval > 0:
+                self._fsync()
+            if self._snapshot_interval > 0 and time.monotonic() - last_snapshot >= self._snapshot_interval:
+                last_snapshot = time.monotonic()
+                if self._since_snapshot:
+                    try:
+                        self.snapshot()
+                    except Exception:
+                        # WAL nadal rośnie i jest trwały — następna próba za snapshot_interval
+                        logger.exception("Background snapshot failed")
+
+    def stats(self) -> dict:
+        return {"wal_generation": self._generation, "wal_records": self._since_snapshot, "recovery": self.recovery}
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._worker is not None:
+            self._worker.join()
+        for repo in (self._users, self._tasks, self._events):
+            repo.journal = None
+        with self._sync_lock, self._lock:
+            os.fsync(self._fd)
+            os.close(self._fd)
@@ -1,29 +1,292 @@
-from typing import Optional, List, Dict
-from src.repo.interface import UsersRepository, TasksRepository, EventsRepository
+import bisect
+import heapq
+import threading
+from operator import attrgetter
+from datetime import datetime
+from typing import Collection, Iterable, Optional, List, Dict, Sequence, Set, Tuple
+from src.repo.interface import UsersRepository, TasksRepository, EventsRepository, TaskStatsRepository
+from src.repo.unit_of_work import UnitOfWork
 from src.domain.user import User
-from src.domain.task import Task
-from src.domain.event import TaskEvent
+from src.domain.task import Task, TaskStatus, Priority
+from src.domain.event import TaskEvent, EventType
+from src.repo.event_query import time_slice, select_events, is_ordered
+from src.repo.task_stats import StatsKey, count_stats, stats_delta, stats_key_of
 
 class InMemoryUsers(UsersRepository):
-    def __init__(self): self._data: Dict[str, User] = {}
+    def __init__(self):
+        self._data: Dict[str, User] = {}
+        self._by_login: Dict[Tuple[str, str], str] = {}  # (email, nickname) -> id
+        self._lock = threading.Lock()
+        self.journal = None  # opcjonalny WAL (MemoryPersistence)
     def get(self, user_id: str) -> Optional[User]: return self._data.get(user_id)
-    def add(self, user: User) -> None: self._data[user.id] = user
+    def add(self, user: User) -> None:
+        with self._lock:
+            self._apply(user)
+            if self.journal is not None:
+                self.journal.log_users([user])
+        if self.journal is not None:
+            self.journal.sync()
+    def _apply(self, user: User) -> None:
+        key = (user.email, user.nickname)
+        owner = self._by_login.get(key)
+        if owner is not None and owner != user.id:
+            raise ValueError("User with this email and nickname already exists")
+        prev = self._data.get(user.id)
+        if prev is not None:
+            self._by_login.pop((prev.email, prev.nickname), None)
+        self._data[user.id] = user
+        self._by_login[key] = user.id
     def find_by_email_and_nickname(self, email: str, nickname: str) -> Optional[User]:
-        for u in self._data.values():
-            if u.email == email and u.nickname == nickname:
-                return u
+        user_id = self._by_login.get((email, nickname))
+        return self._data[user_id] if user_id is not None else None
+
+# pola, po których trzymamy indeksy hashowe (wartość -> zbiór id zadań)
+_INDEXED = ("owner_id", "assignee_id", "status", "priority", "is_deleted")
+
+def _stats_key(keys: Optional[tuple]) -> Optional[StatsKey]:
+    # migawka _INDEXED -> klucz statystyk
+    if keys is None:
         return None
+    owner_id, assignee_id, status, priority, is_deleted = keys
+    return stats_key_of(owner_id, assignee_id, status.name, priority.name, is_deleted)
 
 class InMemoryTasks(TasksRepository):
-    def __init__(self): self._data: Dict[str, Task] = {}
+    def __init__(self):
+        self._data: Dict[str, Task] = {}
+        self._pos: Dict[str, int] = {}
+        self._order: List[str] = []  # posortowane id — klucz stronicowania keyset
+        self._keys: Dict[str, tuple] = {}
+        self._index: Dict[str, Dict[object, Set[str]]] = {f: {} for f in _INDEXED}
+        self._version = 0
+        self._lock = threading.Lock()
+        self.journal = None  # opcjonalny WAL (MemoryPersistence)
+        self.stats = None  # opcjonalne liczniki (TaskStatsRepository)
+
     def get(self, task_id: str) -> Optional[Task]: return self._data.get(task_id)
     def list(self) -> List[Task]: return list(self._data.values())
-    def add(self, task: Task) -> None: self._data[task.id] = task
-    def update(self, task: Task) -> None: self._data[task.id] = task
+    def add(self, task: Task) -> None: self.add_many([task])
+    def update(self, task: Task, fields: Optional[Iterable[str]] = None) -> None: self.add_many([task])
+    def version(self) -> int: return self._version
+
+    def add_many(self, tasks: List[Task]) -> None:
+        with self._lock:
+            self._apply(tasks)
+            if self.journal is not None and tasks:
+                self.journal.log_tasks(tasks)
+        if self.journal is not None:
+            self.journal.sync()
+
+    def _apply(self, tasks: List[Task]) -> None:
+        changes = []
+        for task in tasks:
+            if task.id not in self._pos:
+                self._pos[task.id] = len(self._pos)
+                bisect.insort(self._order, task.id)
+            self._data[task.id] = task
+            before = self._keys.get(task.id)
+            self._reindex(task)
+            changes.append((before, self._keys[task.id]))
+        if tasks:
+            self._version += 1
+        if self.stats is not None:
+            # zadania są mutowane w miejscu, więc stan "przed" to migawka kluczy z poprzedniego zapisu;
+            # pod blokadą zapisu — dwa commity tego samego zadania nie liczą tej samej zmiany
+            self.stats.apply(stats_delta((_stats_key(before), _stats_key(after)) for before, after in changes))
+
+    def rebuild_stats(self) -> None:
+        # z migawek kluczy pod blokadą zapisu — żaden commit nie wchodzi między przeliczenie a podmianę
+        with self._lock:
+            self.stats.replace(count_stats(map(_stats_key, self._keys.values())))
+
+    def _load(self, tasks: List[Task]) -> None:
+        # ładowanie snapshotu do pustego repozytorium: indeksy budowane hurtem
+        # (pole po polu) i _order sortowany raz, zamiast _reindex + insort per zadanie
+        ids = [t.id for t in tasks]
+        self._data = dict(zip(ids, tasks))
+        self._pos = {tid: i for i, tid in enumerate(ids)}
+        self._order = sorted(ids)
+        self._keys = dict(zip(ids, map(attrgetter(*_INDEXED), tasks)))
+        for f in _INDEXED:
+            groups: Dict[object, List[str]] = {}
+            for tid, value in zip(ids, map(attrgetter(f), tasks)):
+                bucket = groups.get(value)
+                if bucket is None:
+                    groups[value] = [tid]
+                else:
+                    bucket.append(tid)
+            self._index[f] = {value: set(bucket) for value, bucket in groups.items()}
+
+    def _reindex(self, task: Task) -> None:
+        # zadania są mutowane w miejscu przez serwis, więc poprzednie klucze
+        # bierzemy z migawki, a nie z obiektu
+        new = tuple(getattr(task, f) for f in _INDEXED)
+        old = self._keys.get(task.id)
+        if old == new:
+            return
+        for i, f in enumerate(_INDEXED):
+            if old is not None:
+                if old[i] == new[i]:
+                    continue
+                bucket = self._index[f][old[i]]
+                bucket.discard(task.id)
+                if not bucket:
+                    del self._index[f][old[i]]
+            self._index[f].setdefault(new[i], set()).add(task.id)
+        self._keys[task.id] = new
+
+    def query(
+        self,
+        *,
+        visible_to: Optional[str] = None,
+        status: Optional[TaskStatus] = None,
+        priority: Optional[Priority] = None,
+        include_deleted: bool = False,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[Task]:
+        # fields ignorowane: obiekty są już w pamięci, projekcję robi serializacja
+        with self._lock:
+            idx = self._index
+            candidates: List[Set[str]] = []
+            if visible_to is not None:
+                candidates.append(idx["owner_id"].get(visible_to, set()) | idx["assignee_id"].get(visible_to, set()))
+            if status is not None:
+                candidates.append(idx["status"].get(status, set()))
+            if priority is not None:
+                candidates.append(idx["priority"].get(priority, set()))
+            if not include_deleted:
+                candidates.append(idx["is_deleted"].get(False, set()))
+            candidates.sort(key=len)
+            if after is not None or limit is not None:
+                return [self._data[i] for i in self._page(candidates, after, limit)]
+            if not candidates:
+                return list(self._data.values())
+            ids = candidates[0]
+            for other in candidates[1:]:
+                if not ids:
+                    break
+                ids = ids & other
+            return [self._data[i] for i in sorted(ids, key=self._pos.__getitem__)]
+
+    def _page(self, candidates: List[Set[str]], after: Optional[str], limit: Optional[int]) -> List[str]:
+        # strona po kluczu id > after; koszt nie zależy od "głębokości" strony.
+        # Przejście po posortowanym _order kosztuje ~limit * n / |kandydaci|,
+        # sortowanie najmniejszego zbioru ~|kandydaci| — wybieramy tańsze.
+        n = len(self._order)
+        want = n if limit is None else limit
+        if not candidates or len(candidates[0]) ** 2 > want * n:
+            out: List[str] = []
+            start = 0 if after is None else bisect.bisect_right(self._order, after)
+            for i in range(start, n):
+                tid = self._order[i]
+                if all(tid in s for s in candidates):
+                    out.append(tid)
+                    if len(out) == want:
+                        break
+            return out
+        rest = candidates[1:]
+        ids = (
+            tid for tid in candidates[0]
+            if (after is None or tid > after) and all(tid in s for s in rest)
+        )
+        return heapq.nsmallest(want, ids)
 
 class InMemoryEvents(EventsRepository):
-    def __init__(self): self._by_task: Dict[str, List[TaskEvent]] = {}
-    def add(self, event: TaskEvent) -> None:
-        self._by_task.setdefault(event.task_id, []).append(event)
-    def list_for_task(self, task_id: str) -> List[TaskEvent]:
-        return sorted(self._by_task.get(task_id, []), key=lambda e: e.timestamp)
\ No newline at end of file
+    def __init__(self):
+        self._by_task: Dict[str, List[TaskEvent]] = {}
+        self._ordered: Dict[str, bool] = {}  # czy znaczniki czasu zadania nie maleją — liczone przy pierwszym zapytaniu o czas
+        self._lock = threading.Lock()
+        self.journal = None  # opcjonalny WAL (MemoryPersistence)
+    def add(self, event: TaskEvent) -> None: self.add_many([event])
+    def add_many(self, events: List[TaskEvent]) -> None:
+        with self._lock:
+            self._apply(events)
+            if self.journal is not None and events:
+                self.journal.log_events(events)
+        if self.journal is not None:
+            self.journal.sync()
+    def _apply(self, events: List[TaskEvent]) -> None:
+        for event in events:
+            lst = self._by_task.setdefault(event.task_id, [])
+            if lst and self._ordered.get(event.task_id) and event.timestamp < lst[-1].timestamp:
+                self._ordered[event.task_id] = False
+            event.seq = len(lst) + 1
+            lst.append(event)
+    def list_for_task(
+        self,
+        task_id: str,
+        after_seq: int = 0,
+        *,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        types: Optional[Collection[EventType]] = None,
+        limit: Optional[int] = None,
+    ) -> List[TaskEvent]:
+        # lista jest w kolejności seq (seq == pozycja + 1), więc after_seq to przesunięcie
+        lst = self._by_task.get(task_id, [])
+        start, end = after_seq, len(lst)
+        if (after is not None or before is not None) and self._is_ordered(task_id, lst):
+            start, end = time_slice(end, lambda i: lst[i].timestamp, start, after, before)
+            after = before = None
+        if after is None and before is None and types is None:
+            return lst[start:end if limit is None else min(end, start + limit)]
+        return list(select_events((lst[i] for i in range(start, end)), after, before, types, limit))
+    def _is_ordered(self, task_id: str, lst: List[TaskEvent]) -> bool:
+        ordered = self._ordered.get(task_id)
+        if ordered is None:
+            with self._lock:  # pod blokadą zapisu: dopisane w trakcie zdarzenie nie umknie
+                ordered = self._ordered[task_id] = is_ordered(e.timestamp for e in lst)
+        return ordered
+    def last_seq(self, task_id: str) -> int:
+        return len(self._by_task.get(task_id, ()))
+
+class InMemoryTaskStats(TaskStatsRepository):
+    # zakres -> {licznik -> liczba}; zerowe liczniki są usuwane — słownik nie rośnie o użytkowników bez zadań.
+    # Bez trwałości — przy starcie odtwarzane z zadań (rebuild_stats)
+    def __init__(self):
+        self._scopes: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+    def get(self, scope: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._scopes.get(scope, {}))
+    def apply(self, delta: Dict[Tuple[str, str], int]) -> None:
+        with self._lock:
+            for (scope, name), by in delta.items():
+                counters = self._scopes.setdefault(scope, {})
+                n = counters.get(name, 0) + by
+                if n:
+                    counters[name] = n
+                else:
+                    counters.pop(name, None)
+                    if not counters:
+                        del self._scopes[scope]
+    def replace(self, counts: Dict[Tuple[str, str], int]) -> None:
+        scopes: Dict[str, Dict[str, int]] = {}
+        for (scope, name), n in counts.items():
+            if n:
+                scopes.setdefault(scope, {})[name] = n
+        with self._lock:
+            self._scopes = scopes  # podmiana w całości — odczyt widzi stare albo nowe liczniki
+            self.stale = False
+
+
+class InMemoryUnitOfWork(UnitOfWork):
+    def __init__(self, tasks: InMemoryTasks, events: InMemoryEvents):
+        super().__init__()
+        self._tasks = tasks
+        self._events = events
+
+    def _flush(self) -> None:
+        # jeden commit pod oboma blokadami (zawsze w tej samej kolejności):
+        # czytelnicy nie zobaczą zmiany zadania bez jej zdarzenia
+        tasks = self.new_tasks + [t for t, _ in self.task_updates]
+        journal = self._tasks.journal
+        with self._tasks._lock, self._events._lock:
+            self._tasks._apply(tasks)
+            self._events._apply(self.new_events)
+            if journal is not None:
+                # jeden rekord WAL na commit — odtworzenie też jest wszystko albo nic
+                journal.log_commit(tasks, self.new_events)
+        if journal is not None:
+            journal.sync()  # poza blokadami: czytelnicy nie czekają na fsync
@@ -1,12 +1,53 @@
+import logging
 import os
-from typing import Optional, List
+from typing import Any, Collection, Dict, Iterable, Iterator, Optional, List, Sequence, Tuple, Union
 from datetime import datetime
-from pymongo import MongoClient, ASCENDING
+from bson import ObjectId
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 
-from src.repo.interface import UsersRepository, TasksRepository, EventsRepository
+from src.repo.interface import UsersRepository, TasksRepository, EventsRepository, TaskStatsRepository
+from src.repo.unit_of_work import UnitOfWork
 from src.domain.user import User, Role, Status
-from src.domain.task import Task, TaskStatus, Priority
+from src.domain.task import Task, TaskStatus, Priority, PartialTask
 from src.domain.event import TaskEvent, EventType
+from src.repo.task_stats import STATS_FIELDS, Counts, StatsKey, count_stats, stats_delta, stats_key, stats_key_of
+
+log = logging.getLogger(__name__)
+
+
+# --------- klient (wspólna pula połączeń) ---------
+# zmienna środowiskowa -> opcja MongoClient; ustawiane tylko jeśli podane
+_CLIENT_INT_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": "maxPoolSize",
+    "MONGO_MIN_POOL_SIZE": "minPoolSize",
+    "MONGO_MAX_IDLE_TIME_MS": "maxIdleTimeMS",
+    "MONGO_CONNECT_TIMEOUT_MS": "connectTimeoutMS",
+    "MONGO_SOCKET_TIMEOUT_MS": "socketTimeoutMS",
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": "serverSelectionTimeoutMS",
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": "waitQueueTimeoutMS",
+}
+
+def client_options_from_env() -> dict:
+    opts = {}
+    for env, opt in _CLIENT_INT_OPTIONS.items():
+        raw = os.environ.get(env)
+        if raw:
+            try:
+                opts[opt] = int(raw)
+            except ValueError:
+                raise ValueError(f"{env} must be an integer")
+    compressors = os.environ.get("MONGO_COMPRESSORS")
+    if compressors:
+        opts["compressors"] = compressors
+    return opts
+
+def create_client(uri: Optional[str] = None) -> MongoClient:
+    mongo_uri = uri or os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+    return MongoClient(mongo_uri, **client_options_from_env())
+
+def _db_name(db_name: Optional[str]) -> str:
+    return db_name or os.environ.get("MONGO_DB", "taskmgr")
 
 
 # --------- mapowania ---------
@@ -27,14 +68,14 @@ def _doc_to_user(d: dict) -> User:
     fallback_nick = f"user_{d.get('_id', 'x')}".replace("-", "_")[:32]
     nickname = (d.get("nickname") or fallback_nick).strip()
 
-    return User(
-        id=d["_id"],
-        email=d["email"],
-        role=Role[d["role"]],
-        status=Status[d["status"]],
-        first_name=first_name,
-        last_name=last_name,
-        nickname=nickname,
+    return User.from_storage(
+        d["_id"],
+        d["email"],
+        Role[d["role"]],
+        Status[d["status"]],
+        first_name,
+        last_name,
+        nickname,
     )
 def _task_to_doc(t: "Task") -> dict:
     return {
@@ -50,18 +91,84 @@ def _task_to_doc(t: "Task") -> dict:
     }
 
 def _doc_to_task(d: dict) -> "Task":
-    return Task(
-        id=d["_id"],
-        title=d["title"],
-        description=d.get("description", ""),
-        status=TaskStatus[d["status"]],
-        priority=Priority[d["priority"]],
-        owner_id=d["owner_id"],
-        assignee_id=d.get("assignee_id"),
-        due_date=d.get("due_date"),
-        is_deleted=bool(d.get("is_deleted", False)),
+    return Task.from_storage(
+        d["_id"],
+        d["title"],
+        d.get("description", ""),
+        TaskStatus[d["status"]],
+        Priority[d["priority"]],
+        d["owner_id"],
+        d.get("assignee_id"),
+        d.get("due_date"),
+        bool(d.get("is_deleted", False)),
     )
 
+def _task_projection(fields: Sequence[str]) -> dict:
+    return {("_id" if f == "id" else f): 1 for f in fields}
+
+def _doc_to_partial_task(d: dict, fields: Sequence[str]) -> PartialTask:
+    values = {}
+    for f in fields:
+        if f == "id":
+            values["id"] = d["_id"]
+        elif f == "status":
+            values["status"] = TaskStatus[d["status"]]
+        elif f == "priority":
+            values["priority"] = Priority[d["priority"]]
+        elif f == "is_deleted":
+            values["is_deleted"] = bool(d.get("is_deleted", False))
+        else:
+            values[f] = d.get(f, "" if f == "description" else None)
+    return PartialTask(**values)
+
+def _task_query_filter(
+    visible_to: Optional[str] = None,
+    status: Optional[TaskStatus] = None,
+    priority: Optional[Priority] = None,
+    include_deleted: bool = False,
+) -> dict:
+    clauses = []
+    if visible_to is not None:
+        clauses.append({"$or": [{"owner_id": visible_to}, {"assignee_id": visible_to}]})
+    if not include_deleted:
+        clauses.append({"is_deleted": {"$ne": True}})  # także dokumenty bez pola
+    if status is not None:
+        clauses.append({"status": status.name})
+    if priority is not None:
+        clauses.append({"priority": priority.name})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def _changed_fields(t: "Task", fields: Iterable[str]) -> dict:
+    # tylko zmienione pola — mniejszy zapis i mniejszy wpis w oplogu
+    doc = _task_to_doc(t)
+    changes = {}
+    for f in fields:
+        if f == "_id" or f not in doc:
+            raise ValueError(f"Unknown task field: {f}")
+        changes[f] = doc[f]
+    return changes
+
+# metadane magazynu (wersja zadań, liczniki statystyk) leżą w kolekcji zdarzeń: commit UoW zapisuje je
+# tym samym bulk_write co zdarzenia. task_id = własne _id (z \x1f, poza przestrzenią id zadań) — unikalny
+# indeks (task_id, seq) je przyjmuje, a zapytania o historię (zawsze po task_id) ich nie widzą
+_VERSION_ID = "\x1ftasks"
+_VERSION_BUMP = ({"_id": _VERSION_ID}, {"$inc": {"version": 1}, "$setOnInsert": {"task_id": _VERSION_ID}})
+
+# licznik numerów zdarzeń w dokumencie zadania: $inc tym samym zapisem co zmiana zadania
+_EVENT_SEQ = "event_seq"
+
+_STATS_PROJECTION = {f: 1 for f in STATS_FIELDS}
+_WRITE_PROJECTION = {**_STATS_PROJECTION, _EVENT_SEQ: 1}
+
+def _doc_stats_key(d: Optional[dict]) -> Optional[StatsKey]:
+    if d is None:
+        return None
+    return stats_key_of(d["owner_id"], d.get("assignee_id"), d["status"], d["priority"], d.get("is_deleted", False))
+
+_EVENTS_TIME_INDEX = [("task_id", ASCENDING), ("timestamp", ASCENDING)]
+
 def _event_to_doc(e: TaskEvent) -> dict:
     return {
         "_id": e.id,
@@ -69,36 +176,44 @@ def _event_to_doc(e: TaskEvent) -> dict:
         "timestamp": e.timestamp,
         "type": e.type.name,
         "meta": e.meta,
+        "seq": e.seq,
     }
 
 def _doc_to_event(d: dict) -> TaskEvent:
-    return TaskEvent(
-        id=d["_id"],
-        task_id=d["task_id"],
-        timestamp=d["timestamp"],
-        type=EventType[d["type"]],
-        meta=d.get("meta", {}),
+    return TaskEvent.from_storage(
+        d["_id"],
+        d["task_id"],
+        d["timestamp"],
+        EventType[d["type"]],
+        d.get("meta", {}),
+        d.get("seq", 0),
     )
 
 
 # --------- Users ---------
 class MongoUsers(UsersRepository):
-    def __init__(self, collection=None, uri=None, db_name=None, collection_name="users"):
+    def __init__(self, collection=None, uri=None, db_name=None, collection_name="users", client=None):
         if collection is not None:
             self._collection = collection
             self._client = None
             return
-        mongo_uri = uri or os.environ.get("MONGO_URI", "mongodb://localhost:27017")
-        mongo_db = db_name or os.environ.get("MONGO_DB", "taskmgr")
-        self._client = MongoClient(mongo_uri)
-        self._collection = self._client[mongo_db][collection_name]
+        self._client = client or create_client(uri)
+        self._collection = self._client[_db_name(db_name)][collection_name]
 
     def get(self, user_id: str) -> Optional[User]:
         d = self._collection.find_one({"_id": user_id})
         return _doc_to_user(d) if d else None
 
+    def ensure_indexes(self) -> None:
+        self._collection.create_index(
+            [("email", ASCENDING), ("nickname", ASCENDING)], unique=True, name="email_nickname_unique"
+        )
+
     def add(self, user: User) -> None:
-        self._collection.replace_one({"_id": user.id}, _user_to_doc(user), upsert=True)
+        try:
+            self._collection.replace_one({"_id": user.id}, _user_to_doc(user), upsert=True)
+        except DuplicateKeyError:
+            raise ValueError("User with this email and nickname already exists")
 
     def find_by_email_and_nickname(self, email: str, nickname: str) -> Optional[User]:
         d = self._collection.find_one({"email": email, "nickname": nickname})
@@ -107,46 +222,373 @@ class MongoUsers(UsersRepository):
 
 # --------- Tasks ---------
 class MongoTasks(TasksRepository):
-    def __init__(self, collection=None, uri=None, db_name=None, collection_name="tasks"):
+    def __init__(
+        self, collection=None, uri=None, db_name=None, collection_name="tasks", client=None, meta=None,
+        transactions: bool = False,
+    ):
+        self.stats = None  # opcjonalne liczniki (MongoTaskStats w kolekcji zdarzeń — zapis razem z wersją)
+        self._transactions = transactions
         if collection is not None:
             self._collection = collection
+            self._meta = meta if meta is not None else collection.database["events"]
             self._client = None
             return
-        mongo_uri = uri or os.environ.get("MONGO_URI", "mongodb://localhost:27017")
-        mongo_db = db_name or os.environ.get("MONGO_DB", "taskmgr")
-        self._client = MongoClient(mongo_uri)
-        self._collection = self._client[mongo_db][collection_name]
+        self._client = client or create_client(uri)
+        db = self._client[_db_name(db_name)]
+        self._collection = db[collection_name]
+        self._meta = meta if meta is not None else db["events"]
+
+    def ensure_indexes(self) -> None:
+        # ścieżki dostępu z query(): owner/assignee (równość), potem _id (kolejność stron),
+        # potem is_deleted/status/priority sprawdzane na kluczach indeksu. _id zaraz po polu
+        # równości: gałęzie $or idą po indeksie w kolejności _id (scalane bez sortowania),
+        # a strona kończy się po `limit` dopasowaniach — is_deleted ($ne) przed _id
+        # wymuszałby sortowanie całego wyniku w pamięci
+        for who in ("owner_id", "assignee_id"):
+            self._collection.create_index(
+                [(who, ASCENDING), ("_id", ASCENDING), ("is_deleted", ASCENDING),
+                 ("status", ASCENDING), ("priority", ASCENDING)],
+                name=f"{who}_visibility_by_id",
+            )
+        self._collection.create_index(
+            [("is_deleted", ASCENDING), ("status", ASCENDING), ("priority", ASCENDING)], name="manager_filters"
+        )
 
     def add(self, task: "Task") -> None:
-        self._collection.replace_one({"_id": task.id}, _task_to_doc(task), upsert=True)
+        self._commit([], [(task, None)])
+
+    def add_many(self, tasks: List["Task"]) -> None:
+        if tasks:
+            self._commit(tasks, [])
+
+    def version(self) -> int:
+        d = self._meta.find_one({"_id": _VERSION_ID})
+        return d.get("version", 0) if d else 0
 
     def get(self, task_id: str) -> Optional["Task"]:
         d = self._collection.find_one({"_id": task_id})
         return _doc_to_task(d) if d else None
 
-    def update(self, task: "Task") -> None:
-        self._collection.replace_one({"_id": task.id}, _task_to_doc(task), upsert=True)
+    def update(self, task: "Task", fields: Optional[Iterable[str]] = None) -> None:
+        self._commit([], [(task, fields)])
+
+    def _write_op(self, task: "Task", fields: Optional[Iterable[str]] = None):
+        return UpdateOne({"_id": task.id}, self._update_doc(task, fields), upsert=not fields)
+
+    @staticmethod
+    def _update_doc(task: "Task", fields: Optional[Iterable[str]], events: int = 0) -> dict:
+        # pełny zapis to $set wszystkich pól, nie replace — podmiana dokumentu zgubiłaby event_seq
+        if fields:
+            update = {"$set": _changed_fields(task, fields)}
+        else:
+            update = {"$set": {k: v for k, v in _task_to_doc(task).items() if k != "_id"}}
+        if events:
+            update["$inc"] = {_EVENT_SEQ: events}
+        return update
+
+    def _commit(self, new: List["Task"], updates: List[Tuple["Task", Optional[Iterable[str]]]], session=None) -> None:
+        delta, _ = self._write(new, updates, session=session)
+        self._write_meta([], delta, session=session)
+
+    def _write_meta(self, docs: List[dict], delta: Counts, session=None) -> None:
+        # wersja i liczniki statystyk jednym uporządkowanym bulk_write — razem z `docs` (zdarzenia UoW,
+        # kolekcja metadanych = kolekcja zdarzeń) i zawsze PO zapisie zadań: czytelnik, który zobaczy
+        # nową wersję, widzi też dane
+        ops = [InsertOne(d) for d in docs] + [UpdateOne(*_VERSION_BUMP, upsert=True)]
+        if delta:
+            ops += self.stats._write_ops(delta)
+        try:
+            self._meta.bulk_write(ops, ordered=True, session=session)
+        except PyMongoError as e:
+            if session is not None:
+                raise  # w transakcji błąd wycofuje także zadania
+            # bez transakcji zadania są już zapisane: wersja musi się zmienić (ETag) — ponowne podbicie,
+            # gdy pierwsze przeszło, niczego nie psuje — a liczniki są nieaktualne do odbudowy
+            if delta:
+                log.exception("Task stats update failed; stats marked stale")
+                self.stats.stale = True
+            self._meta.update_one(*_VERSION_BUMP, upsert=True)
+            inserted = e.details.get("nInserted", 0) if isinstance(e, BulkWriteError) else 0
+            if not delta or inserted < len(docs):
+                raise  # błąd samej wersji albo zdarzeń — jak wcześniej, żądanie się nie udaje
+
+    def _write(
+        self,
+        new: List["Task"],
+        updates: List[Tuple["Task", Optional[Iterable[str]]]],
+        events: Optional[Dict[str, int]] = None,
+        session=None,
+    ) -> Tuple[Counts, Dict[str, int]]:
+        # `events`: ile zdarzeń ma zadanie — numery seq rezerwuje $inc event_seq w dokumencie zadania,
+        # tym samym zapisem co zmiana (bez osobnego licznika). Zwraca deltę statystyk i pierwszy seq
+        # per zadanie. Aktualizacje z rezerwacją albo ze statystykami idą pojedynczo z
+        # return_document=BEFORE: seq i delta z zapisanego stanu sprzed zmiany, więc równoległe zmiany
+        # tego samego zadania nie dublują numerów ani nie przesuwają liczników dwa razy
+        events = events or {}
+        ops = [InsertOne({**_task_to_doc(t), _EVENT_SEQ: events.get(t.id, 0)}) for t in new]
+        first = {t.id: 1 for t in new if t.id in events}
+        changes = [(None, stats_key(t)) for t in new]
+        returning = []
+        for t, fields in updates:
+            if self.stats is None and t.id not in events:
+                ops.append(self._write_op(t, fields))
+            else:
+                returning.append((t, fields))
+        if ops:
+            self._collection.bulk_write(ops, ordered=True, session=session)
+        for t, fields in returning:
+            n = events.get(t.id, 0)
+            before, after = self._update_returning(t, fields, n, session)
+            if n:
+                first[t.id] = (before or {}).get(_EVENT_SEQ, 0) + 1
+            changes.append((_doc_stats_key(before), after))
+        return (stats_delta(changes) if self.stats is not None else {}), first
+
+    def _update_returning(self, task: "Task", fields: Optional[Iterable[str]], events: int, session=None):
+        update = self._update_doc(task, fields, events)
+        before = self._collection.find_one_and_update(
+            {"_id": task.id}, update, projection=_WRITE_PROJECTION, upsert=not fields,
+            return_document=ReturnDocument.BEFORE, session=session,
+        )
+        if before is None and fields:
+            return None, None  # brak dokumentu — nic nie zapisano
+        return before, _doc_stats_key({**(before or {}), **update["$set"]})
+
+    def rebuild_stats(self) -> None:
+        # z transakcjami przeliczenie i podmiana to jeden snapshot — równoległy $inc na tym samym
+        # liczniku kończy się konfliktem zapisu i ponowieniem. Bez transakcji best-effort:
+        # zapis w trakcie przeliczania może się zgubić (odbudowa przy wstrzymanym ruchu)
+        if not self._transactions:
+            self._rebuild_stats()
+            return
+        with self._collection.database.client.start_session() as session:
+            session.with_transaction(self._rebuild_stats)
+
+    def _rebuild_stats(self, session=None) -> None:
+        cur = self._collection.find({"is_deleted": {"$ne": True}}, _STATS_PROJECTION, session=session)
+        self.stats.replace(count_stats(map(_doc_stats_key, cur)), session=session)
 
     def list(self) -> List["Task"]:
         return [_doc_to_task(d) for d in self._collection.find({})]
 
+    def query(self, **filters) -> List[Union["Task", PartialTask]]:
+        return list(self.iter_query(**filters))
+
+    def iter_query(
+        self,
+        *,
+        visible_to: Optional[str] = None,
+        status: Optional[TaskStatus] = None,
+        priority: Optional[Priority] = None,
+        include_deleted: bool = False,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Iterator[Union["Task", PartialTask]]:
+        # kursor pobiera dokumenty partiami, więc w pamięci jest tylko bieżąca partia
+        flt = _task_query_filter(visible_to, status, priority, include_deleted)
+        if after is not None:
+            flt = {"$and": [flt, {"_id": {"$gt": after}}]} if flt else {"_id": {"$gt": after}}
+        projection = _task_projection(fields) if fields else None
+        cur = self._collection.find(flt, projection)
+        if after is not None or limit is not None:
+            cur = cur.sort([("_id", ASCENDING)])
+        if limit is not None:
+            cur = cur.limit(limit)
+        if fields:
+            return (_doc_to_partial_task(d, fields) for d in cur)
+        return (_doc_to_task(d) for d in cur)
+
 
 # --------- Events ---------
 class MongoEvents(EventsRepository):
-    def __init__(self, collection=None, uri=None, db_name=None, collection_name="events"):
+    def __init__(self, collection=None, uri=None, db_name=None, collection_name="events", client=None, tasks=None):
+        # `tasks` — kolekcja zadań: licznik seq to pole event_seq w dokumencie zadania
         if collection is not None:
             self._collection = collection
+            self._tasks = tasks if tasks is not None else collection.database["tasks"]
             self._client = None
             return
-        mongo_uri = uri or os.environ.get("MONGO_URI", "mongodb://localhost:27017")
-        mongo_db = db_name or os.environ.get("MONGO_DB", "taskmgr")
-        self._client = MongoClient(mongo_uri)
-        self._collection = self._client[mongo_db][collection_name]
-        self._collection.create_index([("task_id", ASCENDING), ("timestamp", ASCENDING)])
+        self._client = client or create_client(uri)
+        db = self._client[_db_name(db_name)]
+        self._collection = db[collection_name]
+        self._tasks = tasks if tasks is not None else db["tasks"]
+        self.ensure_indexes()
+
+    def ensure_indexes(self) -> None:
+        self._collection.create_index(_EVENTS_TIME_INDEX)
+        self._collection.create_index([("task_id", ASCENDING), ("seq", ASCENDING)], unique=True, name="task_seq_unique")
 
     def add(self, event: TaskEvent) -> None:
-        self._collection.insert_one(_event_to_doc(event))
+        self.add_many([event])
+
+    def _reserve_seqs(self, counts: Dict[str, int], session=None) -> Dict[str, int]:
+        # zdarzenia bez zapisu zadania: jeden round trip na zadanie, $inc rezerwuje zakres n numerów.
+        # Bez upsertu — dokument z samym licznikiem byłby niepełnym zadaniem
+        first: Dict[str, int] = {}
+        for tid, n in counts.items():
+            d = self._tasks.find_one_and_update(
+                {"_id": tid}, {"$inc": {_EVENT_SEQ: n}}, projection={_EVENT_SEQ: 1},
+                return_document=ReturnDocument.AFTER, session=session,
+            )
+            if d is None:
+                raise ValueError(f"Task not found: {tid}")
+            first[tid] = d[_EVENT_SEQ] - n + 1
+        return first
+
+    @staticmethod
+    def _count(events: List[TaskEvent]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for e in events:
+            counts[e.task_id] = counts.get(e.task_id, 0) + 1
+        return counts
+
+    @staticmethod
+    def _number(events: List[TaskEvent], first: Dict[str, int]) -> List[dict]:
+        nxt = dict(first)
+        for e in events:
+            e.seq = nxt[e.task_id]
+            nxt[e.task_id] += 1
+        return [_event_to_doc(e) for e in events]
+
+    def add_many(self, events: List[TaskEvent], session=None) -> None:
+        if not events:
+            return
+        docs = self._number(events, self._reserve_seqs(self._count(events), session=session))
+        self._collection.insert_many(docs, session=session)
+
+    def list_for_task(self, task_id: str, after_seq: int = 0, **filters) -> List[TaskEvent]:
+        return list(self.iter_for_task(task_id, after_seq, **filters))
+
+    def iter_for_task(
+        self,
+        task_id: str,
+        after_seq: int = 0,
+        *,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        types: Optional[Collection[EventType]] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[TaskEvent]:
+        flt: Dict[str, Any] = {"task_id": task_id}
+        if after_seq:
+            flt["seq"] = {"$gt": after_seq}
+        if after is not None or before is not None:
+            flt["timestamp"] = {k: v for k, v in (("$gt", after), ("$lt", before)) if v is not None}
+        if types is not None:
+            flt["type"] = {"$in": [t.name for t in types]}
+        cur = self._collection.find(flt)
+        if "timestamp" in flt:
+            # zakres czasu zawęża skan indeksu (task_id, timestamp); sortowanie po seq obejmuje
+            # tylko dopasowane dokumenty (z limitem: top-k). Bez hintu planer wybiera indeks po seq
+            cur = cur.hint(_EVENTS_TIME_INDEX)
+        cur = cur.sort([("seq", ASCENDING)])
+        if limit is not None:
+            cur = cur.limit(limit)
+        return (_doc_to_event(d) for d in cur)
+
+    def last_seq(self, task_id: str) -> int:
+        # z kolekcji zdarzeń (indeks task_seq_unique), nie z licznika: event_seq zadania
+        # rezerwuje numery przed insertem, więc mógłby wyprzedzać zapisane dane
+        d = self._collection.find_one({"task_id": task_id}, projection={"seq": 1}, sort=[("seq", DESCENDING)])
+        return d.get("seq", 0) if d else 0
+
+
+# --------- Statystyki zadań ---------
+def _stat_id(scope: str, name: str) -> str:
+    # licznik = dokument; nazwy zawierają id użytkowników, więc nie mogą być kluczami pól ($inc "counts.<id>")
+    return f"{scope}\x1f{name}"
+
+class MongoTaskStats(TaskStatsRepository):
+    # liczniki obok wersji zadań w kolekcji zdarzeń: MongoTasks zapisuje deltę tym samym bulk_write
+    # co wersję (i zdarzenia UoW); task_id = _id licznika, patrz _VERSION_ID
+    def __init__(self, collection=None, uri=None, db_name=None, collection_name="events", client=None):
+        if collection is not None:
+            self._collection = collection
+            self._client = None
+            return
+        self._client = client or create_client(uri)
+        self._collection = self._client[_db_name(db_name)][collection_name]
+
+    def ensure_indexes(self) -> None:
+        # sparse: zdarzenia w tej samej kolekcji nie mają pola scope
+        self._collection.create_index([("scope", ASCENDING)], sparse=True)
+
+    def get(self, scope: str) -> Dict[str, int]:
+        cur = self._collection.find({"scope": scope}, {"name": 1, "count": 1})
+        return {d["name"]: d["count"] for d in cur if d["count"]}
+
+    def apply(self, delta: Dict[Tuple[str, str], int]) -> None:
+        # $inc jest atomowy per dokument — równoległe procesy (workery) nie gubią przyrostów
+        if delta:
+            self._collection.bulk_write(self._write_ops(delta), ordered=False)
 
-    def list_for_task(self, task_id: str) -> List[TaskEvent]:
-        cur = self._collection.find({"task_id": task_id}).sort([("timestamp", ASCENDING)])
-        return [_doc_to_event(d) for d in cur]
\ No newline at end of file
+    @staticmethod
+    def _write_ops(delta: Dict[Tuple[str, str], int]) -> List[UpdateOne]:
+        return [
+            UpdateOne(
+                {"_id": _stat_id(scope, name)},
+                {"$inc": {"count": by}, "$setOnInsert": {"scope": scope, "name": name, "task_id": _stat_id(scope, name)}},
+                upsert=True,
+            )
+            for (scope, name), by in delta.items()
+        ]
+
+    def replace(self, counts: Dict[Tuple[str, str], int], session=None) -> None:
+        # nadpisanie w miejscu zamiast delete+insert: czytelnik nie widzi pustych liczników,
+        # a równoległy upsert z apply nie koliduje z insertem; liczniki spoza nowego zestawu
+        # (rev z poprzedniej odbudowy) są zerowane
+        rev = ObjectId()
+        ops = [
+            UpdateOne(
+                {"_id": _stat_id(scope, name)},
+                {"$set": {"scope": scope, "name": name, "count": n, "rev": rev, "task_id": _stat_id(scope, name)}},
+                upsert=True,
+            )
+            for (scope, name), n in counts.items() if n
+        ]
+        if ops:
+            self._collection.bulk_write(ops, ordered=False, session=session)
+        self._collection.delete_many({"scope": {"$exists": True}, "rev": {"$ne": rev}}, session=session)
+        self.stale = False
+
+
+# --------- Unit of work ---------
+class MongoUnitOfWork(UnitOfWork):
+    def __init__(self, tasks: MongoTasks, events: MongoEvents, client=None, transactions: bool = False):
+        super().__init__()
+        self._tasks = tasks
+        self._events = events
+        self._client = client
+        self._transactions = transactions
+
+    def _write(self, session=None) -> None:
+        # dwa round trippy na commit: zapis zadań z rezerwacją seq (event_seq w dokumencie zadania,
+        # patrz MongoTasks._write), potem jeden bulk_write zdarzeń z wersją i licznikami statystyk.
+        # Atomowość całości tylko z transakcjami (MONGO_TRANSACTIONS=1): bez nich awaria między
+        # zapisami zostawia zmianę zadania bez zdarzenia (i lukę w seq)
+        counts = self._events._count(self.new_events)
+        if not (self.new_tasks or self.task_updates):
+            self._events.add_many(self.new_events, session=session)
+            return
+        written = {t.id for t in self.new_tasks} | {t.id for t, _ in self.task_updates}
+        delta, first = self._tasks._write(
+            self.new_tasks, self.task_updates, {tid: n for tid, n in counts.items() if tid in written}, session=session,
+        )
+        # zdarzenia zadań spoza tego commitu — rezerwacja osobno
+        first.update(self._events._reserve_seqs({tid: n for tid, n in counts.items() if tid not in first}, session))
+        docs = self._events._number(self.new_events, first)
+        if self._tasks._meta != self._events._collection:
+            # metadane poza kolekcją zdarzeń (inna konfiguracja) — osobny insert
+            if docs:
+                self._events._collection.insert_many(docs, session=session)
+            docs = []
+        self._tasks._write_meta(docs, delta, session=session)
+
+    def _flush(self) -> None:
+        if not self._transactions:
+            self._write()
+            return
+        # transakcje wymagają replica setu (MONGO_TRANSACTIONS=1)
+        with self._client.start_session() as session:
+            session.with_transaction(self._write)
@@ -0,0 +1,44 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Iterator, Optional
+from src.domain.user import User
+from src.domain.task import Task
+
+# Zakres requestu w ContextVar — wspólny dla mapy tożsamości (identity_map.py)
+# i dla wszystkiego, co liczy wywołania (count_call), np. UnitOfWork.
+
+class RequestScope:
+    # mapa tożsamości na czas jednego requestu (albo jawnego kontekstu serwisu)
+    # + liczniki faktycznych wywołań repozytoriów
+    def __init__(self):
+        self.users: Dict[str, Optional[User]] = {}
+        self.tasks: Dict[str, Optional[Task]] = {}
+        self.calls: Counter = Counter()
+
+    def format_calls(self) -> str:
+        return ",".join(f"{name}={n}" for name, n in sorted(self.calls.items()))
+
+_current: ContextVar[Optional[RequestScope]] = ContextVar("repo_request_scope", default=None)
+
+def current_scope() -> Optional[RequestScope]:
+    return _current.get()
+
+def begin_scope() -> Token:
+    return _current.set(RequestScope())
+
+def end_scope(token: Token) -> None:
+    _current.reset(token)
+
+@contextmanager
+def request_scope() -> Iterator[RequestScope]:
+    token = begin_scope()
+    try:
+        yield _current.get()
+    finally:
+        end_scope(token)
+
+def count_call(name: str) -> None:
+    scope = _current.get()
+    if scope is not None:
+        scope.calls[name] += 1
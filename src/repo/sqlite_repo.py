@@ -0,0 +1,509 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from src.repo.interface import UsersRepository, TasksRepository, EventsRepository, TaskStatsRepository
+from src.repo.unit_of_work import UnitOfWork
+from src.domain.user import User, Role, Status
+from src.domain.task import Task, TaskStatus, Priority, PartialTask, TASK_FIELDS
+from src.domain.event import TaskEvent, EventType
+from src.utils.serialization import dumps, loads
+from src.repo.task_stats import STATS_FIELDS, StatsKey, count_stats, stats_delta, stats_key_of
+
+
+# --------- schemat ---------
+# enumy jako nazwy (jak w Mongo), daty jako ISO 8601, meta zdarzeń jako JSON
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    role TEXT NOT NULL,
+    status TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    nickname TEXT NOT NULL,
+    UNIQUE (email, nickname)
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    owner_id TEXT NOT NULL,
+    assignee_id TEXT,
+    due_date TEXT,
+    is_deleted INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_owner ON tasks (owner_id);
+CREATE INDEX IF NOT EXISTS tasks_assignee ON tasks (assignee_id);
+CREATE INDEX IF NOT EXISTS tasks_manager_filters ON tasks (is_deleted, status, priority);
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    type TEXT NOT NULL,
+    meta BLOB NOT NULL,
+    seq INTEGER NOT NULL,
+    UNIQUE (task_id, seq)
+);
+CREATE INDEX IF NOT EXISTS events_task_timestamp ON events (task_id, timestamp);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS task_stats (
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (scope, name)
+) WITHOUT ROWID;
+"""
+
+_SYNCHRONOUS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+# --------- połączenia ---------
+class SqliteDatabase:
+    # Jeden plik bazy, połączenie przypisane do wątku na czas jego życia (obiekt
+    # sqlite3.Connection nie jest bezpieczny przy współbieżnym użyciu). WAL: czytelnicy
+    # nie blokują pisarza ani siebie nawzajem; zapisy serializuje BEGIN IMMEDIATE + busy timeout.
+    # Zapytania to stałe teksty SQL z parametrami — sqlite3 trzyma je
+    # skompilowane w cache'u instrukcji połączenia (cached_statements). Serwer wątkowy
+    # (np. dev server Flaska) tworzy wątek na żądanie, więc połączenia zakończonych wątków
+    # wracają do puli (najwyżej pool_size) i kolejny wątek dostaje je z gotowym cache'em.
+    def __init__(self, path: str, synchronous: str = "NORMAL", busy_timeout: float = 5.0, pool_size: int = 8):
+        synchronous = synchronous.upper()
+        if synchronous not in _SYNCHRONOUS:
+            raise ValueError(f"synchronous must be one of {', '.join(_SYNCHRONOUS)}")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._synchronous = synchronous
+        self._busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._conns: Dict[threading.Thread, sqlite3.Connection] = {}  # przypisane do żyjących wątków
+        self._idle: List[sqlite3.Connection] = []  # wolne, po zakończonych wątkach
+        self._pool_size = pool_size
+        self._lock = threading.Lock()
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")  # trwałe w pliku bazy
+        conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: autocommit, transakcje otwieramy jawnie w transaction()
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self._busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,  # połączenie przechodzi do kolejnych wątków (pula), close() zamyka cudze
+            cached_statements=256,
+        )
+        conn.execute(f"PRAGMA synchronous={self._synchronous}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                for thread in [t for t in self._conns if not t.is_alive()]:
+                    self._idle.append(self._conns.pop(thread))
+                while len(self._idle) > self._pool_size:
+                    self._idle.pop(0).close()
+                conn = self._idle.pop() if self._idle else self._connect()
+                self._conns[threading.current_thread()] = conn
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def connection_count(self) -> int:
+        return len(self._conns) + len(self._idle)
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in [*self._conns.values(), *self._idle]:
+                conn.close()
+            self._conns.clear()
+            self._idle.clear()
+        self._local = threading.local()
+
+
+# --------- mapowania ---------
+_USER_COLUMNS = "id, email, role, status, first_name, last_name, nickname"
+
+def _user_to_row(u: User) -> tuple:
+    return (u.id, u.email, u.role.name, u.status.name, u.first_name, u.last_name, u.nickname)
+
+def _row_to_user(r: tuple) -> User:
+    return User.from_storage(r[0], r[1], Role[r[2]], Status[r[3]], r[4], r[5], r[6])
+
+_TASK_COLUMNS = ", ".join(TASK_FIELDS)
+
+def _iso(d: Optional[datetime]) -> Optional[str]:
+    return d.isoformat() if d is not None else None
+
+def _from_iso(s: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(s) if s is not None else None
+
+def _task_to_row(t: Task) -> tuple:
+    return (
+        t.id, t.title, t.description, t.status.name, t.priority.name,
+        t.owner_id, t.assignee_id, _iso(t.due_date), int(bool(t.is_deleted)),
+    )
+
+def _row_to_task(r: tuple) -> Task:
+    return Task.from_storage(
+        r[0], r[1], r[2], TaskStatus[r[3]], Priority[r[4]], r[5], r[6], _from_iso(r[7]), bool(r[8])
+    )
+
+# kolumna -> konwersja z wartości SQLite (brak wpisu = bez konwersji)
+_TASK_COLUMN_DECODERS: Dict[str, Callable] = {
+    "status": TaskStatus.__getitem__,
+    "priority": Priority.__getitem__,
+    "due_date": _from_iso,
+    "is_deleted": bool,
+}
+
+def _partial_task_decoder(fields: Sequence[str]) -> Callable[[tuple], PartialTask]:
+    decoders = [(f, _TASK_COLUMN_DECODERS.get(f)) for f in fields]
+    return lambda r: PartialTask(**{
+        f: (dec(v) if dec is not None else v) for (f, dec), v in zip(decoders, r)
+    })
+
+# upsert bez zmiany rowid — kolejność wstawiania (zapytania bez stronicowania) zostaje
+_UPSERT_TASK = (
+    f"INSERT INTO tasks ({_TASK_COLUMNS}) VALUES ({', '.join('?' * len(TASK_FIELDS))}) "
+    "ON CONFLICT(id) DO UPDATE SET "
+    + ", ".join(f"{f} = excluded.{f}" for f in TASK_FIELDS[1:])
+)
+_BUMP_TASKS_VERSION = (
+    "INSERT INTO store_meta (key, value) VALUES ('tasks', 1) "
+    "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+)
+_TASK_FIELD_INDEX = {f: i for i, f in enumerate(TASK_FIELDS)}
+
+def _task_query_sql(
+    visible_to: Optional[str],
+    status: Optional[TaskStatus],
+    priority: Optional[Priority],
+    include_deleted: bool,
+    after: Optional[str],
+    limit: Optional[int],
+    columns: str,
+) -> Tuple[str, list]:
+    # Plan wymuszamy składnią, a nie statystykami (świeża baza nie ma ANALYZE, a bez
+    # niego planner bierze mało selektywny tasks_manager_filters): jednoargumentowy "+"
+    # wyłącza kolumnę z użycia indeksu. Widoczność -> OR-by-union po tasks_owner i
+    # tasks_assignee; strona managera -> przejście po kluczu głównym w kolejności id,
+    # zatrzymane po LIMIT; pełna lista managera -> tasks_manager_filters.
+    paged = after is not None or limit is not None
+    hint = "+" if visible_to is not None or paged else ""
+    clauses, params = [], []
+    if visible_to is not None:
+        clauses.append("(owner_id = ? OR assignee_id = ?)")
+        params += [visible_to, visible_to]
+    if not include_deleted:
+        clauses.append(f"{hint}is_deleted = 0")
+    if status is not None:
+        clauses.append(f"{hint}status = ?")
+        params.append(status.name)
+    if priority is not None:
+        clauses.append(f"{hint}priority = ?")
+        params.append(priority.name)
+    if after is not None:
+        clauses.append("id > ?")
+        params.append(after)
+    sql = f"SELECT {columns} FROM tasks"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    if paged:
+        sql += " ORDER BY id"
+    else:
+        sql += " ORDER BY rowid"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+def _event_query_sql(
+    task_id: str,
+    after_seq: int,
+    after: Optional[datetime],
+    before: Optional[datetime],
+    types: Optional[Collection[EventType]],
+    limit: Optional[int],
+) -> Tuple[str, list]:
+    # Zakres czasu idzie po events_task_timestamp (INDEXED BY — bez statystyk planner wybrałby
+    # UNIQUE (task_id, seq) ze względu na ORDER BY seq i przeszedł całą historię zadania);
+    # sortowanie po seq dotyczy wtedy tylko zdarzeń z zakresu. Znaczniki czasu zapisane
+    # w isoformat porównują się tekstowo zgodnie z czasem.
+    timed = after is not None or before is not None
+    sql = "SELECT id, task_id, timestamp, type, meta, seq FROM events"
+    if timed:
+        sql += " INDEXED BY events_task_timestamp"
+    clauses, params = ["task_id = ?", "seq > ?"], [task_id, after_seq]
+    if after is not None:
+        clauses.append("timestamp > ?")
+        params.append(after.isoformat())
+    if before is not None:
+        clauses.append("timestamp < ?")
+        params.append(before.isoformat())
+    if types is not None:
+        names = [t.name for t in types]
+        clauses.append(f"type IN ({', '.join('?' * len(names))})")
+        params += names
+    sql += " WHERE " + " AND ".join(clauses) + " ORDER BY seq"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+def _event_to_row(e: TaskEvent) -> tuple:
+    return (e.id, e.task_id, e.timestamp.isoformat(), e.type.name, dumps(e.meta), e.seq)
+
+def _row_to_event(r: tuple) -> TaskEvent:
+    return TaskEvent.from_storage(r[0], r[1], datetime.fromisoformat(r[2]), EventType[r[3]], loads(r[4]), r[5])
+
+
+# --------- Users ---------
+class SqliteUsers(UsersRepository):
+    def __init__(self, db: SqliteDatabase):
+        self._db = db
+
+    def get(self, user_id: str) -> Optional[User]:
+        r = self._db.connection().execute(f"SELECT {_USER_COLUMNS} FROM users WHERE id = ?", (user_id,)).fetchone()
+        return _row_to_user(r) if r else None
+
+    def add(self, user: User) -> None:
+        try:
+            self._db.connection().execute(
+                f"INSERT INTO users ({_USER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET email = excluded.email, role = excluded.role, "
+                "status = excluded.status, first_name = excluded.first_name, "
+                "last_name = excluded.last_name, nickname = excluded.nickname",
+                _user_to_row(user),
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError("User with this email and nickname already exists")
+
+    def find_by_email_and_nickname(self, email: str, nickname: str) -> Optional[User]:
+        r = self._db.connection().execute(
+            f"SELECT {_USER_COLUMNS} FROM users WHERE email = ? AND nickname = ?", (email, nickname)
+        ).fetchone()
+        return _row_to_user(r) if r else None
+
+
+# --------- Tasks ---------
+class SqliteTasks(TasksRepository):
+    def __init__(self, db: SqliteDatabase):
+        self._db = db
+        self.stats: Optional["SqliteTaskStats"] = None  # ta sama baza — liczniki w transakcji zapisu zadań
+
+    def get(self, task_id: str) -> Optional[Task]:
+        r = self._db.connection().execute(f"SELECT {_TASK_COLUMNS} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return _row_to_task(r) if r else None
+
+    def list(self) -> List[Task]:
+        cur = self._db.connection().execute(f"SELECT {_TASK_COLUMNS} FROM tasks ORDER BY rowid")
+        return [_row_to_task(r) for r in cur]
+
+    def add(self, task: Task) -> None:
+        self.add_many([task])
+
+    def add_many(self, tasks: List[Task]) -> None:
+        if tasks:
+            with self._db.transaction() as conn:
+                self._write(conn, tasks, [])
+
+    def update(self, task: Task, fields: Optional[Iterable[str]] = None) -> None:
+        with self._db.transaction() as conn:
+            self._write(conn, [], [(task, tuple(fields) if fields else None)])
+
+    def _write(self, conn: sqlite3.Connection, new: List[Task], updates: List[Tuple[Task, Optional[Tuple[str, ...]]]]) -> None:
+        # w transakcji wołającego; wersja i liczniki statystyk zmieniane w tej samej transakcji co dane
+        if self.stats is None:
+            self._write_rows(conn, new, updates)
+            return
+        # BEGIN IMMEDIATE trzyma blokadę zapisu: stan przed/po to dokładnie to, co zmienił ten zapis
+        ids = [t.id for t in new] + [t.id for t, _ in updates]
+        before = self._stats_keys(conn, ids)
+        self._write_rows(conn, new, updates)
+        after = self._stats_keys(conn, ids)
+        self.stats._write(conn, stats_delta((before.get(tid), after.get(tid)) for tid in dict.fromkeys(ids)))
+
+    @staticmethod
+    def _stats_keys(conn: sqlite3.Connection, ids: List[str]) -> Dict[str, Optional[StatsKey]]:
+        keys: Dict[str, Optional[StatsKey]] = {}
+        for i in range(0, len(ids), 500):  # limit parametrów zapytania
+            chunk = ids[i:i + 500]
+            cur = conn.execute(
+                f"SELECT id, {', '.join(STATS_FIELDS)} FROM tasks WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            for r in cur:
+                keys[r[0]] = stats_key_of(*r[1:])
+        return keys
+
+    def rebuild_stats(self) -> None:
+        # przeliczenie i podmiana jedną transakcją zapisu — równoległe zapisy czekają
+        with self._db.transaction() as conn:
+            cur = conn.execute(f"SELECT {', '.join(STATS_FIELDS)} FROM tasks WHERE is_deleted = 0")
+            self.stats._replace(conn, count_stats(stats_key_of(*r) for r in cur))
+
+    def _write_rows(self, conn: sqlite3.Connection, new: List[Task], updates: List[Tuple[Task, Optional[Tuple[str, ...]]]]) -> None:
+        if new:
+            conn.executemany(_UPSERT_TASK, [_task_to_row(t) for t in new])
+        for task, fields in updates:
+            if not fields:
+                conn.execute(_UPSERT_TASK, _task_to_row(task))
+                continue
+            row = _task_to_row(task)
+            for f in fields:
+                if f == "id" or f not in _TASK_FIELD_INDEX:
+                    raise ValueError(f"Unknown task field: {f}")
+            conn.execute(
+                f"UPDATE tasks SET {', '.join(f'{f} = ?' for f in fields)} WHERE id = ?",
+                [row[_TASK_FIELD_INDEX[f]] for f in fields] + [task.id],
+            )
+        if new or updates:
+            conn.execute(_BUMP_TASKS_VERSION)
+
+    def version(self) -> int:
+        r = self._db.connection().execute("SELECT value FROM store_meta WHERE key = 'tasks'").fetchone()
+        return r[0] if r else 0
+
+    def query(self, **filters) -> List[Union[Task, PartialTask]]:
+        return list(self.iter_query(**filters))
+
+    def iter_query(
+        self,
+        *,
+        visible_to: Optional[str] = None,
+        status: Optional[TaskStatus] = None,
+        priority: Optional[Priority] = None,
+        include_deleted: bool = False,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Iterator[Union[Task, PartialTask]]:
+        # kursor SQLite czyta wiersze na żądanie — w pamięci tylko bieżący wiersz
+        columns = ", ".join(fields) if fields else _TASK_COLUMNS
+        sql, params = _task_query_sql(visible_to, status, priority, include_deleted, after, limit, columns)
+        cur = self._db.connection().execute(sql, params)
+        decode = _partial_task_decoder(fields) if fields else _row_to_task
+        return (decode(r) for r in cur)
+
+
+# --------- Events ---------
+class SqliteEvents(EventsRepository):
+    def __init__(self, db: SqliteDatabase):
+        self._db = db
+
+    def add(self, event: TaskEvent) -> None:
+        self.add_many([event])
+
+    def add_many(self, events: List[TaskEvent]) -> None:
+        if events:
+            with self._db.transaction() as conn:
+                self._insert(conn, events)
+
+    def _insert(self, conn: sqlite3.Connection, events: List[TaskEvent]) -> None:
+        # BEGIN IMMEDIATE trzyma blokadę zapisu, więc MAX(seq) + 1 nie ściga się z innym pisarzem
+        nxt: Dict[str, int] = {}
+        for e in events:
+            if e.task_id not in nxt:
+                nxt[e.task_id] = self._last_seq(conn, e.task_id) + 1
+            e.seq = nxt[e.task_id]
+            nxt[e.task_id] += 1
+        conn.executemany(
+            "INSERT INTO events (id, task_id, timestamp, type, meta, seq) VALUES (?, ?, ?, ?, ?, ?)",
+            [_event_to_row(e) for e in events],
+        )
+
+    @staticmethod
+    def _last_seq(conn: sqlite3.Connection, task_id: str) -> int:
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events WHERE task_id = ?", (task_id,)).fetchone()[0]
+
+    def list_for_task(self, task_id: str, after_seq: int = 0, **filters) -> List[TaskEvent]:
+        return list(self.iter_for_task(task_id, after_seq, **filters))
+
+    def iter_for_task(
+        self,
+        task_id: str,
+        after_seq: int = 0,
+        *,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        types: Optional[Collection[EventType]] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[TaskEvent]:
+        sql, params = _event_query_sql(task_id, after_seq, after, before, types, limit)
+        cur = self._db.connection().execute(sql, params)
+        return (_row_to_event(r) for r in cur)
+
+    def last_seq(self, task_id: str) -> int:
+        return self._last_seq(self._db.connection(), task_id)
+
+
+# --------- Statystyki zadań ---------
+class SqliteTaskStats(TaskStatsRepository):
+    # WITHOUT ROWID: wiersze leżą w kolejności klucza (scope, name), odczyt zakresu to jeden przedział B-drzewa
+    def __init__(self, db: SqliteDatabase):
+        self._db = db
+
+    def get(self, scope: str) -> Dict[str, int]:
+        cur = self._db.connection().execute("SELECT name, count FROM task_stats WHERE scope = ? AND count != 0", (scope,))
+        return dict(cur)
+
+    def apply(self, delta: Dict[Tuple[str, str], int]) -> None:
+        if delta:
+            with self._db.transaction() as conn:
+                self._write(conn, delta)
+
+    def replace(self, counts: Dict[Tuple[str, str], int]) -> None:
+        with self._db.transaction() as conn:
+            self._replace(conn, counts)
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, delta: Dict[Tuple[str, str], int]) -> None:
+        # w transakcji wołającego (SqliteTasks._write — razem z danymi zadań)
+        conn.executemany(
+            "INSERT INTO task_stats (scope, name, count) VALUES (?, ?, ?) "
+            "ON CONFLICT(scope, name) DO UPDATE SET count = count + excluded.count",
+            [(scope, name, by) for (scope, name), by in delta.items()],
+        )
+
+    def _replace(self, conn: sqlite3.Connection, counts: Dict[Tuple[str, str], int]) -> None:
+        conn.execute("DELETE FROM task_stats")
+        conn.executemany(
+            "INSERT INTO task_stats (scope, name, count) VALUES (?, ?, ?)",
+            [(scope, name, n) for (scope, name), n in counts.items() if n],
+        )
+        self.stale = False
+
+
+# --------- Unit of work ---------
+class SqliteUnitOfWork(UnitOfWork):
+    # zadania, wersja i zdarzenia jedną transakcją SQLite — wszystko albo nic
+    def __init__(self, tasks: SqliteTasks, events: SqliteEvents):
+        super().__init__()
+        self._tasks = tasks
+        self._events = events
+
+    def _flush(self) -> None:
+        with self._tasks._db.transaction() as conn:
+            self._tasks._write(conn, self.new_tasks, self.task_updates)
+            if self.new_events:
+                self._events._insert(conn, self.new_events)
@@ -0,0 +1,63 @@
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from src.domain.task import Task, TaskStatus, Priority, PartialTask
+
+# Statystyki zadań liczone przyrostowo: każdy zapis zadania przesuwa liczniki o deltę
+# (zapisany stan sprzed zmiany na minus, nowy na plus), więc odczyt nie przechodzi po zadaniach.
+# Liczniki trzymane są per zakres widoczności — "*" dla managera, id użytkownika dla
+# zadań, które widzi (właściciel lub wykonawca); usunięte zadania nie są liczone.
+# Deltę liczy repozytorium zadań z tego, co faktycznie było zapisane (nie z kopii w serwisie),
+# więc równoległe zmiany tego samego zadania nie liczą się dwa razy.
+ALL_TASKS = "*"
+STATS_FIELDS = ("owner_id", "assignee_id", "status", "priority", "is_deleted")
+
+StatsKey = Tuple[str, Optional[str], str, str]  # owner, assignee, nazwa statusu, nazwa priorytetu
+Counts = Dict[Tuple[str, str], int]
+
+def stats_key_of(owner_id: str, assignee_id: Optional[str], status: str, priority: str, is_deleted) -> Optional[StatsKey]:
+    # z zapisanych wartości (nazwy enumów); None = zadanie nie jest liczone
+    return None if is_deleted else (owner_id, assignee_id, status, priority)
+
+def stats_key(task: Union[Task, PartialTask]) -> Optional[StatsKey]:
+    return stats_key_of(task.owner_id, task.assignee_id, task.status.name, task.priority.name, task.is_deleted)
+
+def _add(counts: Counter, key: StatsKey, sign: int) -> None:
+    owner, assignee, status, priority = key
+    names = (
+        "total",
+        f"status:{status}",
+        f"priority:{priority}",
+        f"assignee:{assignee}" if assignee else "unassigned",
+    )
+    for scope in {ALL_TASKS, owner, assignee or owner}:
+        for name in names:
+            counts[(scope, name)] += sign
+
+def stats_delta(changes: Iterable[Tuple[Optional[StatsKey], Optional[StatsKey]]]) -> Counts:
+    # pary (przed, po) zapisanych zadań -> suma delt bez zer
+    counts: Counter = Counter()
+    for before, after in changes:
+        if before == after:
+            continue
+        if before is not None:
+            _add(counts, before, -1)
+        if after is not None:
+            _add(counts, after, 1)
+    return {k: v for k, v in counts.items() if v}
+
+def count_stats(keys: Iterable[Optional[StatsKey]]) -> Counts:
+    # liczniki od zera z kluczy zapisanych zadań (odbudowa) — None (usunięte) pomijane
+    return stats_delta((None, key) for key in keys)
+
+def stats_to_dict(counters: Dict[str, int], stale: bool = False) -> dict:
+    prefix = "assignee:"
+    by_assignee = {name[len(prefix):]: n for name, n in counters.items() if name.startswith(prefix) and n}
+    return {
+        "total": counters.get("total", 0),
+        "by_status": {s.name: counters.get(f"status:{s.name}", 0) for s in TaskStatus},
+        "by_priority": {p.name: counters.get(f"priority:{p.name}", 0) for p in Priority},
+        "by_assignee": dict(sorted(by_assignee.items())),
+        "unassigned": counters.get("unassigned", 0),
+        "stale": stale,
+    }
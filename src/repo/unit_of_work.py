@@ -0,0 +1,69 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, List, Optional, Tuple
+from src.domain.task import Task
+from src.domain.event import TaskEvent
+from src.repo.interface import TasksRepository, EventsRepository
+from src.repo.request_scope import count_call
+
+# Zbiera zapisy zadań i ich zdarzeń z jednego wywołania serwisu i zapisuje je
+# razem w commit() (albo porzuca, jeśli w bloku `with` poleci wyjątek).
+class UnitOfWork(ABC):
+    def __init__(self):
+        self.new_tasks: List[Task] = []
+        self.task_updates: List[Tuple[Task, Optional[Tuple[str, ...]]]] = []
+        self.new_events: List[TaskEvent] = []
+        self._listeners: List[Callable[[List[Task], List[TaskEvent]], None]] = []
+
+    def on_commit(self, listener: Callable[[List[Task], List[TaskEvent]], None]) -> None:
+        # wywoływany po udanym _flush() z zapisanymi zadaniami i zdarzeniami
+        self._listeners.append(listener)
+
+    def add_task(self, task: Task) -> None:
+        self.new_tasks.append(task)
+
+    def update_task(self, task: Task, fields: Optional[Iterable[str]] = None) -> None:
+        self.task_updates.append((task, tuple(fields) if fields else None))
+
+    def add_event(self, event: TaskEvent) -> None:
+        self.new_events.append(event)
+
+    def commit(self) -> None:
+        tasks = self.new_tasks + [t for t, _ in self.task_updates]
+        events = self.new_events
+        if not tasks and not events:
+            return
+        count_call("uow.commit")
+        self._flush()
+        self.rollback()
+        for listener in self._listeners:
+            listener(tasks, events)
+
+    def rollback(self) -> None:
+        self.new_tasks, self.task_updates, self.new_events = [], [], []
+
+    @abstractmethod
+    def _flush(self) -> None: ...
+
+    def __enter__(self) -> "UnitOfWork":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+class RepositoryUnitOfWork(UnitOfWork):
+    # wariant ogólny: dowolne repozytoria, zapis po kolei (zadania, potem zdarzenia)
+    def __init__(self, tasks: TasksRepository, events: EventsRepository):
+        super().__init__()
+        self._tasks = tasks
+        self._events = events
+
+    def _flush(self) -> None:
+        if self.new_tasks:
+            self._tasks.add_many(self.new_tasks)
+        for task, fields in self.task_updates:
+            self._tasks.update(task, fields=fields)
+        if self.new_events:
+            self._events.add_many(self.new_events)
@@ -0,0 +1,110 @@
+import itertools
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from src.domain.task import Task
+from src.domain.event import TaskEvent, EventType
+from src.utils.serialization import dumps, task_to_dict, event_to_dict
+
+DEFAULT_QUEUE_SIZE = 256
+
+@dataclass(frozen=True)
+class TaskChange:
+    id: int
+    task_id: str
+    audience: FrozenSet[str]  # kto (poza managerami) może zobaczyć zmianę
+    payload: bytes            # JSON zserializowany raz, wspólny dla wszystkich subskrybentów
+
+class Subscription:
+    # kolejka jednego klienta; ograniczona, więc wolny klient nie blokuje zapisów —
+    # po przepełnieniu subskrypcja jest oznaczana i klient musi się zsynchronizować od nowa
+    def __init__(self, feed: "ChangeFeed", actor_id: str, sees_all: bool, max_queue: int):
+        self.actor_id = actor_id
+        self.sees_all = sees_all
+        self.overflowed = False
+        self.closed = False
+        self._feed = feed
+        self._queue: "queue.Queue[TaskChange]" = queue.Queue(maxsize=max_queue)
+
+    def sees(self, change: TaskChange) -> bool:
+        return self.sees_all or self.actor_id in change.audience
+
+    def offer(self, change: TaskChange) -> None:
+        if self.overflowed:
+            return
+        try:
+            self._queue.put_nowait(change)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[TaskChange]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._feed.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+class ChangeFeed:
+    # proces-lokalny fan-out zmian zadań do subskrybentów (SSE /api/stream)
+    def __init__(self, max_queue: int = DEFAULT_QUEUE_SIZE):
+        if max_queue < 1:
+            raise ValueError("max_queue must be >= 1")
+        self._max_queue = max_queue
+        self._subscribers: Tuple[Subscription, ...] = ()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.overflows = 0
+
+    def subscribe(self, actor_id: str, sees_all: bool = False) -> Subscription:
+        sub = Subscription(self, actor_id, sees_all, self._max_queue)
+        with self._lock:
+            self._subscribers = self._subscribers + (sub,)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not sub)
+            if sub.overflowed:
+                self.overflows += 1
+
+    def publish(self, tasks: List[Task], events: List[TaskEvent]) -> None:
+        # słuchacz UnitOfWork.on_commit; kopia krotki subskrybentów, więc bez blokady przy rozsyłaniu
+        subscribers = self._subscribers
+        if not subscribers:
+            return
+        by_id: Dict[str, Task] = {t.id: t for t in tasks}
+        for event in events:
+            task = by_id.get(event.task_id)
+            if task is None:
+                continue
+            change = self._change(task, event)
+            self.published += 1
+            for sub in subscribers:
+                if sub.sees(change):
+                    sub.offer(change)
+
+    def _change(self, task: Task, event: TaskEvent) -> TaskChange:
+        audience = {task.owner_id}
+        if task.assignee_id:
+            audience.add(task.assignee_id)
+        if event.type == EventType.ASSIGNED and event.meta.get("from"):
+            # poprzedni assignee traci widoczność, ale musi się o tym dowiedzieć
+            audience.add(event.meta["from"])
+        payload = dumps({"task": task_to_dict(task), "event": event_to_dict(event)})
+        return TaskChange(next(self._ids), task.id, frozenset(audience), payload)
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subscribers), "published": self.published, "overflows": self.overflows}
@@ -1,20 +1,64 @@
-from typing import List, Optional
-from src.domain.user import Role
-from src.domain.task import Task, TaskStatus, Priority
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from src.domain.user import User, Role
+from src.domain.task import Task, TaskStatus, Priority, PartialTask, TASK_FIELDS
 from src.domain.event import TaskEvent, EventType
 from src.domain.policies import PermissionPolicy
-from src.repo.interface import UsersRepository, TasksRepository, EventsRepository
+from src.repo.interface import UsersRepository, TasksRepository, EventsRepository, TaskStatsRepository
+from src.repo.unit_of_work import UnitOfWork, RepositoryUnitOfWork
+from src.repo.task_stats import ALL_TASKS
 from src.utils.idgen import IdGenerator
 from src.utils.clock import Clock
-from src.integrations.emailer import TaskHistoryEmailer
+from src.utils.cursor import encode_cursor, decode_cursor
+from src.integrations.email_queue import EmailQueue, EmailJob
+from src.serwis.change_feed import ChangeFeed, Subscription
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BULK_SIZE = 1000
+
+def task_projection(fields: Optional[Sequence[str]]) -> Optional[Tuple[str, ...]]:
+    # kanoniczna kolejność pól, `id` zawsze dołączane (odnośniki, kursory)
+    if fields is None:
+        return None
+    wanted = set()
+    for f in fields:
+        if f not in TASK_FIELDS:
+            raise ValueError(f"Unknown task field: {f}")
+        wanted.add(f)
+    wanted.add("id")
+    return tuple(f for f in TASK_FIELDS if f in wanted)
 
 class TaskService:
-    def __init__(self, users: UsersRepository, tasks: TasksRepository, events: EventsRepository, idgen: IdGenerator, clock: Clock):
+    def __init__(
+        self,
+        users: UsersRepository,
+        tasks: TasksRepository,
+        events: EventsRepository,
+        idgen: IdGenerator,
+        clock: Clock,
+        uow: Optional[Callable[[], UnitOfWork]] = None,
+        feed: Optional[ChangeFeed] = None,
+        mailer: Optional[EmailQueue] = None,
+        stats: Optional[TaskStatsRepository] = None,
+    ):
         self.users = users
         self.tasks = tasks
         self.events = events
         self.idgen = idgen
         self.clock = clock
+        self.feed = feed
+        self.mailer = mailer
+        self.stats = stats
+        # fabryka unit of work: zmiana zadania i jej zdarzenie zapisywane razem
+        self._make_uow = uow or (lambda: RepositoryUnitOfWork(self.tasks, self.events))
+
+    def uow(self) -> UnitOfWork:
+        uow = self._make_uow()
+        if self.feed is not None:
+            # powiadomienia dopiero po udanym commicie — rollback niczego nie publikuje
+            uow.on_commit(self.feed.publish)
+        return uow
 
     # def create_task(self, actor_id: str, title: str, description: str="", priority: str="NORMAL") -> Task:
     #     actor = self.users.get(actor_id)
@@ -28,29 +72,67 @@ class TaskService:
     #     self.events.add(TaskEvent(self.idgen.new_id(), t.id, self.clock.now(), EventType.CREATED, {"owner": actor.id}))
     #     return t
 
-    def create_task(self, actor_id: str, title: str, description: str = "", priority: str = "NORMAL") -> Task:
-        actor = self.users.get(actor_id)
-        if not actor or not PermissionPolicy.can_create_task(actor):
-            raise PermissionError("User cannot create tasks")
+    def _new_task(self, actor: User, title: str, description: str, priority: str) -> Task:
         if not title or len(title) > 200:
             raise ValueError("Invalid title")
         try:
             pr = Priority[priority.upper()]
         except KeyError:
             raise ValueError("Unknown priority")
-        t = Task(
+        return Task(
             id=self.idgen.new_id(),
             title=title,
             description=description,
             priority=pr,
             owner_id=actor.id,
         )
-        self.tasks.add(t)
-        self.events.add(TaskEvent(
-            self.idgen.new_id(), t.id, self.clock.now(), EventType.CREATED, {"owner": actor.id}
-        ))
+
+    def create_task(self, actor_id: str, title: str, description: str = "", priority: str = "NORMAL") -> Task:
+        actor = self.users.get(actor_id)
+        if not actor or not PermissionPolicy.can_create_task(actor):
+            raise PermissionError("User cannot create tasks")
+        t = self._new_task(actor, title, description, priority)
+        with self.uow() as uow:
+            uow.add_task(t)
+            uow.add_event(TaskEvent(
+                self.idgen.new_id(), t.id, self.clock.now(), EventType.CREATED, {"owner": actor.id}
+            ))
         return t
 
+    # --- BULK CREATE ---
+    def create_tasks(self, actor_id: str, specs: List[dict]) -> List[Union[Task, ValueError]]:
+        actor = self.users.get(actor_id)
+        if not actor or not PermissionPolicy.can_create_task(actor):
+            raise PermissionError("User cannot create tasks")
+        if not isinstance(specs, list) or not specs:
+            raise ValueError("Expected a non-empty list of tasks")
+        if len(specs) > MAX_BULK_SIZE:
+            raise ValueError(f"Too many tasks in one request (max {MAX_BULK_SIZE})")
+
+        # walidacja wszystkich pozycji przed jakimkolwiek zapisem
+        results: List[Union[Task, ValueError]] = []
+        for spec in specs:
+            try:
+                if not isinstance(spec, dict):
+                    raise ValueError("Task spec must be an object")
+                title = spec.get("title", "")
+                description = spec.get("description", "")
+                priority = spec.get("priority", "NORMAL")
+                if not all(isinstance(v, str) for v in (title, description, priority)):
+                    raise ValueError("Invalid task spec")
+                results.append(self._new_task(actor, title, description, priority))
+            except ValueError as e:
+                results.append(e)
+
+        created = [r for r in results if isinstance(r, Task)]
+        if created:
+            now = self.clock.now()
+            with self.uow() as uow:
+                for t in created:
+                    uow.add_task(t)
+                    uow.add_event(TaskEvent(self.idgen.new_id(), t.id, now, EventType.CREATED, {"owner": actor.id}))
+        return results
+
     def _is_valid_transition(self, current: TaskStatus, new: TaskStatus) -> bool:
             allowed = {
                 TaskStatus.NEW:         {TaskStatus.IN_PROGRESS, TaskStatus.CANCELED},
@@ -75,15 +157,15 @@ class TaskService:
 
         prev = task.assignee_id
         task.assignee_id = assignee.id
-        self.tasks.update(task)
-
-        self.events.add(TaskEvent(
-            id=self.idgen.new_id(),
-            task_id=task.id,
-            timestamp=self.clock.now(),
-            type=EventType.ASSIGNED,
-            meta={"from": prev, "to": assignee.id, "by": actor.id},
-        ))
+        with self.uow() as uow:
+            uow.update_task(task, fields=("assignee_id",))
+            uow.add_event(TaskEvent(
+                id=self.idgen.new_id(),
+                task_id=task.id,
+                timestamp=self.clock.now(),
+                type=EventType.ASSIGNED,
+                meta={"from": prev, "to": assignee.id, "by": actor.id},
+            ))
         return task
 
     def change_status(self, actor_id: str, task_id: str, new_status: str) -> Task:
@@ -110,15 +192,15 @@ class TaskService:
 
         prev = task.status
         task.status = target
-        self.tasks.update(task)
-
-        self.events.add(TaskEvent(
-            id=self.idgen.new_id(),
-            task_id=task.id,
-            timestamp=self.clock.now(),
-            type=EventType.STATUS_CHANGED,
-            meta={"from": prev.name, "to": target.name, "by": actor.id},
-        ))
+        with self.uow() as uow:
+            uow.update_task(task, fields=("status",))
+            uow.add_event(TaskEvent(
+                id=self.idgen.new_id(),
+                task_id=task.id,
+                timestamp=self.clock.now(),
+                type=EventType.STATUS_CHANGED,
+                meta={"from": prev.name, "to": target.name, "by": actor.id},
+            ))
         return task
     
     # --- UPDATE ---
@@ -166,14 +248,15 @@ class TaskService:
         if not changes:
             return task
 
-        self.tasks.update(task)
-        self.events.add(TaskEvent(
-            id=self.idgen.new_id(),
-            task_id=task.id,
-            timestamp=self.clock.now(),
-            type=EventType.UPDATED,
-            meta={"by": actor.id, "changes": changes},
-        ))
+        with self.uow() as uow:
+            uow.update_task(task, fields=tuple(changes))
+            uow.add_event(TaskEvent(
+                id=self.idgen.new_id(),
+                task_id=task.id,
+                timestamp=self.clock.now(),
+                type=EventType.UPDATED,
+                meta={"by": actor.id, "changes": changes},
+            ))
         return task
     
     # --- DELETE ---
@@ -192,52 +275,195 @@ class TaskService:
             return task
         
         task.is_deleted = True
-        self.tasks.update(task)
-        self.events.add(TaskEvent(
-            id=self.idgen.new_id(),
-            task_id=task.id,
-            timestamp=self.clock.now(),
-            type=EventType.DELETED,
-            meta={"by": actor.id},
-        ))
+        with self.uow() as uow:
+            uow.update_task(task, fields=("is_deleted",))
+            uow.add_event(TaskEvent(
+                id=self.idgen.new_id(),
+                task_id=task.id,
+                timestamp=self.clock.now(),
+                type=EventType.DELETED,
+                meta={"by": actor.id},
+            ))
         return task
     
     # --- LIST ---
-    def list_tasks(
-        self,
-        actor_id: str,
-        *,
-        status: Optional[str] = None,
-        priority: Optional[str] = None,
-    ) -> List[Task]:
-        actor = self.users.get(actor_id)
-        if not actor:
-            raise ValueError("Actor not found")
-        all_tasks: List[Task] = self.tasks.list() 
-        visible = (
-            all_tasks
-            if actor.role == Role.MANAGER
-            else [t for t in all_tasks if actor.id in (t.owner_id, t.assignee_id)]
-        )
-        visible = [t for t in visible if not getattr(t, "is_deleted", False)]
+    @staticmethod
+    def _list_enums(status: Optional[str], priority: Optional[str]) -> Tuple[Optional[TaskStatus], Optional[Priority]]:
+        st = pr = None
         if status is not None:
             try:
                 st = TaskStatus[status.upper()]
             except KeyError:
                 raise ValueError("Unknown status filter")
-            visible = [t for t in visible if t.status == st]
 
         if priority is not None:
             try:
                 pr = Priority[priority.upper()]
             except KeyError:
                 raise ValueError("Unknown priority filter")
-            visible = [t for t in visible if t.priority == pr]
+        return st, pr
+
+    @staticmethod
+    def _page_after(limit: int, cursor: Optional[str]) -> Optional[str]:
+        if not isinstance(limit, int) or not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        return decode_cursor(cursor) if cursor else None
 
-        return visible
+    @staticmethod
+    def validate_list_args(
+        *,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> None:
+        # same parametry listy, bez repozytoriów — API sprawdza je przed ETagiem,
+        # więc błędny parametr to 400 także z If-None-Match; limit/cursor tylko dla stron
+        task_projection(fields)
+        TaskService._list_enums(status, priority)
+        if limit is not None or cursor is not None:
+            TaskService._page_after(DEFAULT_PAGE_SIZE if limit is None else limit, cursor)
+
+    def _list_filters(self, actor_id: str, status: Optional[str], priority: Optional[str]) -> dict:
+        actor = self.users.get(actor_id)
+        if not actor:
+            raise ValueError("Actor not found")
+        st, pr = self._list_enums(status, priority)
+        return {
+            "visible_to": None if actor.role == Role.MANAGER else actor.id,
+            "status": st,
+            "priority": pr,
+        }
+
+    def list_tasks(
+        self,
+        actor_id: str,
+        *,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[Union[Task, PartialTask]]:
+        return self.tasks.query(**self._list_query(actor_id, status, priority, fields))
+
+    def iter_tasks(
+        self,
+        actor_id: str,
+        *,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Iterator[Union[Task, PartialTask]]:
+        # walidacja i uprawnienia od razu (błąd przed wysłaniem odpowiedzi),
+        # same zadania dopiero przy iteracji
+        return self.tasks.iter_query(**self._list_query(actor_id, status, priority, fields))
+
+    def tasks_version(self, actor_id: str) -> int:
+        # wersja magazynu zadań (do ETag); tania — bez wykonywania zapytania
+        if not self.users.get(actor_id):
+            raise ValueError("Actor not found")
+        return self.tasks.version()
+
+    def _list_query(
+        self,
+        actor_id: str,
+        status: Optional[str],
+        priority: Optional[str],
+        fields: Optional[Sequence[str]],
+    ) -> dict:
+        projection = task_projection(fields)
+        filters = self._list_filters(actor_id, status, priority)
+        if projection is not None:
+            filters["fields"] = projection
+        return filters
+
+    def list_tasks_page(
+        self,
+        actor_id: str,
+        *,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Union[Task, PartialTask]], Optional[str]]:
+        after = self._page_after(limit, cursor)
+        filters = self._list_query(actor_id, status, priority, fields)
+        # jeden rekord więcej mówi, czy istnieje następna strona
+        items = self.tasks.query(**filters, after=after, limit=limit + 1)
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        return items, encode_cursor(items[-1].id)
+
+    # --- STATS ---
+    def get_task_stats(self, actor_id: str) -> Dict[str, int]:
+        # odczyt gotowych liczników zakresu aktora — bez przechodzenia po zadaniach;
+        # liczniki przesuwa repozytorium zadań przy zapisie (TasksRepository.stats)
+        if self.stats is None:
+            raise ValueError("Task stats are not enabled")
+        actor = self.users.get(actor_id)
+        if not actor:
+            raise ValueError("Actor not found")
+        return self.stats.get(ALL_TASKS if actor.role == Role.MANAGER else actor.id)
+
+    def rebuild_task_stats(self, actor_id: str) -> Dict[str, int]:
+        if self.stats is None:
+            raise ValueError("Task stats are not enabled")
+        actor = self.users.get(actor_id)
+        if not actor:
+            raise ValueError("Actor not found")
+        if actor.role != Role.MANAGER:
+            raise PermissionError("Only manager can rebuild task stats")
+        self.tasks.rebuild_stats()
+        return self.stats.get(ALL_TASKS)
+
+    # --- CHANGE FEED ---
+    def subscribe_changes(self, actor_id: str) -> Subscription:
+        if self.feed is None:
+            raise ValueError("Change feed is not enabled")
+        actor = self.users.get(actor_id)
+        if not actor:
+            raise ValueError("Actor not found")
+        return self.feed.subscribe(actor.id, sees_all=actor.role == Role.MANAGER)
 
     # --- EVENTS ---
-    def get_events(self, actor_id: str, task_id: str) -> List[TaskEvent]:
+    def get_events(self, actor_id: str, task_id: str, after_seq: int = 0, **filters) -> List[TaskEvent]:
+        self._check_events_access(actor_id, task_id, after_seq)
+        return self.events.list_for_task(task_id, after_seq, **self.validate_event_filters(**filters))
+
+    def iter_events(self, actor_id: str, task_id: str, after_seq: int = 0, **filters) -> Iterator[TaskEvent]:
+        self._check_events_access(actor_id, task_id, after_seq)
+        return self.events.iter_for_task(task_id, after_seq, **self.validate_event_filters(**filters))
+
+    @staticmethod
+    def validate_event_filters(
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        types: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+    ) -> dict:
+        # typy po nazwach (jak w API); limit jak przy stronach zadań. Bez repozytoriów — API
+        # sprawdza filtry przed ETagiem; zwraca je w postaci dla EventsRepository
+        if limit is not None and (not isinstance(limit, int) or not 1 <= limit <= MAX_PAGE_SIZE):
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        kinds = None
+        if types is not None:
+            kinds = []
+            for t in types:
+                try:
+                    kinds.append(EventType[t.upper()])
+                except KeyError:
+                    raise ValueError(f"Unknown event type filter: {t}")
+        return {"after": after, "before": before, "types": kinds, "limit": limit}
+
+    def events_version(self, actor_id: str, task_id: str) -> int:
+        self._check_events_access(actor_id, task_id, 0)
+        return self.events.last_seq(task_id)
+
+    def _check_events_access(self, actor_id: str, task_id: str, after_seq: int) -> None:
+        if not isinstance(after_seq, int) or after_seq < 0:
+            raise ValueError("after_seq must be >= 0")
         actor = self.users.get(actor_id)
         task  = self.tasks.get(task_id)
         if not actor or not task:
@@ -245,12 +471,10 @@ class TaskService:
 
         if actor.role != Role.MANAGER and actor.id not in (task.owner_id, task.assignee_id):
             raise PermissionError("User cannot view events of this task")
-
-        return self.events.list_for_task(task_id)
     
     # -- mock email -- 
 
-    def email_task_history(self, actor_id: str, task_id: str, email: str) -> bool:
+    def _task_history(self, actor_id: str, task_id: str, email: str) -> Tuple[Task, List[str]]:
         if not email:
             raise ValueError("Missing email")
         events = self.get_events(actor_id, task_id)
@@ -258,6 +482,19 @@ class TaskService:
         if not task:
             from werkzeug.exceptions import NotFound
             raise NotFound()
+        return task, [e.type.name for e in events]
+
+    def queue_task_history_email(self, actor_id: str, task_id: str, email: str) -> str:
+        # uprawnienia i treść sprawdzane od razu, wysyłka w tle — zwraca id zadania wysyłki
+        if self.mailer is None:
+            raise RuntimeError("Email queue is not configured")
+        task, event_types = self._task_history(actor_id, task_id, email)
+        return self.mailer.submit(actor_id, email, task.id, task.title, event_types)
 
-        event_types = [e.type.name for e in events]
-        return TaskHistoryEmailer().send_task_history(email, task.title, event_types)
\ No newline at end of file
+    def get_email_job(self, actor_id: str, job_id: str) -> EmailJob:
+        job = self.mailer.get(job_id) if self.mailer is not None else None
+        if job is None or actor_id not in job.actor_ids:
+            # cudze zadania wysyłki nie istnieją dla pytającego
+            from werkzeug.exceptions import NotFound
+            raise NotFound()
+        return job
\ No newline at end of file
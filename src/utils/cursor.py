@@ -0,0 +1,15 @@
+import base64
+import binascii
+
+def encode_cursor(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        padded = (cursor + "=" * (-len(cursor) % 4)).encode("ascii")
+        key = base64.b64decode(padded, altchars=b"-_", validate=True).decode("utf-8")
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if not key:
+        raise ValueError("Invalid cursor")
+    return key
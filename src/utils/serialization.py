@@ -0,0 +1,74 @@
+import json
+from typing import Callable, Dict, Optional, Sequence
+
+from src.domain.task import Task, TaskStatus, Priority, TASK_FIELDS
+from src.domain.event import TaskEvent, EventType
+
+try:  # opcjonalny, szybszy backend JSON
+    import orjson
+except ImportError:
+    orjson = None
+
+# Enum.name to deskryptor — zwykły słownik jest kilkukrotnie szybszy
+_STATUS = {s: s.name for s in TaskStatus}
+_PRIORITY = {p: p.name for p in Priority}
+_EVENT_TYPE = {t: t.name for t in EventType}
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+    dumps: Callable[[object], bytes] = orjson.dumps
+    loads = orjson.loads
+else:
+    JSON_BACKEND = "json"
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(obj) -> bytes:
+        return _encoder.encode(obj).encode("utf-8")
+
+    def loads(s):
+        # stdlib nie czyta z memoryview (np. wycinka mmapy) — tu potrzebna kopia
+        return json.loads(s.tobytes() if isinstance(s, memoryview) else s)
+
+
+def task_to_dict(t: Task) -> dict:
+    due = t.due_date
+    return {
+        "id": t.id,
+        "title": t.title,
+        "description": t.description,
+        "status": _STATUS[t.status],
+        "priority": _PRIORITY[t.priority],
+        "owner_id": t.owner_id,
+        "assignee_id": t.assignee_id,
+        "due_date": due.isoformat() if due is not None else None,
+        "is_deleted": bool(t.is_deleted),
+    }
+
+_TASK_FIELD_DUMPERS: Dict[str, Callable[[Task], object]] = {
+    "id": lambda t: t.id,
+    "title": lambda t: t.title,
+    "description": lambda t: t.description,
+    "status": lambda t: _STATUS[t.status],
+    "priority": lambda t: _PRIORITY[t.priority],
+    "owner_id": lambda t: t.owner_id,
+    "assignee_id": lambda t: t.assignee_id,
+    "due_date": lambda t: t.due_date.isoformat() if t.due_date is not None else None,
+    "is_deleted": lambda t: bool(t.is_deleted),
+}
+
+def task_serializer(fields: Optional[Sequence[str]] = None) -> Callable[[Task], dict]:
+    # funkcja wybierana raz na odpowiedź, a nie sprawdzanie pól dla każdego obiektu
+    if fields is None or tuple(fields) == TASK_FIELDS:
+        return task_to_dict
+    dumpers = [(f, _TASK_FIELD_DUMPERS[f]) for f in fields]
+    return lambda t: {f: dump(t) for f, dump in dumpers}
+
+def event_to_dict(e: TaskEvent) -> dict:
+    return {
+        "id": e.id,
+        "task_id": e.task_id,
+        "timestamp": e.timestamp.isoformat(),
+        "type": _EVENT_TYPE[e.type],
+        "meta": e.meta,
+        "seq": e.seq,
+    }
@@ -24,7 +24,7 @@ def create_task(actor_id: str, title: str = "T") -> dict:
     assert r.status_code == 201, r.text
     return r.json()
 
-def test_email_history_happy_path_returns_sent_true():
+def test_email_history_is_queued_with_job_id():
     owner = new_id("owner")
     create_user(owner)
 
@@ -36,5 +36,42 @@ def test_email_history_happy_path_returns_sent_true():
         json={"email": "a@b.c"},
         timeout=5,
     )
+    assert r.status_code == 202
+    body = r.json()
+    assert body["status"] == "QUEUED" and body["job_id"]
+    assert r.headers["Location"] == f"/api/email-jobs/{body['job_id']}"
+
+    r = requests.get(f"{BASE}{r.headers['Location']}", headers=H(owner), timeout=TIMEOUT)
     assert r.status_code == 200
-    assert r.json() == {"sent": True}
\ No newline at end of file
+    job = r.json()
+    assert job["id"] == body["job_id"]
+    assert job["status"] in ("QUEUED", "SENDING", "RETRYING", "SENT", "FAILED")
+
+def test_email_job_status_is_private_to_requester():
+    owner, other = new_id("owner"), new_id("other")
+    create_user(owner)
+    create_user(other)
+    t = create_task(owner, "Feature-Z")
+    r = requests.post(f"{BASE}/api/tasks/{t['id']}/email-history", headers=H(owner), json={"email": "a@b.c"}, timeout=5)
+    job_id = r.json()["job_id"]
+
+    r = requests.get(f"{BASE}/api/email-jobs/{job_id}", headers=H(other), timeout=TIMEOUT)
+    assert r.status_code == 404
+    r = requests.get(f"{BASE}/api/email-jobs/no-such-job", headers=H(owner), timeout=TIMEOUT)
+    assert r.status_code == 404
+
+def test_email_history_reads_task_and_actor_once_per_request():
+    owner = new_id("owner")
+    create_user(owner)
+    t = create_task(owner, "Feature-Y")
+
+    r = requests.post(
+        f"{BASE}/api/tasks/{t['id']}/email-history",
+        headers=H(owner),
+        json={"email": "a@b.c"},
+        timeout=5,
+    )
+    assert r.status_code == 202
+    calls = dict(kv.split("=") for kv in r.headers["X-Repo-Calls"].split(","))
+    assert calls["tasks.get"] == "1"
+    assert calls["users.get"] == "1"
@@ -53,4 +53,17 @@ def test_register_bad_nickname_400():
         timeout=TIMEOUT,
     )
     assert r.status_code == 400
-    assert "invalid nickname" in r.json().get("message", "").lower()
\ No newline at end of file
+    assert "invalid nickname" in r.json().get("message", "").lower()
+
+def test_register_duplicate_email_and_nickname_400():
+    payload = {
+        "email": new_email(),
+        "first_name": "Alice",
+        "last_name": "Wonderland",
+        "nickname": "alice_dup",
+    }
+    r = requests.post(f"{BASE}/api/register", json=payload, timeout=TIMEOUT)
+    assert r.status_code == 201, r.text
+    r2 = requests.post(f"{BASE}/api/register", json=payload, timeout=TIMEOUT)
+    assert r2.status_code == 400
+    assert "already exists" in r2.json().get("message", "")
@@ -1,3 +1,4 @@
+import json
 import os
 import uuid
 import requests
@@ -73,6 +74,29 @@ def test_create_and_list_tasks_visible_for_owner_only():
     ids2 = {t["id"] for t in r2.json()}
     assert t1["id"] not in ids2
 
+def test_bulk_create_returns_per_item_results():
+    u = new_id("u"); create_user(u)
+    r = requests.post(
+        f"{BASE}/api/tasks/bulk",
+        headers=H(u),
+        json=[{"title": "B1"}, {"title": "B2", "priority": "HIGH"}],
+    )
+    assert r.status_code == 201, r.text
+    results = r.json()["results"]
+    assert [x["ok"] for x in results] == [True, True]
+    assert results[1]["task"]["priority"] == "HIGH"
+
+    ids = {t["id"] for t in requests.get(f"{BASE}/api/tasks", headers=H(u)).json()}
+    assert {x["task"]["id"] for x in results} <= ids
+
+    r2 = requests.post(f"{BASE}/api/tasks/bulk", headers=H(u), json=[{"title": "ok"}, {"title": ""}])
+    assert r2.status_code == 207
+    assert [x["ok"] for x in r2.json()["results"]] == [True, False]
+    assert r2.json()["results"][1]["message"] == "Invalid title"
+
+    r3 = requests.post(f"{BASE}/api/tasks/bulk", headers=H(u), json={"title": "x"})
+    assert r3.status_code == 400
+
 def test_create_task_unknown_priority_400():
     u = new_id("u")
     create_user(u)
@@ -166,6 +190,22 @@ def test_assign_and_events_flow():
     kinds = [e["type"] for e in r2.json()]
     assert "ASSIGNED" in kinds
 
+def test_events_after_seq_returns_only_newer():
+    u = new_id("u"); create_user(u)
+    t = create_task(u, "Seq")
+    r = requests.post(f"{BASE}/api/tasks/{t['id']}/status", headers=H(u), json={"status": "IN_PROGRESS"})
+    assert r.status_code == 200
+
+    full = requests.get(f"{BASE}/api/tasks/{t['id']}/events", headers=H(u)).json()
+    assert [e["seq"] for e in full] == [1, 2]
+
+    r2 = requests.get(f"{BASE}/api/tasks/{t['id']}/events?after_seq=1", headers=H(u))
+    assert r2.status_code == 200
+    assert [e["type"] for e in r2.json()] == ["STATUS_CHANGED"]
+
+    r3 = requests.get(f"{BASE}/api/tasks/{t['id']}/events?after_seq=-1", headers=H(u))
+    assert r3.status_code == 400
+
 def test_assign_missing_assignee_id_400():
     m = new_id("m"); create_user(m, role="MANAGER")
     t = create_task(m, "A")
@@ -261,6 +301,132 @@ def test_list_filters_by_status_and_priority():
     assert r_p.status_code == 200
     assert {x["id"] for x in r_p.json()} == {t2["id"]}
 
+def test_list_paginates_with_cursor():
+    u = new_id("u"); create_user(u)
+    created = {create_task(u, f"P{i}")["id"] for i in range(5)}
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = requests.get(f"{BASE}/api/tasks", headers=H(u), params=params)
+        assert r.status_code == 200
+        body = r.json()
+        assert len(body["items"]) <= 2
+        seen.extend(x["id"] for x in body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted(created)
+
+def test_list_invalid_limit_or_cursor_400():
+    u = new_id("u"); create_user(u)
+    r = requests.get(f"{BASE}/api/tasks?limit=abc", headers=H(u))
+    assert r.status_code == 400
+    assert "limit must be an integer" in r.json().get("message", "")
+    r2 = requests.get(f"{BASE}/api/tasks?cursor=%25%25", headers=H(u))
+    assert r2.status_code == 400
+    assert "Invalid cursor" in r2.json().get("message", "")
+
+def test_list_fields_projection():
+    u = new_id("u"); create_user(u)
+    t = create_task(u, "Projected")
+
+    r = requests.get(f"{BASE}/api/tasks?fields=title,status", headers=H(u))
+    assert r.status_code == 200
+    row = next(x for x in r.json() if x["id"] == t["id"])
+    assert row == {"id": t["id"], "title": "Projected", "status": "NEW"}
+
+    r_p = requests.get(f"{BASE}/api/tasks", headers=H(u), params={"fields": "priority", "limit": 10})
+    assert r_p.status_code == 200
+    assert all(set(x) == {"id", "priority"} for x in r_p.json()["items"])
+
+    r_bad = requests.get(f"{BASE}/api/tasks?fields=title,password", headers=H(u))
+    assert r_bad.status_code == 400
+    assert "Unknown task field: password" in r_bad.json().get("message", "")
+
+def test_list_and_events_are_streamed_without_content_length():
+    u = new_id("u"); create_user(u)
+    ids = {create_task(u, f"S{i}")["id"] for i in range(3)}
+
+    r = requests.get(f"{BASE}/api/tasks", headers=H(u), stream=True)
+    assert r.status_code == 200
+    assert "Content-Length" not in r.headers
+    assert {x["id"] for x in r.json()} == ids
+
+    tid = next(iter(ids))
+    r_e = requests.get(f"{BASE}/api/tasks/{tid}/events", headers=H(u), stream=True)
+    assert r_e.status_code == 200
+    assert "Content-Length" not in r_e.headers
+    assert [e["type"] for e in r_e.json()] == ["CREATED"]
+
+def test_list_and_events_support_etag_conditional_get():
+    u = new_id("u"); create_user(u)
+    t = create_task(u, "Cached")
+
+    r = requests.get(f"{BASE}/api/tasks", headers=H(u))
+    etag = r.headers["ETag"]
+    r_304 = requests.get(f"{BASE}/api/tasks", headers={**H(u), "If-None-Match": etag})
+    assert r_304.status_code == 304 and r_304.content == b""
+    assert r_304.headers["ETag"] == etag
+
+    # inne parametry = inny ETag; zapis = nowa wersja
+    assert requests.get(f"{BASE}/api/tasks?status=NEW", headers=H(u)).headers["ETag"] != etag
+    create_task(u, "Another")
+    assert requests.get(f"{BASE}/api/tasks", headers={**H(u), "If-None-Match": etag}).status_code == 200
+
+    # tak samo parametry listy zadań
+    for bad in ("status=BOGUS", "priority=BOGUS", "fields=password", "limit=abc", "limit=0", "cursor=%25%25"):
+        r_bad = requests.get(f"{BASE}/api/tasks?{bad}", headers={**H(u), "If-None-Match": "*"})
+        assert r_bad.status_code == 400, bad
+
+    r_e = requests.get(f"{BASE}/api/tasks/{t['id']}/events", headers=H(u))
+    e_tag = r_e.headers["ETag"]
+    assert requests.get(f"{BASE}/api/tasks/{t['id']}/events", headers={**H(u), "If-None-Match": e_tag}).status_code == 304
+    # błędny filtr nie chowa się za 304 (`*` pasuje do każdego ETagu)
+    for bad in ("types=NOPE", "limit=0"):
+        r_bad = requests.get(f"{BASE}/api/tasks/{t['id']}/events?{bad}", headers={**H(u), "If-None-Match": "*"})
+        assert r_bad.status_code == 400, bad
+    requests.post(f"{BASE}/api/tasks/{t['id']}/status", headers=H(u), json={"status": "IN_PROGRESS"})
+    r_e2 = requests.get(f"{BASE}/api/tasks/{t['id']}/events", headers={**H(u), "If-None-Match": e_tag})
+    assert r_e2.status_code == 200 and len(r_e2.json()) == 2
+
+def _next_sse(lines):
+    event = {}
+    for raw in lines:
+        line = raw.decode("utf-8")
+        if not line:
+            if "data" in event:
+                return event
+            event = {}
+            continue
+        if line.startswith(":"):
+            continue
+        key, _, value = line.partition(": ")
+        event[key] = value
+
+def test_stream_pushes_only_visible_task_changes():
+    u = new_id("u"); other = new_id("x")
+    create_user(u); create_user(other)
+    r = requests.get(f"{BASE}/api/stream", params={"actor_id": u}, stream=True, timeout=5)
+    try:
+        assert r.status_code == 200
+        assert r.headers["Content-Type"].startswith("text/event-stream")
+        lines = r.iter_lines(chunk_size=1)
+        create_task(other, "Hidden")
+        mine = create_task(u, "Visible")
+        ev = _next_sse(lines)
+        assert ev["event"] == "task"
+        body = json.loads(ev["data"])
+        assert body["task"]["id"] == mine["id"] and body["event"]["type"] == "CREATED"
+    finally:
+        r.close()
+
+def test_stream_requires_known_actor():
+    assert requests.get(f"{BASE}/api/stream", timeout=5).status_code == 400
+    assert requests.get(f"{BASE}/api/stream", params={"actor_id": "ghost"}, timeout=5).status_code == 400
+
 # --- DELETE ---
 
 def test_delete_only_owner_gets_403():
@@ -321,4 +487,74 @@ def test_forbidden_assign_returns_403():
 def test_404_unknown_route():
     r = requests.get(f"{BASE}/api/no-such-route", headers=H(new_id("u")))
     assert r.status_code == 404
-    assert r.json().get("message") == "Not found"
\ No newline at end of file
+    assert r.json().get("message") == "Not found"
+
+def test_events_filters_types_time_range_and_limit():
+    u = new_id("u"); create_user(u)
+    a = new_id("a"); create_user(a)
+    t = create_task(u, "Filters")
+    assert requests.post(f"{BASE}/api/tasks/{t['id']}/assign", headers=H(u), json={"assignee_id": a}).status_code == 200
+    assert requests.post(f"{BASE}/api/tasks/{t['id']}/status", headers=H(u), json={"status": "IN_PROGRESS"}).status_code == 200
+    url = f"{BASE}/api/tasks/{t['id']}/events"
+    full = requests.get(url, headers=H(u)).json()
+    assert [e["type"] for e in full] == ["CREATED", "ASSIGNED", "STATUS_CHANGED"]
+
+    r = requests.get(url, headers=H(u), params={"types": "assigned,STATUS_CHANGED"})
+    assert [e["type"] for e in r.json()] == ["ASSIGNED", "STATUS_CHANGED"]
+
+    page1 = requests.get(url, headers=H(u), params={"limit": 2}).json()
+    page2 = requests.get(url, headers=H(u), params={"limit": 2, "after_seq": page1[-1]["seq"]}).json()
+    assert [e["seq"] for e in page1 + page2] == [1, 2, 3]
+
+    first = full[0]["timestamp"]
+    r = requests.get(url, headers=H(u), params={"before": first})
+    assert r.status_code == 200 and r.json() == []
+    r = requests.get(url, headers=H(u), params={"after": "2000-01-01T00:00:00", "types": "CREATED"})
+    assert [e["seq"] for e in r.json()] == [1]
+
+    for bad in ({"types": "NOPE"}, {"after": "yesterday"}, {"limit": 0}, {"limit": 501}):
+        r = requests.get(url, headers=H(u), params=bad)
+        assert r.status_code == 400, bad
+
+# ---------------------- stats ----------------------
+def test_task_stats_are_role_aware_and_follow_changes():
+    u = new_id("u"); create_user(u)
+    a = new_id("a"); create_user(a)
+    m = new_id("m"); create_user(m, role="MANAGER")
+    before = requests.get(f"{BASE}/api/tasks/stats", headers=H(m)).json()
+
+    t1 = create_task(u, "S1")
+    t2 = create_task(u, "S2")
+    create_task(a, "Not visible for u")
+    assert requests.post(f"{BASE}/api/tasks/{t1['id']}/assign", headers=H(u), json={"assignee_id": a}).status_code == 200
+    assert requests.post(f"{BASE}/api/tasks/{t1['id']}/status", headers=H(u), json={"status": "IN_PROGRESS"}).status_code == 200
+    assert requests.patch(f"{BASE}/api/tasks/{t2['id']}", headers=H(u), json={"priority": "HIGH"}).status_code == 200
+
+    r = requests.get(f"{BASE}/api/tasks/stats", headers=H(u))
+    assert r.status_code == 200
+    assert r.json() == {
+        "total": 2,
+        "by_status": {"NEW": 1, "IN_PROGRESS": 1, "DONE": 0, "CANCELED": 0},
+        "by_priority": {"LOW": 0, "NORMAL": 1, "HIGH": 1},
+        "by_assignee": {a: 1},
+        "unassigned": 1,
+        "stale": False,
+    }
+    assert requests.get(f"{BASE}/api/tasks/stats", headers=H(a)).json()["total"] == 2
+
+    assert requests.delete(f"{BASE}/api/tasks/{t2['id']}", headers=H(u)).status_code == 200
+    assert requests.get(f"{BASE}/api/tasks/stats", headers=H(u)).json()["total"] == 1
+    after = requests.get(f"{BASE}/api/tasks/stats", headers=H(m)).json()
+    assert after["total"] - before["total"] == 2
+    assert after["by_assignee"].get(a) == 1
+
+def test_task_stats_rebuild_is_manager_only():
+    u = new_id("u"); create_user(u)
+    m = new_id("m"); create_user(m, role="MANAGER")
+    create_task(u, "R")
+    assert requests.post(f"{BASE}/api/tasks/stats/rebuild", headers=H(u)).status_code == 403
+    r = requests.post(f"{BASE}/api/tasks/stats/rebuild", headers=H(m))
+    assert r.status_code == 200
+    assert r.json() == requests.get(f"{BASE}/api/tasks/stats", headers=H(m)).json()
+    assert requests.get(f"{BASE}/api/tasks/stats", headers=H(u)).json()["total"] == 1
+    assert requests.get(f"{BASE}/api/tasks/stats").status_code == 400
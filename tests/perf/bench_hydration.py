@@ -0,0 +1,67 @@
+# Przepustowość hydratacji dokumentów Mongo -> obiekty domenowe (bez bazy, czyste mapowanie).
+# Porównuje konstruktor dataclass (pełna walidacja w __post_init__) z zaufaną ścieżką from_storage:
+#   PYTHONPATH=$PWD python3 tests/perf/bench_hydration.py
+# BENCH_N zmienia liczbę dokumentów (domyślnie 100 000).
+import os
+import time
+from datetime import datetime
+
+from src.domain.user import User, Role, Status
+from src.domain.task import Task, TaskStatus, Priority
+from src.domain.event import TaskEvent, EventType
+import src.repo.mongo_repo as mr
+
+BENCH_N = int(os.getenv("BENCH_N", "100000"))
+
+
+def _docs():
+    now = datetime(2025, 1, 1)
+    users = [{"_id": f"u{i}", "email": f"user{i}@ex.com", "role": "USER", "status": "ACTIVE",
+              "first_name": "Zażółć", "last_name": "Gęśla", "nickname": f"user_{i}"} for i in range(BENCH_N)]
+    tasks = [{"_id": f"t{i}", "title": f"Task {i}", "description": "", "status": "NEW", "priority": "NORMAL",
+              "owner_id": f"u{i % 100}", "assignee_id": None, "due_date": None, "is_deleted": False}
+             for i in range(BENCH_N)]
+    events = [{"_id": f"e{i}", "task_id": f"t{i % 1000}", "timestamp": now, "type": "CREATED",
+               "meta": {}, "seq": i} for i in range(BENCH_N)]
+    return users, tasks, events
+
+
+def _validated_user(d):
+    return User(id=d["_id"], email=d["email"], role=Role[d["role"]], status=Status[d["status"]],
+                first_name=d["first_name"], last_name=d["last_name"], nickname=d["nickname"])
+
+
+def _validated_task(d):
+    return Task(id=d["_id"], title=d["title"], description=d.get("description", ""),
+                status=TaskStatus[d["status"]], priority=Priority[d["priority"]], owner_id=d["owner_id"],
+                assignee_id=d.get("assignee_id"), due_date=d.get("due_date"),
+                is_deleted=bool(d.get("is_deleted", False)))
+
+
+def _validated_event(d):
+    return TaskEvent(id=d["_id"], task_id=d["task_id"], timestamp=d["timestamp"], type=EventType[d["type"]],
+                     meta=d.get("meta", {}), seq=d.get("seq", 0))
+
+
+def _rate(fn, docs):
+    t0 = time.perf_counter()
+    for d in docs:
+        fn(d)
+    return len(docs) / (time.perf_counter() - t0)
+
+
+def main():
+    users, tasks, events = _docs()
+    print(f"n={BENCH_N}  dokumenty/s (więcej = lepiej)")
+    print(f"{'typ':<10} {'konstruktor':>14} {'from_storage':>14} {'x':>6}")
+    for name, slow, fast, docs in (
+        ("User", _validated_user, mr._doc_to_user, users),
+        ("Task", _validated_task, mr._doc_to_task, tasks),
+        ("TaskEvent", _validated_event, mr._doc_to_event, events),
+    ):
+        a, b = _rate(slow, docs), _rate(fast, docs)
+        print(f"{name:<10} {a:>14,.0f} {b:>14,.0f} {b / a:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Czas startu backendu in-memory z trwałością (MemoryPersistence): snapshot + ogon WAL.
+# Buduje stan bezpośrednio w repozytoriach, zapisuje snapshot, dopisuje ogon WAL przez unit of work,
+# po czym mierzy odtworzenie w świeżych repozytoriach:
+#   PYTHONPATH=$PWD python3 tests/perf/bench_recovery.py
+# RECOVERY_TASKS / RECOVERY_EVENTS / RECOVERY_WAL — rozmiar stanu i liczba commitów w ogonie WAL
+# (domyślnie 1 000 000 / 5 000 000 / 10 000; pełny rozmiar potrzebuje ~3,5 GB RAM).
+import gc
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from src.repo.memory_repo import InMemoryUsers, InMemoryTasks, InMemoryEvents, InMemoryUnitOfWork
+from src.repo.memory_persistence import MemoryPersistence
+from src.domain.task import Task, TaskStatus, Priority
+from src.domain.event import TaskEvent, EventType
+
+RECOVERY_TASKS = int(os.getenv("RECOVERY_TASKS", "1000000"))
+RECOVERY_EVENTS = int(os.getenv("RECOVERY_EVENTS", "5000000"))
+RECOVERY_WAL = int(os.getenv("RECOVERY_WAL", "10000"))
+
+_STATUSES = list(TaskStatus)
+_PRIORITIES = list(Priority)
+
+
+def _build(path):
+    users, tasks, events = InMemoryUsers(), InMemoryTasks(), InMemoryEvents()
+    base = datetime(2025, 1, 1)
+    ids = [str(uuid.uuid4()) for _ in range(RECOVERY_TASKS)]
+    tasks._load([
+        Task.from_storage(tid, f"Task {i}", "", _STATUSES[i % 4], _PRIORITIES[i % 3], f"u{i % 1000}",
+                          f"u{(i * 7) % 1000}" if i % 2 else None, None, False)
+        for i, tid in enumerate(ids)
+    ])
+    per_task, extra = divmod(RECOVERY_EVENTS, max(RECOVERY_TASKS, 1))
+    for i, tid in enumerate(ids):
+        n = per_task + (1 if i < extra else 0)
+        events._by_task[tid] = [
+            TaskEvent.from_storage(f"e{i}-{s}", tid, base + timedelta(seconds=i + s), EventType.UPDATED,
+                                   {"by": f"u{i % 1000}"}, s + 1)
+            for s in range(n)
+        ]
+    persistence = MemoryPersistence(path, users, tasks, events, snapshot_interval=0, fsync_interval=0.05)
+    started = time.perf_counter()
+    persistence.snapshot()
+    snapshot_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(RECOVERY_WAL):
+        task = tasks.get(ids[i % len(ids)])
+        task.status = TaskStatus.IN_PROGRESS
+        with InMemoryUnitOfWork(tasks, events) as uow:
+            uow.update_task(task, fields=("status",))
+            uow.add_event(TaskEvent(f"w{i}", task.id, base, EventType.STATUS_CHANGED, {"from": "NEW", "to": "IN_PROGRESS"}))
+    wal_s = time.perf_counter() - started
+    persistence.close()
+    return snapshot_s, wal_s
+
+
+def main():
+    with tempfile.TemporaryDirectory() as path:
+        snapshot_s, wal_s = _build(path)
+        gc.collect()
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        print(f"state: {RECOVERY_TASKS:,} tasks, {RECOVERY_EVENTS:,} events, WAL tail {RECOVERY_WAL:,} commits")
+        print(f"snapshot write: {snapshot_s:.1f} s, WAL tail write: {wal_s:.2f} s, on disk: {size / 2**20:.0f} MiB")
+
+        users, tasks, events = InMemoryUsers(), InMemoryTasks(), InMemoryEvents()
+        gc.disable()  # miliony obiektów naraz — bez okresowych przejść GC
+        started = time.perf_counter()
+        persistence = MemoryPersistence(path, users, tasks, events, snapshot_interval=0)
+        recovery_s = time.perf_counter() - started
+        gc.enable()
+        loaded = sum(len(v) for v in events._by_task.values())
+        print(f"recovery: {recovery_s:.1f} s ({len(tasks._data):,} tasks, {loaded:,} events, "
+              f"{persistence.recovery['wal_records']:,} WAL records)")
+        persistence.close()
+
+
+if __name__ == "__main__":
+    main()
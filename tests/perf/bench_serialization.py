@@ -0,0 +1,64 @@
+# Serializacja listy zadań do JSON: dotychczasowa ścieżka (dict przez getattr/Enum.name + jsonify
+# z domyślnym providerem Flaska) vs src.utils.serialization (słowniki nazw enumów + orjson, jeśli jest):
+#   PYTHONPATH=$PWD python3 tests/perf/bench_serialization.py
+# BENCH_SIZES zmienia rozmiary payloadu (domyślnie 1000,10000,100000).
+import os
+import time
+from datetime import datetime
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from src.domain.task import Task, TaskStatus, Priority
+from src.utils import serialization as ser
+
+BENCH_SIZES = [int(x) for x in os.getenv("BENCH_SIZES", "1000,10000,100000").split(",")]
+REPEAT = 3
+
+
+def _legacy_task_to_dict(t):
+    # kopia _task_to_dict sprzed zmiany (app/api.py)
+    return {
+        "id": t.id,
+        "title": t.title,
+        "description": t.description,
+        "status": t.status.name,
+        "priority": t.priority.name,
+        "owner_id": t.owner_id,
+        "assignee_id": t.assignee_id,
+        "due_date": t.due_date.isoformat() if t.due_date else None,
+        "is_deleted": bool(getattr(t, "is_deleted", False)),
+    }
+
+
+def _tasks(n):
+    due = datetime(2025, 6, 1, 12, 0, 0)
+    return [
+        Task(id=f"task-{i:08d}", title=f"Task {i}", description="lorem ipsum", status=TaskStatus.IN_PROGRESS,
+             priority=Priority.HIGH, owner_id=f"u{i % 50}", assignee_id=f"u{i % 7}", due_date=due if i % 2 else None)
+        for i in range(n)
+    ]
+
+
+def _best(fn):
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    legacy = DefaultJSONProvider(Flask(__name__))
+    print(f"backend={ser.JSON_BACKEND}  najlepszy z {REPEAT} przebiegów")
+    print(f"{'n':>8} {'obecnie ms':>12} {'nowe ms':>10} {'x':>6}")
+    for n in BENCH_SIZES:
+        tasks = _tasks(n)
+        old = _best(lambda: legacy.dumps([_legacy_task_to_dict(t) for t in tasks]).encode("utf-8"))
+        new = _best(lambda: ser.dumps([ser.task_to_dict(t) for t in tasks]))
+        print(f"{n:>8} {old * 1e3:>12.1f} {new * 1e3:>10.1f} {old / new:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
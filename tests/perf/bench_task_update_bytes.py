@@ -0,0 +1,57 @@
+# Bajty zapisu na operację w MongoTasks.update: pełny zapis (wszystkie pola) vs $set zmienionych pól.
+# Bez bazy — liczymy rozmiar BSON dokumentów wysyłanych do kolekcji.
+#   PYTHONPATH=$PWD python3 tests/perf/bench_task_update_bytes.py
+import os
+import bson
+
+from src.domain.task import Task, TaskStatus, Priority
+from src.repo.mongo_repo import MongoTasks
+
+DESC_BYTES = int(os.getenv("BENCH_DESC_BYTES", "2000"))
+
+
+class RecordingCollection:
+    # MongoTasks zapisuje przez bulk_write — liczymy BSON ładunku każdej operacji
+    # (dokument UpdateOne/ReplaceOne, InsertOne), bez filtra
+    def __init__(self):
+        self.written = 0
+
+    def bulk_write(self, requests, ordered=True, session=None):
+        for op in requests:
+            self.written += len(bson.encode(op._doc))
+
+
+class NullCollection:
+    # kolekcja metadanych (wersja zadań) — ten sam koszt w obu wariantach, poza pomiarem
+    def bulk_write(self, requests, ordered=True, session=None):
+        pass
+
+
+OPERATIONS = [
+    ("assign", ("assignee_id",), lambda t: setattr(t, "assignee_id", "dev-1")),
+    ("status", ("status",), lambda t: setattr(t, "status", TaskStatus.IN_PROGRESS)),
+    ("priority", ("priority",), lambda t: setattr(t, "priority", Priority.HIGH)),
+    ("delete", ("is_deleted",), lambda t: setattr(t, "is_deleted", True)),
+]
+
+
+def measure(op, fields):
+    col = RecordingCollection()
+    repo = MongoTasks(collection=col, meta=NullCollection())
+    t = Task(id="t-1", title="Benchmark task", description="x" * DESC_BYTES, owner_id="owner-1")
+    op(t)
+    repo.update(t, fields=fields)
+    return col.written
+
+
+def main():
+    print(f"description = {DESC_BYTES} B")
+    print(f"{'operation':<10} {'full':>12} {'$set':>8} {'ratio':>8}")
+    for name, fields, op in OPERATIONS:
+        before = measure(op, None)
+        after = measure(op, fields)
+        print(f"{name:<10} {before:>12} {after:>8} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
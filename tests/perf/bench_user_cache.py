@@ -0,0 +1,50 @@
+# Opóźnienie pojedynczego requestu z cache użytkowników (USER_CACHE=1) i bez niego.
+# Domyślnie backend Mongo (wymaga działającej bazy, np. docker compose -f mongo.yml up -d):
+#   PYTHONPATH=$PWD python3 tests/perf/bench_user_cache.py
+# BENCH_STORAGE=memory pozwala sprawdzić skrypt bez bazy.
+import os
+import statistics
+import time
+import uuid
+
+BENCH_N = int(os.getenv("BENCH_N", "500"))
+STORAGE = os.getenv("BENCH_STORAGE", "mongo")
+
+
+def run(cache_on: bool):
+    os.environ["STORAGE"] = STORAGE
+    os.environ["USER_CACHE"] = "1" if cache_on else "0"
+    from app.api import create_app
+
+    app = create_app()
+    client = app.test_client()
+    actor = f"bench-{uuid.uuid4().hex[:8]}"
+    r = client.post("/api/users", json={
+        "id": actor, "email": f"{actor}@ex.com", "role": "USER", "status": "ACTIVE",
+        "first_name": "Bench", "last_name": "User", "nickname": actor[:32].replace("-", "_"),
+    })
+    assert r.status_code == 201, r.get_json()
+    headers = {"X-Actor-Id": actor}
+    for i in range(20):
+        client.post("/api/tasks", headers=headers, json={"title": f"B{i}"})
+
+    samples = []
+    for _ in range(BENCH_N):
+        t0 = time.perf_counter()
+        r = client.get("/api/tasks?limit=20", headers=headers)
+        samples.append(time.perf_counter() - t0)
+        assert r.status_code == 200
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def main():
+    print(f"storage={STORAGE} n={BENCH_N}  GET /api/tasks?limit=20")
+    print(f"{'cache':<6} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for cache_on in (False, True):
+        mean, p50, p99 = run(cache_on)
+        print(f"{'on' if cache_on else 'off':<6} {mean * 1e3:>9.3f} {p50 * 1e3:>9.3f} {p99 * 1e3:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import os
+import tracemalloc
+from datetime import datetime
+
+from src.domain.task import Task, TaskStatus, Priority
+from src.domain.event import TaskEvent, EventType
+
+MEM_N = int(os.getenv("MEM_N", "100000")) # liczba obiektów w pomiarze
+# górne limity bajtów na obiekt (obiekt + unikalny string id); wersje z __dict__ przekraczały oba limity
+MEM_TASK_LIMIT = int(os.getenv("MEM_TASK_LIMIT", "190"))
+MEM_EVENT_LIMIT = int(os.getenv("MEM_EVENT_LIMIT", "200"))
+
+def _bytes_per_object(factory) -> float:
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        keep = [factory(i) for i in range(MEM_N)]
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(keep) == MEM_N
+    # lista trzymająca obiekty to 8 B/wskaźnik — nie wliczamy jej
+    return (after - before) / MEM_N - 8
+
+def test_task_bytes_per_object():
+    def make(i):
+        return Task(id=f"t-{i:08d}", title="Task", owner_id="owner-1", status=TaskStatus.NEW, priority=Priority.NORMAL)
+    per_task = _bytes_per_object(make)
+    print(f"\nTask: {per_task:.0f} B/obiekt (n={MEM_N})")
+    assert per_task < MEM_TASK_LIMIT
+
+def test_event_bytes_per_object():
+    ts = datetime(2025, 1, 1)
+    meta = {}
+    def make(i):
+        return TaskEvent(id=f"e-{i:08d}", task_id="t-00000001", timestamp=ts, type=EventType.CREATED, meta=meta, seq=i)
+    per_event = _bytes_per_object(make)
+    print(f"\nTaskEvent: {per_event:.0f} B/obiekt (n={MEM_N})")
+    assert per_event < MEM_EVENT_LIMIT
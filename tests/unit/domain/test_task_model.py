@@ -45,4 +45,14 @@ class TestTaskModelExtraMessages:
     def test_status_must_be_taskstatus_enum_message(self):
         with pytest.raises(ValueError) as e:
             Task(id="t1", title="Ok", owner_id="u1", status="DONE")
-        assert "status must be TaskStatus enum" in str(e.value)
\ No newline at end of file
+        assert "status must be TaskStatus enum" in str(e.value)
+
+class TestTaskFromStorage:
+    def test_from_storage_matches_constructor(self):
+        dt = datetime(2025, 1, 1)
+        args = ("t1", "Ok", "d", TaskStatus.DONE, Priority.HIGH, "u1", "u2", dt, True)
+        assert Task.from_storage(*args) == Task(*args)
+
+    def test_from_storage_skips_validation(self):
+        t = Task.from_storage("t1", "", "", TaskStatus.NEW, Priority.LOW, "u1", None, None, False)
+        assert t.title == ""
@@ -0,0 +1,218 @@
+import email
+import smtplib
+import socket
+import socketserver
+import threading
+
+import pytest
+
+from src.integrations.emailer import TaskHistoryEmailer
+from src.integrations.email_queue import EmailQueue, EmailQueueFull, JobStatus, job_to_dict, _is_permanent
+from src.integrations.smtp import SMTPRelayClient
+
+# --- lokalny serwer SMTP (stub) ---
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, code, text="OK"):
+        self.wfile.write(f"{code} {text}\r\n".encode())
+
+    def handle(self):
+        srv = self.server
+        self.reply(220, "stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode().strip().split(" ", 1)[0].upper()
+            if verb == "RCPT":
+                self.reply(srv.rcpt_code, "mailbox unavailable" if srv.rcpt_code >= 500 else "OK")
+            elif verb == "DATA":
+                self.reply(354, "end with <CRLF>.<CRLF>")
+                data = b""
+                while not data.endswith(b"\r\n.\r\n"):
+                    data += self.rfile.readline()
+                code = srv.data_codes.pop(0) if srv.data_codes else 250
+                if code == 250:
+                    srv.messages.append(email.message_from_bytes(data[:-5]))
+                self.reply(code, "OK" if code == 250 else "try again later")
+            elif verb == "QUIT":
+                self.reply(221, "bye")
+                return
+            else:  # EHLO/HELO, MAIL, RSET, NOOP
+                self.reply(250)
+
+class _StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.messages = []
+        self.rcpt_code = 250
+        self.data_codes = []  # kody odpowiedzi na kolejne DATA (potem 250)
+
+@pytest.fixture
+def smtp_server():
+    srv = _StubSMTPServer()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+@pytest.fixture
+def make_queue():
+    queues = []
+
+    def make(port, **kw):
+        kw.setdefault("backoff", 0.01)
+        q = EmailQueue(TaskHistoryEmailer(SMTPRelayClient("127.0.0.1", port, timeout=2)), **kw)
+        queues.append(q)
+        return q
+    yield make
+    for q in queues:
+        q.close()
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class _BlockingEmailer:
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+
+    def send_task_history(self, email, task_title, events):
+        self.started.release()
+        self.release.wait(5)
+        return True
+
+# --- testy ---
+def test_delivers_through_smtp_server(smtp_server, make_queue):
+    q = make_queue(smtp_server.server_address[1])
+    job_id = q.submit("u1", "a@b.c", "t1", "Feature A", ["CREATED", "ASSIGNED"])
+    assert q.wait_idle(5)
+    (msg,) = smtp_server.messages
+    assert msg["To"] == "a@b.c" and msg["Subject"].startswith("Task History")
+    assert "Feature A" in msg.get_payload() and "ASSIGNED" in msg.get_payload()
+    job = q.get(job_id)
+    assert (job.status, job.attempts, job.error, job.actor_ids) == (JobStatus.SENT, 1, None, ["u1"])
+    assert job_to_dict(job, "u1") == {"id": job_id, "status": "SENT", "attempts": 1, "error": None, "tasks": ["t1"]}
+    assert q.stats() == {"pending": 0, "sent": 1, "failed": 0, "retries": 0, "rejected": 0, "coalesced": 0, "duplicates": 0}
+    assert q.get("nope") is None
+
+def test_transient_smtp_error_is_retried(smtp_server, make_queue):
+    smtp_server.data_codes = [451, 451]
+    q = make_queue(smtp_server.server_address[1])
+    job_id = q.submit("u1", "a@b.c", "t1", "T", [])
+    assert q.wait_idle(5)
+    job = q.get(job_id)
+    assert (job.status, job.attempts) == (JobStatus.SENT, 3)
+    assert len(smtp_server.messages) == 1 and q.stats()["retries"] == 2
+
+def test_permanent_smtp_error_fails_without_retry(smtp_server, make_queue, caplog):
+    smtp_server.rcpt_code = 550
+    q = make_queue(smtp_server.server_address[1])
+    job_id = q.submit("u1", "nobody@b.c", "t1", "T", [])
+    assert q.wait_idle(5)
+    job = q.get(job_id)
+    assert (job.status, job.attempts) == (JobStatus.FAILED, 1)
+    assert "SMTPRecipientsRefused" in job.error and "failed after 1 attempt" in caplog.text
+
+def test_unreachable_server_fails_after_max_attempts(make_queue):
+    q = make_queue(_free_port(), max_attempts=3)
+    job_id = q.submit("u1", "a@b.c", "t1", "T", [])
+    assert q.wait_idle(5)
+    job = q.get(job_id)
+    assert (job.status, job.attempts) == (JobStatus.FAILED, 3)
+    assert "ConnectionRefusedError" in job.error
+    assert q.stats()["failed"] == 1 and q.stats()["retries"] == 2
+
+def test_client_reporting_failure_is_retried(mocker):
+    mocker.patch("src.integrations.emailer.SMTPClient.send", side_effect=[False, True])
+    q = EmailQueue(backoff=0.01)
+    job_id = q.submit("u1", "a@b.c", "t1", "T", [])
+    assert q.wait_idle(5)
+    assert (q.get(job_id).status, q.get(job_id).attempts) == (JobStatus.SENT, 2)
+    q.close()
+
+def test_digest_coalesces_per_recipient_and_drops_duplicates(smtp_server, make_queue):
+    q = make_queue(smtp_server.server_address[1], digest_window=0.3)
+    first = q.submit("m1", "a@b.c", "t1", "Alpha", ["CREATED"])
+    assert q.submit("m1", "a@b.c", "t2", "Beta", ["CREATED"]) == first
+    assert q.submit("m2", "a@b.c", "t1", "Alpha", ["CREATED", "UPDATED"]) == first  # ta sama historia — nowsza wersja
+    other = q.submit("m1", "x@y.z", "t1", "Alpha", ["CREATED"])
+    assert other != first and q.get(first).status is JobStatus.QUEUED
+    assert q.wait_idle(5)
+
+    by_to = {m["To"]: m for m in smtp_server.messages}
+    assert len(smtp_server.messages) == 2
+    digest = by_to["a@b.c"]
+    assert digest["Subject"].endswith("(2 tasks)")
+    assert digest.get_payload().count('Task "Alpha"') == 1 and "UPDATED" in digest.get_payload()
+    assert 'Task "Beta"' in digest.get_payload() and not by_to["x@y.z"]["Subject"].endswith("tasks)")
+    job = q.get(first)
+    assert (job.actor_ids, list(job.items)) == (["m1", "m2"], ["t1", "t2"])
+    # każdy zlecający widzi tylko swoje zadania z digestu
+    assert (job_to_dict(job, "m1")["tasks"], job_to_dict(job, "m2")["tasks"]) == (["t1", "t2"], ["t1"])
+    assert (q.stats()["coalesced"], q.stats()["duplicates"], q.stats()["sent"]) == (1, 1, 2)
+
+    # po wysłaniu okno jest zamknięte — kolejna prośba to nowy digest
+    assert q.submit("m1", "a@b.c", "t1", "Alpha", []) != first
+    assert q.wait_idle(5) and len(smtp_server.messages) == 3
+
+def test_digest_job_lists_only_the_requesting_actors_tasks():
+    q = EmailQueue(_BlockingEmailer(), workers=1, digest_window=60)
+    job_id = q.submit("a", "x@y.z", "t-a", "A", [])
+    assert q.submit("b", "x@y.z", "t-b", "B", []) == job_id
+    assert q.submit("b", "x@y.z", "t-b", "B", ["UPDATED"]) == job_id
+    job = q.get(job_id)
+    assert list(job.items) == ["t-a", "t-b"]
+    assert (job_to_dict(job, "a")["tasks"], job_to_dict(job, "b")["tasks"]) == (["t-a"], ["t-b"])
+    q.close()
+
+def test_capacity_is_bounded():
+    emailer = _BlockingEmailer()
+    q = EmailQueue(emailer, workers=1, capacity=2)
+    q.submit("u1", "a@b.c", "t1", "T", [])
+    assert emailer.started.acquire(timeout=5)  # pierwsze w trakcie wysyłki, nadal zajmuje miejsce
+    q.submit("u1", "a@b.c", "t1", "T", [])
+    with pytest.raises(EmailQueueFull):
+        q.submit("u1", "a@b.c", "t1", "T", [])
+    assert q.stats()["rejected"] == 1 and q.stats()["pending"] == 2
+    emailer.release.set()
+    assert q.wait_idle(5)
+    q.submit("u1", "a@b.c", "t1", "T", [])  # znowu jest miejsce
+    q.close()
+
+def test_status_of_old_finished_jobs_is_forgotten():
+    q = EmailQueue(_BlockingEmailer(), keep_finished=1)
+    q._emailer.release.set()
+    first = q.submit("u1", "a@b.c", "t1", "T", [])
+    assert q.wait_idle(5)
+    second = q.submit("u1", "a@b.c", "t1", "T", [])
+    assert q.wait_idle(5)
+    assert q.get(first) is None and q.get(second).status is JobStatus.SENT
+    q.close()
+
+def test_close_stops_workers_and_rejects_new_jobs():
+    q = EmailQueue(workers=3)
+    q.close()
+    assert not any(t.is_alive() for t in q._threads)
+    with pytest.raises(RuntimeError, match="closed"):
+        q.submit("u1", "a@b.c", "t1", "T", [])
+
+def test_retry_delay_grows_exponentially_with_cap():
+    q = EmailQueue(backoff=1.0, max_backoff=8.0)
+    q.close()
+    for attempt, full in ((1, 1.0), (2, 2.0), (3, 4.0), (4, 8.0), (10, 8.0)):
+        assert full / 2 <= q._retry_delay(attempt) <= full
+
+def test_rejects_invalid_settings():
+    with pytest.raises(ValueError, match=">= 1"):
+        EmailQueue(workers=0)
+
+def test_permanent_error_classification():
+    assert _is_permanent(smtplib.SMTPDataError(554, b"rejected"))
+    assert not _is_permanent(smtplib.SMTPDataError(451, b"later"))
+    assert not _is_permanent(smtplib.SMTPRecipientsRefused({"a@b.c": (450, b"busy")}))
+    assert not _is_permanent(OSError("reset"))
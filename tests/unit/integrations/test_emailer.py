@@ -25,4 +25,13 @@ def test_email_raises_when_smtp_throws(mocker):
     import pytest
     mocker.patch("src.integrations.emailer.SMTPClient.send", side_effect=Exception("smtp down"))
     with pytest.raises(Exception, match="smtp down"):
-        TaskHistoryEmailer().send_task_history("a@b.c", "T", ["CREATED"])
\ No newline at end of file
+        TaskHistoryEmailer().send_task_history("a@b.c", "T", ["CREATED"])
+
+def test_digest_one_message_for_many_tasks(mocker):
+    mock_send = mocker.patch("src.integrations.emailer.SMTPClient.send", return_value=True)
+    histories = [("Feature A", ["CREATED"]), ("Feature B", ["CREATED", "DONE"])]
+    assert TaskHistoryEmailer().send_digest("a@b.c", histories) is True
+    subject, body, to_ = mock_send.call_args[0]
+    assert subject == f"Task History {date.today().isoformat()} (2 tasks)"
+    assert body.splitlines() == ['Task "Feature A" events: [\'CREATED\']', 'Task "Feature B" events: [\'CREATED\', \'DONE\']']
+    assert to_ == "a@b.c"
@@ -0,0 +1,76 @@
+import pytest
+from src.repo.memory_repo import InMemoryUsers
+from src.repo.cached_users import CachedUsers
+from src.domain.user import User, Role, Status
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+    def __call__(self):
+        return self.t
+
+def _user(uid, status=Status.ACTIVE):
+    return User(id=uid, email=f"{uid}@ex.com", role=Role.USER, status=status,
+                first_name="John", last_name="Doe", nickname=f"nick_{uid}")
+
+def _cached(**kw):
+    inner = InMemoryUsers()
+    clock = FakeClock()
+    return CachedUsers(inner, clock=clock, **kw), inner, clock
+
+def test_get_is_served_from_cache_until_ttl_expires(mocker):
+    cache, inner, clock = _cached(ttl=10)
+    inner.add(_user("u1"))
+    spy = mocker.spy(inner, "get")
+
+    assert cache.get("u1").id == "u1"
+    assert cache.get("u1").id == "u1"
+    assert spy.call_count == 1
+    clock.t = 11
+    cache.get("u1")
+    assert spy.call_count == 2
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 1}
+
+def test_add_invalidates_entry():
+    cache, inner, _ = _cached()
+    cache.add(_user("u1"))
+    assert cache.get("u1").status is Status.ACTIVE
+    cache.add(_user("u1", status=Status.BLOCKED))
+    assert cache.get("u1").status is Status.BLOCKED
+    assert inner.get("u1").status is Status.BLOCKED
+
+def test_lru_evicts_least_recently_used():
+    cache, inner, _ = _cached(max_size=2)
+    for uid in ("a", "b", "c"):
+        inner.add(_user(uid))
+    cache.get("a"); cache.get("b")
+    cache.get("a")          # "a" świeższy niż "b"
+    cache.get("c")          # wypycha "b"
+    assert list(cache._entries) == ["a", "c"]
+
+def test_missing_user_is_not_cached():
+    cache, inner, _ = _cached()
+    assert cache.get("ghost") is None
+    inner.add(_user("ghost"))
+    assert cache.get("ghost").id == "ghost"
+
+def test_concurrent_add_during_miss_does_not_store_stale_user(mocker):
+    cache, inner, _ = _cached()
+    inner.add(_user("u1"))
+    original_get = inner.get
+    def get_then_block(uid):
+        u = original_get(uid)
+        cache.add(_user("u1", status=Status.BLOCKED))
+        return u
+    mocker.patch.object(inner, "get", side_effect=get_then_block)
+    cache.get("u1")
+    assert "u1" not in cache._entries
+
+def test_find_by_email_and_nickname_passes_through():
+    cache, inner, _ = _cached()
+    inner.add(_user("u1"))
+    assert cache.find_by_email_and_nickname("u1@ex.com", "nick_u1").id == "u1"
+
+def test_invalid_size_rejected():
+    with pytest.raises(ValueError):
+        CachedUsers(InMemoryUsers(), max_size=0)
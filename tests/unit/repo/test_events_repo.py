@@ -2,7 +2,7 @@ from datetime import datetime
 from src.repo.memory_repo import InMemoryEvents
 from src.domain.event import TaskEvent, EventType
 
-def test_list_for_task_filters_and_sorts_by_timestamp():
+def test_list_for_task_filters_and_keeps_write_order_by_seq():
     repo = InMemoryEvents()
     tid_a = "ta"
     tid_b = "tb"
@@ -12,9 +12,55 @@ def test_list_for_task_filters_and_sorts_by_timestamp():
     repo.add(TaskEvent("x1", tid_b, datetime(2025,1,1,12,0,2), EventType.UPDATED, {}))
 
     out = repo.list_for_task(tid_a)
-    assert [e.id for e in out] == ["e1", "e2"]
+    assert [(e.id, e.seq) for e in out] == [("e2", 1), ("e1", 2)]
     assert all(e.task_id == tid_a for e in out)
+    assert repo.list_for_task(tid_b)[0].seq == 1
+
+def test_list_for_task_after_seq_returns_only_newer():
+    repo = InMemoryEvents()
+    for i in range(5):
+        repo.add(TaskEvent(f"e{i}", "t", datetime(2025,1,1,12,0,i), EventType.UPDATED, {}))
+    assert [e.id for e in repo.list_for_task("t", after_seq=3)] == ["e3", "e4"]
+    assert repo.list_for_task("t", after_seq=5) == []
 
 def test_list_for_task_empty_for_unknown_task():
     repo = InMemoryEvents()
-    assert repo.list_for_task("nope") == []
\ No newline at end of file
+    assert repo.list_for_task("nope") == []
+
+def test_last_seq_tracks_latest_event_per_task():
+    repo = InMemoryEvents()
+    assert repo.last_seq("ta") == 0
+    repo.add_many([TaskEvent(f"e{i}", "ta", datetime(2025,1,1), EventType.UPDATED, {}) for i in range(3)])
+    repo.add(TaskEvent("x1", "tb", datetime(2025,1,1), EventType.CREATED, {}))
+    assert (repo.last_seq("ta"), repo.last_seq("tb")) == (3, 1)
+
+def _history(repo, tid="t", n=6):
+    kinds = [EventType.CREATED, EventType.UPDATED, EventType.ASSIGNED, EventType.UPDATED, EventType.STATUS_CHANGED, EventType.UPDATED]
+    repo.add_many([TaskEvent(f"e{i}", tid, datetime(2025,1,1,12,0,i), kinds[i % 6], {}) for i in range(n)])
+
+def test_list_for_task_time_range_types_and_limit():
+    repo = InMemoryEvents()
+    _history(repo)
+    ids = lambda **kw: [e.id for e in repo.list_for_task("t", **kw)]
+    assert ids(after=datetime(2025,1,1,12,0,1), before=datetime(2025,1,1,12,0,4)) == ["e2", "e3"]
+    assert ids(after=datetime(2025,1,1,12,0,0,500)) == ["e1", "e2", "e3", "e4", "e5"]
+    assert ids(before=datetime(2025,1,1,12,0,0)) == []
+    assert ids(types=[EventType.UPDATED]) == ["e1", "e3", "e5"]
+    assert ids(types=[EventType.UPDATED], limit=2) == ["e1", "e3"]
+    assert ids(limit=2) == ["e0", "e1"]
+    assert [e.id for e in repo.list_for_task("t", 3, after=datetime(2025,1,1,12,0,1), limit=1)] == ["e3"]
+    assert [e.seq for e in repo.iter_for_task("t", types=[EventType.STATUS_CHANGED])] == [5]
+    assert repo.list_for_task("nope", after=datetime(2025,1,1)) == []
+
+def test_time_range_falls_back_to_scan_when_timestamps_go_back():
+    repo = InMemoryEvents()
+    _history(repo, n=3)
+    assert [e.id for e in repo.list_for_task("t", after=datetime(2025,1,1,12,0,0))] == ["e1", "e2"]  # bisekcja
+    # zdarzenie z cofniętym zegarem: od teraz filtr liniowy w kolejności seq
+    repo.add(TaskEvent("late", "t", datetime(2025,1,1,11,0,0), EventType.UPDATED, {}))
+    repo.add(TaskEvent("e3", "t", datetime(2025,1,1,12,0,3), EventType.UPDATED, {}))
+    assert [e.id for e in repo.list_for_task("t", after=datetime(2025,1,1,12,0,0))] == ["e1", "e2", "e3"]
+    assert [e.id for e in repo.list_for_task("t", before=datetime(2025,1,1,12,0,1))] == ["e0", "late"]
+    repo.add_many([TaskEvent("b", "u", datetime(2025,1,1,12,0,1), EventType.UPDATED, {}),
+                   TaskEvent("a", "u", datetime(2025,1,1,12,0,0), EventType.UPDATED, {})])
+    assert [e.id for e in repo.list_for_task("u", after=datetime(2025,1,1,11,0,0))] == ["b", "a"]
@@ -0,0 +1,161 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+from src.repo.file_events import FileEvents
+from src.domain.event import TaskEvent, EventType
+
+def _ev(i, task_id="t", type=EventType.UPDATED, meta=None):
+    return TaskEvent(f"e{i}", task_id, datetime(2025, 1, 1, 12, 0, i % 60), type, meta or {"i": i})
+
+def _segments(path):
+    return sorted(n for n in os.listdir(path) if n.startswith("events-"))
+
+@pytest.fixture
+def repo(tmp_path):
+    r = FileEvents(str(tmp_path / "events"), segment_bytes=4096)
+    yield r
+    r.close()
+
+def test_append_assigns_seq_per_task_and_reads_back(repo):
+    repo.add(_ev(1, "ta", EventType.CREATED))
+    repo.add_many([_ev(2, "ta"), _ev(3, "tb"), _ev(4, "ta", EventType.ASSIGNED, {"from": None, "to": "u"})])
+    out = repo.list_for_task("ta")
+    assert [(e.id, e.seq) for e in out] == [("e1", 1), ("e2", 2), ("e4", 3)]
+    assert out[0].type == EventType.CREATED and out[0].timestamp == datetime(2025, 1, 1, 12, 0, 1)
+    assert out[2].meta == {"from": None, "to": "u"}
+    assert [e.seq for e in repo.list_for_task("tb")] == [1]
+    assert (repo.last_seq("ta"), repo.last_seq("tb"), repo.last_seq("nope")) == (3, 1, 0)
+
+def test_after_seq_and_lazy_iterator(repo):
+    repo.add_many([_ev(i) for i in range(5)])
+    assert [e.id for e in repo.list_for_task("t", after_seq=3)] == ["e3", "e4"]
+    it = repo.iter_for_task("t", after_seq=1)
+    assert not isinstance(it, list)
+    assert [e.seq for e in it] == [2, 3, 4, 5]
+    assert repo.list_for_task("t", after_seq=5) == []
+    assert repo.list_for_task("nope") == []
+    repo.add_many([])
+    assert repo.last_seq("t") == 5
+
+def test_time_range_types_and_limit(repo, monkeypatch):
+    kinds = [EventType.CREATED, EventType.UPDATED, EventType.ASSIGNED, EventType.UPDATED, EventType.UPDATED]
+    repo.add_many([_ev(i, type=kinds[i]) for i in range(5)])
+    at = lambda s: datetime(2025, 1, 1, 12, 0, s)
+    assert [e.id for e in repo.list_for_task("t", after=at(1), before=at(4))] == ["e2", "e3"]
+    assert [e.id for e in repo.list_for_task("t", types=[EventType.UPDATED], limit=2)] == ["e1", "e3"]
+    assert [e.id for e in repo.list_for_task("t", 3, after=at(0))] == ["e3", "e4"]
+
+    # zakres czasu po bisekcji: czytane log(n) rekordów, nie cała historia
+    reads = []
+    real = FileEvents._read
+    monkeypatch.setattr(FileEvents, "_read", lambda self, pos: reads.append(pos) or real(self, pos))
+    repo.add_many([_ev(i) for i in range(5, 60)])
+    assert [e.id for e in repo.iter_for_task("t", after=at(57))] == ["e58", "e59"]
+    assert len(reads) < 15
+    assert repo.list_for_task("nope", before=at(1)) == []
+
+def test_time_range_scans_when_timestamps_go_back(tmp_path):
+    path = str(tmp_path / "events")
+    r = FileEvents(path, segment_bytes=4096)
+    r.add_many([_ev(1), _ev(3), _ev(2)])  # cofnięty zegar już w zapisanej historii
+    r.close()
+    r = FileEvents(path, segment_bytes=4096)
+    at = lambda s: datetime(2025, 1, 1, 12, 0, s)
+    assert [e.id for e in r.list_for_task("t", after=at(1))] == ["e3", "e2"]
+    r.add(_ev(9))
+    assert [e.id for e in r.list_for_task("t", before=at(3))] == ["e1", "e2"]
+
+    r.add_many([_ev(10, "u"), _ev(12, "u")])
+    assert [e.id for e in r.list_for_task("u", after=at(10))] == ["e12"]  # uporządkowane — bisekcja
+    r.add(_ev(11, "u"))  # od teraz filtr liniowy
+    assert [e.id for e in r.list_for_task("u", after=at(10))] == ["e12", "e11"]
+    r.close()
+
+def test_reopen_rebuilds_index_and_continues_seq(tmp_path):
+    path = str(tmp_path / "events")
+    r = FileEvents(path, segment_bytes=4096)
+    r.add_many([_ev(i, f"t{i % 2}") for i in range(6)])
+    r.close()
+    r.close()  # idempotentne
+
+    r = FileEvents(path, segment_bytes=4096)
+    assert [e.id for e in r.list_for_task("t1")] == ["e1", "e3", "e5"]
+    r.add(_ev(7, "t1"))
+    assert r.list_for_task("t1", after_seq=3)[0].seq == 4
+    r.close()
+
+def test_torn_tail_is_dropped_on_recovery(tmp_path):
+    path = str(tmp_path / "events")
+    r = FileEvents(path, segment_bytes=4096)
+    r.add_many([_ev(1), _ev(2)])
+    end = r._active.end
+    r.close()
+    # urwany zapis: nagłówek z długością, ale payload nie pasuje do CRC
+    with open(os.path.join(path, _segments(path)[-1]), "r+b") as f:
+        f.seek(end)
+        f.write(b"\x10\x00\x00\x00\xde\xad\xbe\xef{\"id\":\"e3\"")
+
+    r = FileEvents(path, segment_bytes=4096)
+    assert [e.id for e in r.list_for_task("t")] == ["e1", "e2"]
+    r.add(_ev(3))
+    r.close()
+    r = FileEvents(path, segment_bytes=4096)
+    assert [(e.id, e.seq) for e in r.list_for_task("t")] == [("e1", 1), ("e2", 2), ("e3", 3)]
+    r.close()
+
+def test_rolls_segments_when_full(tmp_path):
+    path = str(tmp_path / "events")
+    r = FileEvents(path, segment_bytes=4096)
+    r.add_many([_ev(i, f"t{i % 3}") for i in range(120)])
+    for i in range(120, 200):
+        r.add(_ev(i, f"t{i % 3}"))
+    assert len(_segments(path)) > 2
+    assert [e.id for e in r.list_for_task("t2")] == [f"e{i}" for i in range(2, 200, 3)]
+    r.close()
+
+    r = FileEvents(path, segment_bytes=4096)
+    assert [e.seq for e in r.list_for_task("t0")] == list(range(1, 68))
+    r.close()
+
+def test_record_larger_than_segment(tmp_path):
+    path = str(tmp_path / "events")
+    r = FileEvents(path, segment_bytes=4096)
+    big = {"note": "x" * 10000}
+    r.add(_ev(1, meta=big))  # pusty aktywny segment jest powiększany
+    r.add(_ev(2, meta=big))  # a pełny — zamykany i zaczynany nowy, dość duży na rekord
+    r.add(_ev(3))
+    assert [e.meta for e in r.list_for_task("t")][:2] == [big, big]
+    assert len(_segments(path)) == 3  # e3 nie mieści się już w segmencie e2
+    r.close()
+
+def test_background_fsync(tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+    r = FileEvents(str(tmp_path / "events"), segment_bytes=4096, fsync_interval=60)
+    synced.clear()
+    r.add(_ev(1))
+    assert synced == []  # zapis nie czeka na dysk
+    r.sync()
+    assert synced == [r._active.fd]
+    r.sync()
+    assert len(synced) == 1  # nic nowego do zsynchronizowania
+    r.add(_ev(2))
+    r.close()
+    assert r._flusher is not None and not r._flusher.is_alive()
+
+def test_background_flusher_syncs_dirty_log(tmp_path):
+    r = FileEvents(str(tmp_path / "events"), segment_bytes=4096, fsync_interval=0.001)
+    r.add(_ev(1))
+    deadline = time.monotonic() + 5
+    while r._dirty and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert not r._dirty
+    r.close()
+
+def test_rejects_tiny_segments(tmp_path):
+    with pytest.raises(ValueError, match="segment_bytes"):
+        FileEvents(str(tmp_path), segment_bytes=1024)
@@ -0,0 +1,71 @@
+from datetime import datetime
+from src.repo.memory_repo import InMemoryUsers, InMemoryTasks, InMemoryEvents, InMemoryTaskStats
+from src.repo.identity_map import ScopedUsers, ScopedTasks, ScopedEvents
+from src.repo.request_scope import request_scope, current_scope
+from src.domain.user import User, Role, Status
+from src.domain.task import Task
+from src.domain.event import TaskEvent, EventType
+
+def _user(uid):
+    return User(id=uid, email=f"{uid}@ex.com", role=Role.USER, status=Status.ACTIVE,
+                first_name="John", last_name="Doe", nickname=f"nick_{uid}")
+
+def test_get_loads_each_entity_once_per_scope(mocker):
+    users, tasks = InMemoryUsers(), InMemoryTasks()
+    users.add(_user("u1"))
+    tasks.add(Task(id="t1", title="A", owner_id="u1"))
+    su, st = ScopedUsers(users), ScopedTasks(tasks)
+    users_spy, tasks_spy = mocker.spy(users, "get"), mocker.spy(tasks, "get")
+
+    with request_scope() as scope:
+        for _ in range(3):
+            assert su.get("u1").id == "u1"
+            assert st.get("t1").id == "t1"
+        assert su.get("ghost") is None and su.get("ghost") is None
+        assert scope.calls == {"users.get": 2, "tasks.get": 1}
+        assert scope.format_calls() == "tasks.get=1,users.get=2"
+
+    assert users_spy.call_count == 2 and tasks_spy.call_count == 1
+    # nowy scope = świeże odczyty
+    with request_scope():
+        st.get("t1")
+    assert tasks_spy.call_count == 2
+    assert current_scope() is None
+
+def test_without_scope_everything_passes_through(mocker):
+    users, tasks = InMemoryUsers(), InMemoryTasks()
+    users.add(_user("u1"))
+    tasks.add(Task(id="t1", title="A", owner_id="u1"))
+    su, st = ScopedUsers(users), ScopedTasks(tasks)
+    spy = mocker.spy(tasks, "get")
+    st.get("t1"); st.get("t1"); su.get("u1")
+    su.add(_user("u2"))
+    assert spy.call_count == 2
+
+def test_writes_are_counted_and_refresh_the_map():
+    users, tasks, events = InMemoryUsers(), InMemoryTasks(), InMemoryEvents()
+    su, st, se = ScopedUsers(users), ScopedTasks(tasks), ScopedEvents(events)
+    t = Task(id="t1", title="A", owner_id="u1")
+    with request_scope() as scope:
+        su.add(_user("u1"))
+        st.add(t)
+        st.add_many([Task(id="t2", title="B", owner_id="u1")])
+        st.update(t, fields=("title",))
+        se.add(TaskEvent("e1", "t1", datetime(2025, 1, 1), EventType.CREATED, {}))
+        se.add_many([TaskEvent("e2", "t1", datetime(2025, 1, 1), EventType.UPDATED, {})])
+        assert st.get("t1") is t and st.get("t2").title == "B" and su.get("u1").id == "u1"
+        assert [e.seq for e in se.list_for_task("t1", after_seq=1)] == [2]
+        assert len(st.list()) == 2 and len(st.query(visible_to="u1")) == 2
+        assert su.find_by_email_and_nickname("u1@ex.com", "nick_u1").id == "u1"
+        assert [x.id for x in st.iter_query(visible_to="u1")] == ["t1", "t2"]
+        assert [e.id for e in se.iter_for_task("t1")] == ["e1", "e2"]
+        assert st.version() == 3 and se.last_seq("t1") == 2
+        assert scope.calls == {
+            "users.add": 1, "tasks.add": 1, "tasks.add_many": 1, "tasks.update": 1,
+            "events.add": 1, "events.add_many": 1, "events.list_for_task": 1,
+            "tasks.list": 1, "tasks.query": 1, "users.find_by_email_and_nickname": 1,
+            "tasks.iter_query": 1, "events.iter_for_task": 1, "tasks.version": 1, "events.last_seq": 1,
+        }
+    tasks.stats = InMemoryTaskStats()
+    st.rebuild_stats()  # przekazane do repozytorium — to ono serializuje odbudowę z zapisami
+    assert tasks.stats.get("*")["total"] == 2
@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from src.repo.memory_repo import InMemoryUsers, InMemoryTasks, InMemoryEvents, InMemoryUnitOfWork
+from src.repo.memory_persistence import MemoryPersistence
+from src.domain.user import User, Role, Status
+from src.domain.task import Task, TaskStatus, Priority
+from src.domain.event import TaskEvent, EventType
+
+T0 = datetime(2025, 1, 1, 12, 0, 0, 250)
+
+def _open(path, **kw):
+    users, tasks, events = InMemoryUsers(), InMemoryTasks(), InMemoryEvents()
+    kw.setdefault("snapshot_interval", 0)
+    return users, tasks, events, MemoryPersistence(str(path), users, tasks, events, **kw)
+
+def _user(uid="u1", nickname="abc"):
+    return User(id=uid, email=f"{uid}@b.com", role=Role.MANAGER, status=Status.ACTIVE,
+                first_name="A", last_name="B", nickname=nickname)
+
+def _ev(eid, tid="t1", kind=EventType.UPDATED, meta=None):
+    return TaskEvent(eid, tid, T0, kind, meta or {})
+
+def _files(path):
+    return sorted(os.listdir(path))
+
+def _write_some(users, tasks, events):
+    users.add(_user())
+    tasks.add(Task(id="t2", title="B", owner_id="u1", priority=Priority.HIGH))
+    with InMemoryUnitOfWork(tasks, events) as uow:
+        uow.add_task(Task(id="t1", title="A", owner_id="u1", due_date=datetime(2025, 2, 1)))
+        uow.add_event(_ev("e1", kind=EventType.CREATED, meta={"owner": "u1"}))
+    events.add_many([_ev("e2", meta={"changes": {"title": {"from": "A", "to": "A2"}}})])
+
+def _assert_restored(users, tasks, events):
+    assert users.get("u1").role is Role.MANAGER
+    assert users.find_by_email_and_nickname("u1@b.com", "abc").id == "u1"
+    assert [t.id for t in tasks.query()] == ["t2", "t1"]
+    assert tasks.get("t1").due_date == datetime(2025, 2, 1) and tasks.get("t2").priority is Priority.HIGH
+    assert [t.id for t in tasks.query(after="t1", limit=5)] == ["t2"]
+    out = events.list_for_task("t1")
+    assert [(e.id, e.seq, e.timestamp) for e in out] == [("e1", 1, T0), ("e2", 2, T0)]
+    assert out[1].meta == {"changes": {"title": {"from": "A", "to": "A2"}}}
+
+def test_replays_wal_after_restart(tmp_path):
+    users, tasks, events, p = _open(tmp_path)
+    _write_some(users, tasks, events)
+    version = tasks.version()
+    p.close()
+    p.close()  # idempotentne
+    users.add(_user("u9", "zzz"))  # po close() repozytoria działają dalej, już bez WAL
+
+    users, tasks, events, p = _open(tmp_path)
+    _assert_restored(users, tasks, events)
+    assert users.get("u9") is None
+    assert tasks.version() == version
+    assert p.recovery["snapshot_generation"] == 0 and p.recovery["wal_records"] == 4
+    p.close()
+
+def test_snapshot_plus_wal_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.repo.memory_persistence._SNAPSHOT_CHUNK", 2)  # kilka porcji na sekcję
+    users, tasks, events, p = _open(tmp_path)
+    _write_some(users, tasks, events)
+    p.snapshot()
+    assert _files(tmp_path) == ["snapshot.bin", "wal-000002.log"]
+    t1 = tasks.get("t1")
+    t1.status = TaskStatus.IN_PROGRESS
+    tasks.update(t1)
+    events.add(_ev("e3", kind=EventType.STATUS_CHANGED))
+    version = tasks.version()
+    p.close()
+
+    users, tasks, events, p = _open(tmp_path)
+    assert p.recovery["snapshot_generation"] == 1 and p.recovery["wal_records"] == 2
+    assert tasks.get("t1").status is TaskStatus.IN_PROGRESS
+    assert [e.seq for e in events.list_for_task("t1")] == [1, 2, 3]
+    assert tasks.version() == version
+    assert [t.id for t in tasks.query(visible_to="u1")] == ["t2", "t1"]
+    p.close()
+
+def test_changes_made_while_snapshot_is_written_are_not_duplicated(tmp_path, monkeypatch):
+    users, tasks, events, p = _open(tmp_path)
+    _write_some(users, tasks, events)
+    write = p._write_snapshot
+
+    def racing_write(*args):
+        # zmiany po przecięciu WAL, a przed serializacją: trafią i do snapshotu, i do WAL
+        events.add(_ev("e3"))
+        t2 = tasks.get("t2")
+        t2.title = "B2"
+        tasks.update(t2)
+        write(*args)
+
+    monkeypatch.setattr(p, "_write_snapshot", racing_write)
+    p.snapshot()
+    p.close()
+
+    users, tasks, events, p = _open(tmp_path)
+    assert [(e.id, e.seq) for e in events.list_for_task("t1")] == [("e1", 1), ("e2", 2), ("e3", 3)]
+    assert tasks.get("t2").title == "B2"
+    p.close()
+
+def test_torn_wal_tail_is_cut_and_stale_generations_removed(tmp_path):
+    users, tasks, events, p = _open(tmp_path)
+    _write_some(users, tasks, events)
+    p.snapshot()
+    events.add(_ev("e3"))
+    p.close()
+    wal = os.path.join(tmp_path, "wal-000002.log")
+    good = os.path.getsize(wal)
+    with open(wal, "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x00\x00\x00\x00partial")
+    # pozostałość po przerwanym sprzątaniu: pokolenie już zawarte w snapshocie
+    open(os.path.join(tmp_path, "wal-000001.log"), "wb").close()
+
+    users, tasks, events, p = _open(tmp_path)
+    assert os.path.getsize(wal) == good
+    assert "wal-000001.log" not in _files(tmp_path)
+    assert [e.id for e in events.list_for_task("t1")] == ["e1", "e2", "e3"]
+    p.close()
+
+def test_rejects_foreign_snapshot_file(tmp_path):
+    with open(os.path.join(tmp_path, "snapshot.bin"), "wb") as f:
+        f.write(b"not a snapshot")
+    with pytest.raises(ValueError, match="Not a snapshot file"):
+        _open(tmp_path)
+
+def test_background_fsync_defers_sync(tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+    users, tasks, events, p = _open(tmp_path, fsync_interval=60)
+    tasks.add(Task(id="t1", title="A", owner_id="u"))
+    assert synced == []  # zapis nie czeka na dysk
+    p._fsync()
+    p._fsync()  # nic nowego
+    assert len(synced) == 1
+    p.close()
+
+def test_concurrent_sync_is_shared(tmp_path):
+    users, tasks, events, p = _open(tmp_path)
+    p._sync_lock.acquire()
+    tasks.add_many([])  # nic do zapisania — bez czekania na blokadę
+    p._append(("u", []))
+    waiter = threading.Thread(target=p.sync)
+    waiter.start()
+    time.sleep(0.05)
+    p._synced = p._written  # "inny wątek" zsynchronizował w międzyczasie
+    p._sync_lock.release()
+    waiter.join()
+    p.close()
+
+def test_background_snapshot_runs_when_wal_grew(tmp_path, caplog):
+    users, tasks, events, p = _open(tmp_path, snapshot_interval=0.01, fsync_interval=0.01)
+    tasks.add(Task(id="t1", title="A", owner_id="u"))
+    deadline = time.monotonic() + 5
+    while "snapshot.bin" not in _files(tmp_path) and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert p.stats()["wal_records"] == 0
+
+    def boom():
+        raise OSError("disk full")
+    p.snapshot = boom
+    tasks.add(Task(id="t2", title="B", owner_id="u"))
+    while "Background snapshot failed" not in caplog.text and time.monotonic() < deadline:
+        time.sleep(0.005)
+    p.close()
+    assert "Background snapshot failed" in caplog.text
+    assert p.stats()["wal_records"] == 1
+
+def test_rejects_truncated_snapshot(tmp_path):
+    users, tasks, events, p = _open(tmp_path)
+    _write_some(users, tasks, events)
+    p.snapshot()
+    p.close()
+    snap = os.path.join(tmp_path, "snapshot.bin")
+    with open(snap, "r+b") as f:
+        f.truncate(os.path.getsize(snap) - 4)  # brak rekordu końca
+    with pytest.raises(ValueError, match="truncated or corrupt"):
+        _open(tmp_path)
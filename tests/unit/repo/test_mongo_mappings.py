@@ -60,6 +60,7 @@ def test_event_mapping_roundtrip():
         timestamp=datetime(2025, 1, 1, 12, 0, 0),
         type=EventType.CREATED,
         meta={"k": "v"},
+        seq=7,
     )
     doc = mr._event_to_doc(e)
     got = mr._doc_to_event(doc)
@@ -68,6 +69,7 @@ def test_event_mapping_roundtrip():
     assert got.timestamp == e.timestamp
     assert got.type == e.type
     assert got.meta == {"k": "v"}
+    assert got.seq == 7
 
 
 def test_event_mapping_meta_default_empty():
@@ -78,4 +80,18 @@ def test_event_mapping_meta_default_empty():
         "type": "ASSIGNED",
     }
     got = mr._doc_to_event(d)
-    assert got.meta == {}
\ No newline at end of file
+    assert got.meta == {}
+    assert got.seq == 0
+
+def test_hydration_uses_trusted_path_without_revalidation(monkeypatch):
+    def boom(self):
+        raise AssertionError("__post_init__ should not run for stored documents")
+
+    monkeypatch.setattr(User, "__post_init__", boom)
+    monkeypatch.setattr(Task, "__post_init__", boom)
+
+    u = mr._doc_to_user({"_id": "u1", "email": "a@b.com", "role": "USER", "status": "ACTIVE",
+                         "first_name": "John", "last_name": "Doe", "nickname": "john_doe"})
+    t = mr._doc_to_task({"_id": "t1", "title": "T", "status": "NEW", "priority": "LOW", "owner_id": "u1"})
+    assert isinstance(u, User) and u.nickname == "john_doe"
+    assert isinstance(t, Task) and t.priority == Priority.LOW and t.is_deleted is False
@@ -2,7 +2,7 @@ from datetime import datetime, timedelta
 import types
 
 from src.domain.user import User, Role, Status
-from src.domain.task import Task, TaskStatus, Priority
+from src.domain.task import Task, TaskStatus, Priority, PartialTask
 from src.domain.event import TaskEvent, EventType
 import src.repo.mongo_repo as mr
 
@@ -11,6 +11,11 @@ import src.repo.mongo_repo as mr
 class FakeCursor:
     def __init__(self, docs):
         self._docs = list(docs)
+        self.hinted = None
+
+    def hint(self, spec):
+        self.hinted = spec
+        return self
 
     def sort(self, spec):
         key = spec[0][0] if spec else None
@@ -18,6 +23,10 @@ class FakeCursor:
             self._docs = sorted(self._docs, key=lambda d: d.get(key))
         return self
 
+    def limit(self, n):
+        self._docs = self._docs[:n]
+        return self
+
     def __iter__(self):
         return iter(self._docs)
 
@@ -26,15 +35,38 @@ class FakeCollection:
     def __init__(self):
         self.docs = {}
         self.indexes = []
+        self.index_options = []
 
     def _match(self, d, flt):
-        return all(d.get(k) == v for k, v in (flt or {}).items())
-
-    def find_one(self, flt):
-        for d in self.docs.values():
-            if self._match(d, flt):
-                return d.copy()
-        return None
+        for k, v in (flt or {}).items():
+            if k == "$and":
+                if not all(self._match(d, sub) for sub in v):
+                    return False
+            elif k == "$or":
+                if not any(self._match(d, sub) for sub in v):
+                    return False
+            elif isinstance(v, dict) and "$exists" in v:
+                if (k in d) != v["$exists"]:
+                    return False
+            elif isinstance(v, dict) and "$ne" in v:
+                if d.get(k) == v["$ne"]:
+                    return False
+            elif isinstance(v, dict) and set(v) & {"$gt", "$lt", "$in"}:
+                x = d.get(k)
+                if x is None or ("$gt" in v and not x > v["$gt"]) or ("$lt" in v and not x < v["$lt"]):
+                    return False
+                if "$in" in v and x not in v["$in"]:
+                    return False
+            elif d.get(k) != v:
+                return False
+        return True
+
+    def find_one(self, flt, projection=None, sort=None):
+        hits = [d for d in self.docs.values() if self._match(d, flt)]
+        if sort:
+            (key, direction), = sort
+            hits.sort(key=lambda d: d.get(key), reverse=direction < 0)
+        return hits[0].copy() if hits else None
 
     def replace_one(self, flt, doc, upsert=False):
         if "_id" in flt:
@@ -46,20 +78,98 @@ class FakeCollection:
         self.docs[key] = doc.copy()
         return types.SimpleNamespace(matched_count=1, upserted_id=key if upsert else None)
 
+    @property
+    def database(self):
+        if not hasattr(self, "_database"):
+            self._database = FakeDB()
+        return self._database
+
+    def find_one_and_update(self, flt, update, projection=None, upsert=False, return_document=None, session=None):
+        self.find_one_and_update_calls = getattr(self, "find_one_and_update_calls", 0) + 1
+        key = flt["_id"]
+        if key not in self.docs and not upsert:
+            return None
+        before = self.docs.get(key)
+        d = self.docs[key] = dict(before or {"_id": key})
+        d.update(update.get("$set", {}))
+        for field, by in update.get("$inc", {}).items():
+            d[field] = d.get(field, 0) + by
+        if return_document is mr.ReturnDocument.BEFORE:
+            return before.copy() if before else None
+        return d.copy()
+
+    def find_one_and_replace(self, flt, doc, projection=None, upsert=False, return_document=None, session=None):
+        self.find_one_and_replace_calls = getattr(self, "find_one_and_replace_calls", 0) + 1
+        before = self.docs.get(flt["_id"])
+        self.docs[flt["_id"]] = doc.copy()
+        return before.copy() if before else None
+
+    def update_one(self, flt, update, upsert=False, session=None):
+        self.last_update = update
+        d = self.docs.get(flt["_id"])
+        if d is None and upsert:
+            d = self.docs[flt["_id"]] = {"_id": flt["_id"], **update.get("$setOnInsert", {})}
+        if d is not None:
+            d.update(update.get("$set", {}))
+            for field, by in update.get("$inc", {}).items():
+                d[field] = d.get(field, 0) + by
+        return types.SimpleNamespace(matched_count=int(d is not None))
+
+    def insert_many(self, docs, ordered=True, session=None):
+        self.insert_many_calls = getattr(self, "insert_many_calls", 0) + 1
+        for doc in docs:
+            self.insert_one(doc)
+        return types.SimpleNamespace(inserted_ids=[d["_id"] for d in docs])
+
+    def bulk_write(self, requests, ordered=True, session=None):
+        self.bulk_write_calls = getattr(self, "bulk_write_calls", 0) + 1
+        self.last_requests = requests
+        upserted = {}
+        for i, req in enumerate(requests):
+            kind = type(req).__name__
+            if kind == "InsertOne":
+                self.insert_one(req._doc)
+                continue
+            key = req._filter["_id"]
+            if kind == "ReplaceOne":
+                self.replace_one(req._filter, req._doc, upsert=True)
+            elif key not in self.docs:
+                self.docs[key] = {
+                    "_id": key, **req._doc.get("$setOnInsert", {}), **req._doc.get("$set", {}), **req._doc.get("$inc", {}),
+                }
+                upserted[i] = key
+            else:
+                self.docs[key].update(req._doc.get("$set", {}))
+                for field, by in req._doc.get("$inc", {}).items():
+                    self.docs[key][field] = self.docs[key].get(field, 0) + by
+        return types.SimpleNamespace(upserted_ids=upserted)
+
+    def delete_many(self, flt, session=None):
+        self.docs = {k: d for k, d in self.docs.items() if not self._match(d, flt)}
+
     def insert_one(self, doc):
         key = doc.get("_id") or doc.get("id")
         self.docs[key] = doc.copy()
         return types.SimpleNamespace(inserted_id=key)
 
-    def find(self, flt=None, projection=None):
+    def find(self, flt=None, projection=None, session=None):
+        self.last_filter = flt
+        self.last_projection = projection
         out = []
         for k, d in self.docs.items():
             if self._match(d, flt or {}):
-                out.append(d.copy())
-        return FakeCursor(out)
+                if projection:
+                    keep = set(projection) | {"_id"}
+                    out.append({f: v for f, v in d.items() if f in keep})
+                else:
+                    out.append(d.copy())
+        self.last_cursor = FakeCursor(out)
+        return self.last_cursor
 
-    def create_index(self, spec):
-        self.indexes.append(spec)
+    def create_index(self, spec, **options):
+        if spec not in self.indexes:
+            self.indexes.append(spec)
+            self.index_options.append(options)
 
 
 class FakeDB:
@@ -73,7 +183,9 @@ class FakeDB:
 
 
 class FakeMongoClient:
-    def __init__(self, uri):
+    def __init__(self, uri, **options):
+        self.uri = uri
+        self.options = options
         self._dbs = {}
 
     def __getitem__(self, db_name):
@@ -151,9 +263,17 @@ def test_mongo_tasks_default_ctor_and_list(monkeypatch):
 
 
 # --------- Tests: Events ---------
-def test_mongo_events_add_and_sorted_listing_injected_col():
+def _task_docs(*ids):
+    # kolekcja zadań z licznikami event_seq (same dokumenty, bez pól zadania)
     col = FakeCollection()
-    repo = mr.MongoEvents(collection=col)
+    for tid in ids:
+        col.docs[tid] = {"_id": tid}
+    return col
+
+
+def test_mongo_events_add_assigns_per_task_seq_and_lists_in_seq_order():
+    col, tasks = FakeCollection(), _task_docs("ta", "tb")
+    repo = mr.MongoEvents(collection=col, tasks=tasks)
 
     tid_a, tid_b = "ta", "tb"
     t0 = datetime(2025, 1, 1, 12, 0, 0)
@@ -165,8 +285,96 @@ def test_mongo_events_add_and_sorted_listing_injected_col():
     repo.add(e1)
     repo.add(x1)
 
+    # kolejność zapisu (seq), nie timestamp
     out = repo.list_for_task(tid_a)
-    assert [e.id for e in out] == ["e1", "e2"]
+    assert [(e.id, e.seq) for e in out] == [("e2", 1), ("e1", 2)]
+    assert x1.seq == 1
+    assert tasks.docs == {"ta": {"_id": "ta", "event_seq": 2}, "tb": {"_id": "tb", "event_seq": 1}}
+
+
+def test_mongo_events_for_unknown_task_raise_without_upsert():
+    import pytest
+    tasks = _task_docs()
+    repo = mr.MongoEvents(collection=FakeCollection(), tasks=tasks)
+    with pytest.raises(ValueError, match="Task not found: ghost"):
+        repo.add(TaskEvent("e1", "ghost", datetime(2025, 1, 1), EventType.CREATED, {}))
+    assert tasks.docs == {} and repo.list_for_task("ghost") == []
+
+
+def test_mongo_events_after_seq_returns_only_newer():
+    col = FakeCollection()
+    repo = mr.MongoEvents(collection=col, tasks=_task_docs("t"))
+    t0 = datetime(2025, 1, 1, 12, 0, 0)
+    for i in range(4):
+        repo.add(TaskEvent(f"e{i}", "t", t0 + timedelta(seconds=i), EventType.UPDATED, {}))
+
+    assert [e.id for e in repo.list_for_task("t", after_seq=2)] == ["e2", "e3"]
+    assert col.last_filter == {"task_id": "t", "seq": {"$gt": 2}}
+    assert repo.list_for_task("t", after_seq=4) == []
+
+
+def test_mongo_events_time_range_types_and_limit_pushed_down():
+    col = FakeCollection()
+    repo = mr.MongoEvents(collection=col, tasks=_task_docs("t"))
+    t0 = datetime(2025, 1, 1, 12, 0, 0)
+    kinds = [EventType.CREATED, EventType.UPDATED, EventType.UPDATED, EventType.STATUS_CHANGED, EventType.UPDATED]
+    for i, kind in enumerate(kinds):
+        repo.add(TaskEvent(f"e{i}", "t", t0 + timedelta(seconds=i), kind, {}))
+
+    out = repo.list_for_task("t", after=t0, before=t0 + timedelta(seconds=4), types=[EventType.UPDATED], limit=1)
+    assert [e.id for e in out] == ["e1"]
+    assert col.last_filter == {
+        "task_id": "t",
+        "timestamp": {"$gt": t0, "$lt": t0 + timedelta(seconds=4)},
+        "type": {"$in": ["UPDATED"]},
+    }
+    # zakres czasu -> indeks (task_id, timestamp)
+    assert col.last_cursor.hinted == [("task_id", 1), ("timestamp", 1)]
+
+    assert [e.id for e in repo.iter_for_task("t", 1, types=[EventType.UPDATED])] == ["e1", "e2", "e4"]
+    assert col.last_cursor.hinted is None
+    assert [e.id for e in repo.list_for_task("t", before=t0 + timedelta(seconds=1))] == ["e0"]
+    assert col.last_filter["timestamp"] == {"$lt": t0 + timedelta(seconds=1)}
+
+
+def test_mongo_iterators_hydrate_lazily_from_cursor(monkeypatch):
+    tasks = mr.MongoTasks(collection=FakeCollection())
+    events = mr.MongoEvents(collection=FakeCollection(), tasks=tasks._collection)
+    tasks.add(_task("a", "u1"))
+    tasks.add(_task("b", "u1"))
+    events.add(TaskEvent("e1", "a", datetime(2025, 1, 1), EventType.CREATED, {}))
+
+    hydrated = []
+    real = mr._doc_to_task
+    monkeypatch.setattr(mr, "_doc_to_task", lambda d: hydrated.append(d["_id"]) or real(d))
+    it = tasks.iter_query()
+    assert hydrated == []
+    assert next(it).id == "a" and hydrated == ["a"]
+    assert [e.seq for e in events.iter_for_task("a")] == [1]
+
+
+def test_mongo_versions_for_etags():
+    meta = FakeCollection()
+    tasks = mr.MongoTasks(collection=FakeCollection(), meta=meta)
+    events = mr.MongoEvents(collection=FakeCollection(), tasks=tasks._collection)
+    assert tasks.version() == 0 and events.last_seq("a") == 0
+
+    t = _task("a", "u1")
+    tasks.add(t)
+    tasks.add_many([_task("b", "u1")])
+    tasks.add_many([])
+    tasks.update(t, fields=("title",))
+    tasks.update(t)
+    assert tasks.version() == 4 and meta.docs["\x1ftasks"]["version"] == 4
+
+    # metadane poza kolekcją zdarzeń: zdarzenia osobnym insert_many
+    uow = mr.MongoUnitOfWork(tasks, events)
+    uow.add_task(_task("c", "u1"))
+    uow.add_event(TaskEvent("e1", "c", datetime(2025, 1, 1), EventType.CREATED, {}))
+    uow.add_event(TaskEvent("e2", "c", datetime(2025, 1, 1), EventType.UPDATED, {}))
+    uow.commit()
+    assert tasks.version() == 5 and events.last_seq("c") == 2
+    assert events._collection.insert_many_calls == 1 and meta.bulk_write_calls == 5
 
 
 def test_mongo_events_default_ctor_creates_index(monkeypatch):
@@ -176,6 +384,8 @@ def test_mongo_events_default_ctor_creates_index(monkeypatch):
     repo = mr.MongoEvents()
     idx = repo._collection.indexes[0]
     assert [k for (k, _v) in idx] == ["task_id", "timestamp"]
+    assert [k for (k, _v) in repo._collection.indexes[1]] == ["task_id", "seq"]
+    assert repo._collection.index_options[1]["unique"] is True
 
 def test_mongo_users_find_by_email_and_nickname(monkeypatch):
     from src.repo import mongo_repo as mr
@@ -190,4 +400,437 @@ def test_mongo_users_find_by_email_and_nickname(monkeypatch):
     })
 
     got = repo.find_by_email_and_nickname("e@x.com","exx")
-    assert got and got.id == "u1"
\ No newline at end of file
+    assert got and got.id == "u1"
+
+def test_mongo_tasks_query_pushes_filter_down():
+    col = FakeCollection()
+    repo = mr.MongoTasks(collection=col)
+    repo.add(_task("a", "u1"))
+    repo.add(_task("b", "u2", prio=Priority.HIGH))
+    deleted = _task("c", "u1")
+    deleted.is_deleted = True
+    repo.add(deleted)
+    shared = _task("d", "u2")
+    shared.assignee_id = "u1"
+    repo.add(shared)
+
+    assert {t.id for t in repo.query(visible_to="u1")} == {"a", "d"}
+    assert col.last_filter == {"$and": [
+        {"$or": [{"owner_id": "u1"}, {"assignee_id": "u1"}]},
+        {"is_deleted": {"$ne": True}},
+    ]}
+    assert {t.id for t in repo.query(visible_to="u1", include_deleted=True)} == {"a", "c", "d"}
+    assert {t.id for t in repo.query(priority=Priority.HIGH, status=TaskStatus.NEW)} == {"b"}
+    assert {t.id for t in repo.query(include_deleted=True)} == {"a", "b", "c", "d"}
+    assert col.last_filter == {}
+
+    # dokument zapisany bez pola is_deleted (starsze dane) nadal jest widoczny
+    col.docs["e"] = {k: v for k, v in mr._task_to_doc(_task("e", "u1")).items() if k != "is_deleted"}
+    assert {t.id for t in repo.query(visible_to="u1")} == {"a", "d", "e"}
+
+
+def test_task_query_filter_single_clause_is_not_wrapped():
+    assert mr._task_query_filter() == {"is_deleted": {"$ne": True}}
+    assert mr._task_query_filter(status=TaskStatus.DONE, include_deleted=True) == {"status": "DONE"}
+
+
+def test_mongo_tasks_query_keyset_page():
+    col = FakeCollection()
+    repo = mr.MongoTasks(collection=col)
+    for tid in ("c", "a", "e", "b", "d"):
+        repo.add(_task(tid, "u1"))
+
+    assert [t.id for t in repo.query(limit=2)] == ["a", "b"]
+    assert [t.id for t in repo.query(after="b", limit=2)] == ["c", "d"]
+    assert col.last_filter == {"$and": [{"is_deleted": {"$ne": True}}, {"_id": {"$gt": "b"}}]}
+    assert [t.id for t in repo.query(include_deleted=True, after="c")] == ["d", "e"]
+    assert col.last_filter == {"_id": {"$gt": "c"}}
+
+
+def test_mongo_tasks_query_with_fields_uses_projection():
+    col = FakeCollection()
+    repo = mr.MongoTasks(collection=col)
+    t = _task("a", "u1", prio=Priority.HIGH)
+    t.due_date = datetime(2025, 1, 2)
+    repo.add(t)
+
+    fields = ("id", "title", "description", "status", "priority", "owner_id", "assignee_id", "due_date", "is_deleted")
+    [full] = repo.query(fields=fields)
+    assert col.last_projection == {"_id": 1, "title": 1, "description": 1, "status": 1, "priority": 1,
+                                   "owner_id": 1, "assignee_id": 1, "due_date": 1, "is_deleted": 1}
+    assert isinstance(full, PartialTask)
+    assert (full.id, full.status, full.priority, full.due_date, full.is_deleted) == (
+        "a", TaskStatus.NEW, Priority.HIGH, datetime(2025, 1, 2), False)
+
+    [part] = repo.query(fields=("id", "status"), limit=1)
+    assert col.last_projection == {"_id": 1, "status": 1}
+    assert part.status == TaskStatus.NEW
+    assert not hasattr(part, "title")
+    assert repr(part) == "PartialTask(id='a', status=<TaskStatus.NEW: 1>)"
+
+
+def test_ensure_indexes_users_and_tasks_idempotent():
+    users_col, tasks_col = FakeCollection(), FakeCollection()
+    users, tasks = mr.MongoUsers(collection=users_col), mr.MongoTasks(collection=tasks_col)
+    for _ in range(2):
+        users.ensure_indexes()
+        tasks.ensure_indexes()
+
+    assert users_col.indexes == [[("email", mr.ASCENDING), ("nickname", mr.ASCENDING)]]
+    assert users_col.index_options[0]["unique"] is True
+    keys = [[k for (k, _v) in spec] for spec in tasks_col.indexes]
+    assert keys == [
+        ["owner_id", "_id", "is_deleted", "status", "priority"],
+        ["assignee_id", "_id", "is_deleted", "status", "priority"],
+        ["is_deleted", "status", "priority"],
+    ]
+
+
+def test_mongo_users_duplicate_login_maps_to_value_error():
+    class DupCollection(FakeCollection):
+        def replace_one(self, flt, doc, upsert=False):
+            raise mr.DuplicateKeyError("E11000 duplicate key")
+
+    repo = mr.MongoUsers(collection=DupCollection())
+    u = User(id="u9", email="d@ex.com", role=Role.USER, status=Status.ACTIVE, first_name="Dup", last_name="Dup", nickname="dup")
+    import pytest
+    with pytest.raises(ValueError, match="already exists"):
+        repo.add(u)
+
+
+def test_client_options_from_env(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "50")
+    monkeypatch.setenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")
+    monkeypatch.setenv("MONGO_COMPRESSORS", "zstd,zlib")
+    monkeypatch.setenv("MONGO_MIN_POOL_SIZE", "")
+    monkeypatch.setattr(mr, "MongoClient", FakeMongoClient)
+
+    client = mr.create_client("mongodb://pool")
+    assert client.uri == "mongodb://pool"
+    assert client.options == {"maxPoolSize": 50, "serverSelectionTimeoutMS": 2000, "compressors": "zstd,zlib"}
+
+
+def test_client_options_reject_non_integer(monkeypatch):
+    import pytest
+    monkeypatch.setenv("MONGO_SOCKET_TIMEOUT_MS", "soon")
+    with pytest.raises(ValueError, match="MONGO_SOCKET_TIMEOUT_MS must be an integer"):
+        mr.client_options_from_env()
+
+
+def test_repositories_share_injected_client(monkeypatch):
+    monkeypatch.setenv("MONGO_DB", "shared")
+    client = FakeMongoClient("mongodb://x")
+    users, tasks, events = mr.MongoUsers(client=client), mr.MongoTasks(client=client), mr.MongoEvents(client=client)
+    assert users._client is tasks._client is events._client is client
+    assert set(client["shared"]._cols) == {"users", "tasks", "events"}
+
+
+def test_mongo_tasks_update_with_fields_sets_only_changed_fields():
+    col = FakeCollection()
+    repo = mr.MongoTasks(collection=col)
+    t = _task("t1", "u1")
+    t.description = "long " * 100
+    repo.add(t)
+
+    t.status = TaskStatus.IN_PROGRESS
+    t.title = "changed but not listed"
+    repo.update(t, fields=("status",))
+    assert [r._doc for r in col.last_requests] == [{"$set": {"status": "IN_PROGRESS"}}]
+    got = repo.get("t1")
+    assert got.status == TaskStatus.IN_PROGRESS and got.title == "T"
+
+
+def test_mongo_tasks_update_rejects_unknown_field():
+    import pytest
+    repo = mr.MongoTasks(collection=FakeCollection())
+    t = _task("t1", "u1")
+    repo.add(t)
+    for bad in ("nope", "_id"):
+        with pytest.raises(ValueError, match="Unknown task field"):
+            repo.update(t, fields=(bad,))
+
+
+def test_mongo_tasks_add_many_uses_single_bulk_write():
+    col = FakeCollection()
+    repo = mr.MongoTasks(collection=col)
+    repo.add_many([])
+    repo.add_many([_task("a", "u"), _task("b", "u")])
+    assert col.bulk_write_calls == 1
+    assert {t.id for t in repo.list()} == {"a", "b"}
+
+
+def test_mongo_events_add_many_reserves_seq_ranges_per_task():
+    col, tasks = FakeCollection(), _task_docs("existing", "fresh")
+    repo = mr.MongoEvents(collection=col, tasks=tasks)
+    t0 = datetime(2025, 1, 1, 12, 0, 0)
+    repo.add(TaskEvent("old", "existing", t0, EventType.CREATED, {}))
+
+    batch = [
+        TaskEvent("n1", "fresh", t0, EventType.CREATED, {}),
+        TaskEvent("x1", "existing", t0, EventType.UPDATED, {}),
+        TaskEvent("n2", "fresh", t0, EventType.ASSIGNED, {}),
+        TaskEvent("x2", "existing", t0, EventType.UPDATED, {}),
+    ]
+    repo.add_many([])
+    repo.add_many(batch)
+
+    assert [(e.id, e.seq) for e in batch] == [("n1", 1), ("x1", 2), ("n2", 2), ("x2", 3)]
+    assert col.insert_many_calls == 2  # add i add_many — po jednym insert_many
+    # jedno $inc licznika w dokumencie zadania na zadanie
+    assert tasks.find_one_and_update_calls == 3 and not hasattr(tasks, "bulk_write_calls")
+    assert tasks.docs["fresh"]["event_seq"] == 2 and tasks.docs["existing"]["event_seq"] == 3
+    assert [e.id for e in repo.list_for_task("existing")] == ["old", "x1", "x2"]
+
+
+class FakeSession:
+    def __init__(self):
+        self.transactions = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def with_transaction(self, callback):
+        self.transactions += 1
+        return callback(self)
+
+
+def _mongo_uow_repos():
+    # jak w create_app: wersja (i liczniki) w kolekcji zdarzeń
+    tasks = mr.MongoTasks(collection=FakeCollection())
+    events = mr.MongoEvents(collection=tasks._meta, tasks=tasks._collection)
+    return tasks, events
+
+
+def test_mongo_unit_of_work_batches_task_writes_and_events():
+    tasks, events = _mongo_uow_repos()
+    t1, t2 = _task("t1", "u"), _task("t2", "u")
+    t0 = datetime(2025, 1, 1, 12, 0, 0)
+    with mr.MongoUnitOfWork(tasks, events) as uow:
+        uow.add_task(t1)
+        uow.add_event(TaskEvent("e1", "t1", t0, EventType.CREATED, {}))
+    t1.status = TaskStatus.IN_PROGRESS
+    t2.title = "replaced"
+    with mr.MongoUnitOfWork(tasks, events) as uow:
+        uow.update_task(t1, fields=("status",))
+        uow.update_task(t2)
+        uow.add_event(TaskEvent("e2", "t1", t0, EventType.STATUS_CHANGED, {}))
+
+    # t1 ze zdarzeniem: find_one_and_update z $inc event_seq; t2 bez zdarzeń: w bulk_write
+    assert tasks._collection.bulk_write_calls == 2 and tasks._collection.find_one_and_update_calls == 1
+    assert events._collection.bulk_write_calls == 2 and not hasattr(events._collection, "insert_many_calls")
+    assert tasks.get("t1").status == TaskStatus.IN_PROGRESS
+    assert tasks.get("t2").title == "replaced"
+    assert [(e.id, e.seq) for e in events.list_for_task("t1")] == [("e1", 1), ("e2", 2)]
+    assert tasks._collection.docs["t1"]["event_seq"] == 2 and tasks.version() == 2
+
+
+def test_mongo_unit_of_work_events_only_skips_task_bulk_write():
+    tasks, events = _mongo_uow_repos()
+    tasks.add(_task("t1", "u"))
+    with mr.MongoUnitOfWork(tasks, events) as uow:
+        uow.add_event(TaskEvent("e1", "t1", datetime(2025, 1, 1), EventType.CREATED, {}))
+    assert tasks._collection.bulk_write_calls == 1 and tasks._collection.find_one_and_update_calls == 1
+    assert [(e.id, e.seq) for e in events.list_for_task("t1")] == [("e1", 1)]
+    assert tasks.version() == 1  # bez zapisu zadania wersja się nie zmienia
+
+
+def test_mongo_unit_of_work_uses_transaction_when_enabled():
+    tasks, events = _mongo_uow_repos()
+    session = FakeSession()
+    client = types.SimpleNamespace(start_session=lambda: session)
+    with mr.MongoUnitOfWork(tasks, events, client=client, transactions=True) as uow:
+        uow.add_task(_task("t1", "u"))
+    assert session.transactions == 1
+    assert tasks.get("t1") is not None
+
+
+# --------- Tests: Task stats ---------
+def test_mongo_task_stats_inc_get_and_replace():
+    col = FakeCollection()
+    stats = mr.MongoTaskStats(collection=col)
+    stats.ensure_indexes()
+    assert col.indexes == [[("scope", mr.ASCENDING)]] and col.index_options == [{"sparse": True}]
+
+    stats.apply({})
+    assert not hasattr(col, "bulk_write_calls")
+    stats.apply({("*", "total"): 2, ("u.1", "assignee:u.1"): 1})
+    stats.apply({("*", "total"): -1, ("u.1", "assignee:u.1"): -1})
+    assert col.bulk_write_calls == 2
+    assert stats.get("*") == {"total": 1}
+    assert stats.get("u.1") == {}  # licznik zerowy zostaje w kolekcji, ale nie jest zwracany
+    assert col.docs["*\x1ftotal"] == {"_id": "*\x1ftotal", "scope": "*", "name": "total", "task_id": "*\x1ftotal", "count": 1}
+
+    stats.replace({("*", "total"): 3, ("u2", "total"): 0})
+    assert stats.get("*") == {"total": 3} and list(col.docs) == ["*\x1ftotal"]
+    stats.replace({})
+    assert col.docs == {}
+
+
+def test_mongo_task_stats_default_ctor_uses_client(monkeypatch):
+    monkeypatch.setattr(mr, "MongoClient", FakeMongoClient)
+    stats = mr.MongoTaskStats(db_name="taskmgr")
+    stats.apply({("*", "total"): 1})
+    assert stats._client["taskmgr"]["events"].docs
+
+
+def _stats_tasks(**kw):
+    tasks = mr.MongoTasks(collection=FakeCollection(), **kw)
+    tasks.stats = mr.MongoTaskStats(collection=tasks._meta)  # obok wersji, jak w create_app
+    return tasks
+
+
+def _stats_events(tasks):
+    return mr.MongoEvents(collection=tasks._meta, tasks=tasks._collection)
+
+
+def test_mongo_tasks_move_stats_from_pre_image():
+    tasks = _stats_tasks()
+    events = _stats_events(tasks)
+    t = _task("t1", "u1")
+    tasks.add(t)
+    tasks.add_many([_task("t2", "u2")])
+    assert tasks.stats.get("*") == {"total": 2, "status:NEW": 2, "priority:NORMAL": 2, "unassigned": 2}
+
+    # dwie kopie sprzed zmiany: drugi zapis nie zmienia zapisanego stanu, więc nie przesuwa liczników
+    first, second = _task("t1", "u1"), _task("t1", "u1")
+    for copy in (first, second):
+        copy.status = TaskStatus.DONE
+        with mr.MongoUnitOfWork(tasks, events) as uow:
+            uow.update_task(copy, fields=("status",))
+    assert tasks.stats.get("u1") == {"total": 1, "status:DONE": 1, "priority:NORMAL": 1, "unassigned": 1}
+    assert tasks._collection.find_one_and_update_calls == 3  # add (upsert) i dwie kopie
+
+    t.is_deleted = True
+    tasks.update(t)  # pełny zapis: $set wszystkich pól z pre-image
+    tasks.update(_task("ghost", "u1"), fields=("status",))  # brak dokumentu — nic do policzenia
+    assert tasks.stats.get("u1") == {} and tasks.stats.get("*")["total"] == 1
+    assert tasks.version() == 6
+
+
+def test_mongo_stats_failure_after_write_marks_stale():
+    import pytest
+    tasks = _stats_tasks()
+
+    def down(*a, **kw):
+        raise mr.PyMongoError("meta down")
+
+    tasks._meta.bulk_write = down
+    t = _task("t1", "u1")
+    tasks.add(t)
+    assert tasks.get("t1") is not None and tasks.version() == 1  # wersja podbita osobno
+    assert tasks.stats.stale is True and tasks.stats.get("*") == {}
+
+    t.title = "no stats change"
+    with pytest.raises(mr.PyMongoError):
+        tasks.update(t, fields=("title",))  # bez delty to błąd samej wersji — żądanie się nie udaje,
+    assert tasks.version() == 2              # ale wersja i tak podbita osobno (zadanie zapisane)
+
+    del tasks._meta.bulk_write
+    tasks.rebuild_stats()
+    assert tasks.stats.stale is False and tasks.stats.get("*")["total"] == 1
+    assert tasks.version() == 2
+    assert tasks._meta.docs["\x1ftasks"] == {"_id": "\x1ftasks", "task_id": "\x1ftasks", "version": 2}
+
+
+def test_mongo_events_failure_in_meta_batch_bumps_version_and_raises():
+    import pytest
+    tasks = _stats_tasks()
+    events = _stats_events(tasks)
+    t = _task("t1", "u1")
+    tasks.add(t)
+
+    def events_down(*a, **kw):
+        raise mr.BulkWriteError({"nInserted": 0, "writeErrors": [{"index": 0}]})
+
+    tasks._meta.bulk_write = events_down
+    t.status = TaskStatus.DONE
+    with pytest.raises(mr.BulkWriteError):
+        with mr.MongoUnitOfWork(tasks, events) as uow:
+            uow.update_task(t, fields=("status",))
+            uow.add_event(TaskEvent("e1", "t1", datetime(2025, 1, 1), EventType.STATUS_CHANGED, {}))
+    # zadanie zapisane bez zdarzenia (brak transakcji): nowa wersja dla ETagu, liczniki do odbudowy
+    assert tasks.get("t1").status == TaskStatus.DONE and events.list_for_task("t1") == []
+    assert tasks.version() == 2 and tasks.stats.stale is True
+
+    def stats_down(*a, **kw):
+        raise mr.BulkWriteError({"nInserted": 1, "writeErrors": [{"index": 2}]})
+
+    tasks._meta.bulk_write = stats_down
+    t.status = TaskStatus.IN_PROGRESS
+    with mr.MongoUnitOfWork(tasks, events) as uow:  # zdarzenia zapisane — żądanie się udaje
+        uow.update_task(t, fields=("status",))
+        uow.add_event(TaskEvent("e2", "t1", datetime(2025, 1, 1), EventType.STATUS_CHANGED, {}))
+    assert tasks.version() == 3
+
+
+def test_mongo_stats_written_and_rebuilt_in_transaction():
+    tasks = _stats_tasks(transactions=True)
+    session = FakeSession()
+    tasks._collection.database.client = types.SimpleNamespace(start_session=lambda: session)
+    events = _stats_events(tasks)
+    with mr.MongoUnitOfWork(tasks, events, client=tasks._collection.database.client, transactions=True) as uow:
+        uow.add_task(_task("t1", "u1"))
+    tasks.stats.apply({("*", "total"): 3, ("u9", "total"): 1})
+    tasks.rebuild_stats()
+    assert session.transactions == 2
+    assert tasks.stats.get("*")["total"] == 1 and tasks.stats.get("u9") == {}
+    assert tasks.version() == 1  # odbudowa usuwa tylko liczniki, nie dokument wersji
+
+
+def test_mongo_meta_failure_in_transaction_propagates_without_retry():
+    import pytest
+    tasks = _stats_tasks(transactions=True)
+
+    def down(*a, **kw):
+        raise mr.PyMongoError("meta down")
+
+    tasks._meta.bulk_write = down
+    with pytest.raises(mr.PyMongoError):
+        tasks._commit([], [(_task("t1", "u1"), None)], session=FakeSession())
+    # transakcja wycofuje zadanie — bez osobnego podbicia wersji i bez stale
+    assert tasks.version() == 0 and tasks.stats.stale is False
+
+
+class RoundTrips:
+    # zapytania do serwera (wywołania metod kolekcji), bez wywołań wewnętrznych fake'a
+    METHODS = ("find", "find_one", "find_one_and_update", "find_one_and_replace", "update_one",
+               "replace_one", "insert_one", "insert_many", "bulk_write", "delete_many")
+
+    def __init__(self, **collections):
+        self.calls, self._depth = [], 0
+        for name, col in collections.items():
+            for method in self.METHODS:
+                setattr(col, method, self._wrap(f"{name}.{method}", getattr(col, method)))
+
+    def _wrap(self, name, fn):
+        def call(*a, **kw):
+            if not self._depth:
+                self.calls.append(name)
+            self._depth += 1
+            try:
+                return fn(*a, **kw)
+            finally:
+                self._depth -= 1
+        return call
+
+
+def test_mongo_unit_of_work_round_trips():
+    # zmiana statusu ze zdarzeniem: zapis zadania z rezerwacją seq, potem zdarzenia + wersja + liczniki
+    for with_stats in (False, True):
+        tasks = _stats_tasks() if with_stats else mr.MongoTasks(collection=FakeCollection())
+        events = _stats_events(tasks)
+        t = _task("t1", "u1")
+        tasks.add(t)
+        trips = RoundTrips(tasks=tasks._collection, events=events._collection)
+
+        t.status = TaskStatus.IN_PROGRESS
+        with mr.MongoUnitOfWork(tasks, events) as uow:
+            uow.update_task(t, fields=("status",))
+            uow.add_event(TaskEvent("e1", "t1", datetime(2025, 1, 1), EventType.STATUS_CHANGED, {}))
+
+        assert trips.calls == ["tasks.find_one_and_update", "events.bulk_write"]
+        assert [e.seq for e in events.list_for_task("t1")] == [1] and tasks.version() == 2
+    assert tasks.stats.get("u1")["status:IN_PROGRESS"] == 1
@@ -0,0 +1,281 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from src.repo.sqlite_repo import (
+    SqliteDatabase, SqliteUsers, SqliteTasks, SqliteEvents, SqliteTaskStats, SqliteUnitOfWork, _event_query_sql,
+)
+from src.domain.user import User, Role, Status
+from src.domain.task import Task, TaskStatus, Priority, PartialTask
+from src.domain.event import TaskEvent, EventType
+
+@pytest.fixture
+def db(tmp_path):
+    d = SqliteDatabase(str(tmp_path / "db" / "taskmgr.db"))
+    yield d
+    d.close()
+
+def _user(uid="u1", email="a@b.com", nickname="abc", status=Status.ACTIVE):
+    return User(id=uid, email=email, role=Role.USER, status=status, first_name="A", last_name="B", nickname=nickname)
+
+def _ev(eid, tid="t1", kind=EventType.UPDATED, meta=None):
+    return TaskEvent(eid, tid, datetime(2025, 1, 1, 12, 0, 0, 500), kind, meta or {})
+
+def _paged_ids(repo, **kw):
+    pages, after = [], None
+    while True:
+        page = repo.query(after=after, limit=2, **kw)
+        if not page:
+            return pages
+        pages.append([t.id for t in page])
+        after = page[-1].id
+
+# --- połączenia ---
+def test_opens_in_wal_mode_with_schema(db):
+    conn = db.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"tasks_owner", "tasks_assignee", "tasks_manager_filters", "events_task_timestamp"} <= names
+    assert db.connection() is conn
+
+def _in_threads(db, n, barrier=None):
+    seen = []
+    def work():
+        seen.append(db.connection())
+        seen[-1].execute("SELECT 1")
+        if barrier:
+            barrier.wait(5)
+    threads = [threading.Thread(target=work) for _ in range(n)]
+    for t in threads:
+        t.start()
+        if not barrier:
+            t.join()
+    for t in threads:
+        t.join()
+    return seen
+
+def test_connections_of_finished_threads_are_reused(db):
+    # wątek na żądanie (dev server): kolejne wątki dostają to samo połączenie i jego cache instrukcji
+    seen = _in_threads(db, 3)
+    assert len({id(c) for c in seen}) == 1 and db.connection() not in seen
+    assert db.connection_count() == 2
+
+def test_concurrent_threads_get_own_connections_and_idle_pool_is_bounded(tmp_path):
+    d = SqliteDatabase(str(tmp_path / "x.db"), pool_size=2)
+    seen = _in_threads(d, 4, threading.Barrier(4))
+    assert len({id(c) for c in seen}) == 4 and d.connection_count() == 5
+    _in_threads(d, 1)  # zwalnia 4 połączenia, w puli zostają 2 (jedno bierze ten wątek)
+    assert d.connection_count() == 3
+    d.close()
+    assert d.connection_count() == 0
+
+def test_close_and_reopen(tmp_path):
+    path = str(tmp_path / "x.db")
+    d = SqliteDatabase(path)
+    SqliteTasks(d).add(Task(id="t1", title="A", owner_id="u"))
+    d.close()
+    assert d.connection_count() == 0
+    d = SqliteDatabase(path)
+    assert SqliteTasks(d).get("t1").title == "A"
+    d.close()
+
+def test_rejects_unknown_synchronous_level(tmp_path):
+    with pytest.raises(ValueError, match="synchronous"):
+        SqliteDatabase(str(tmp_path / "x.db"), synchronous="sometimes")
+
+# --- users ---
+def test_users_add_get_find_and_update(db):
+    repo = SqliteUsers(db)
+    repo.add(_user())
+    assert repo.get("u1").email == "a@b.com"
+    assert repo.get("nope") is None
+    assert repo.find_by_email_and_nickname("a@b.com", "abc").id == "u1"
+    assert repo.find_by_email_and_nickname("a@b.com", "zzz") is None
+
+    repo.add(_user(email="new@b.com", status=Status.BLOCKED))
+    assert repo.find_by_email_and_nickname("a@b.com", "abc") is None
+    got = repo.find_by_email_and_nickname("new@b.com", "abc")
+    assert (got.status, got.role) == (Status.BLOCKED, Role.USER)
+
+def test_users_duplicate_login_rejected(db):
+    repo = SqliteUsers(db)
+    repo.add(_user())
+    with pytest.raises(ValueError, match="already exists"):
+        repo.add(_user(uid="u2"))
+    assert repo.get("u2") is None
+
+# --- tasks ---
+def test_tasks_add_get_update_list(db):
+    repo = SqliteTasks(db)
+    due = datetime(2025, 3, 1, 9, 30)
+    repo.add(Task(id="t1", title="A", owner_id="u1", due_date=due))
+    repo.add(Task(id="t2", title="B", owner_id="u2", priority=Priority.HIGH))
+    got = repo.get("t1")
+    assert (got.title, got.due_date, got.status, got.is_deleted) == ("A", due, TaskStatus.NEW, False)
+    assert repo.get("t2").priority is Priority.HIGH
+    assert repo.get("nope") is None
+
+    got.title, got.status = "A2", TaskStatus.IN_PROGRESS
+    repo.update(got)
+    got.description = "opis"
+    repo.update(got, fields=("description",))
+    again = repo.get("t1")
+    assert (again.title, again.status, again.description) == ("A2", TaskStatus.IN_PROGRESS, "opis")
+    assert [t.id for t in repo.list()] == ["t1", "t2"]
+
+def test_tasks_update_unknown_field_rolls_back(db):
+    repo = SqliteTasks(db)
+    t = Task(id="t1", title="A", owner_id="u1")
+    repo.add(t)
+    version = repo.version()
+    t.title = "B"
+    with pytest.raises(ValueError, match="Unknown task field: nope"):
+        repo.update(t, fields=("title", "nope"))
+    with pytest.raises(ValueError, match="Unknown task field: id"):
+        repo.update(t, fields=("id",))
+    assert repo.get("t1").title == "A" and repo.version() == version
+
+def test_tasks_query_filters_and_insertion_order(db):
+    repo = SqliteTasks(db)
+    repo.add_many([
+        Task(id="t3", title="A", owner_id="u1"),
+        Task(id="t1", title="B", owner_id="u2", assignee_id="u1", priority=Priority.HIGH),
+        Task(id="t2", title="C", owner_id="u2", status=TaskStatus.IN_PROGRESS),
+    ])
+    gone = repo.get("t3")
+    gone.is_deleted = True
+    repo.update(gone, fields=("is_deleted",))
+
+    assert [t.id for t in repo.query(visible_to="u1")] == ["t1"]
+    assert [t.id for t in repo.query(visible_to="u1", include_deleted=True)] == ["t3", "t1"]
+    assert [t.id for t in repo.query(priority=Priority.HIGH)] == ["t1"]
+    assert [t.id for t in repo.query(status=TaskStatus.IN_PROGRESS, visible_to="u2")] == ["t2"]
+    assert [t.id for t in repo.query(include_deleted=True)] == ["t3", "t1", "t2"]
+    assert repo.query(status=TaskStatus.DONE) == []
+    assert not isinstance(repo.iter_query(), list)
+
+def test_tasks_keyset_pages_by_id(db):
+    repo = SqliteTasks(db)
+    for tid in ("t5", "t1", "t4", "t2", "t3"):
+        repo.add(Task(id=tid, title="X", owner_id="u", assignee_id="a" if tid in ("t2", "t5") else None))
+    assert _paged_ids(repo) == [["t1", "t2"], ["t3", "t4"], ["t5"]]
+    assert _paged_ids(repo, visible_to="a") == [["t2", "t5"]]
+    assert [t.id for t in repo.query(after="t3")] == ["t4", "t5"]
+
+def test_tasks_query_projects_columns(db):
+    repo = SqliteTasks(db)
+    repo.add(Task(id="t1", title="A", owner_id="u1", status=TaskStatus.DONE, due_date=datetime(2025, 1, 2)))
+    (p,) = repo.query(fields=("id", "status", "due_date", "is_deleted", "title"))
+    assert isinstance(p, PartialTask)
+    assert (p.id, p.status, p.due_date, p.is_deleted, p.title) == ("t1", TaskStatus.DONE, datetime(2025, 1, 2), False, "A")
+    assert not hasattr(p, "owner_id")
+
+def test_tasks_version_grows_on_every_write_batch(db):
+    repo = SqliteTasks(db)
+    assert repo.version() == 0
+    t = Task(id="t1", title="A", owner_id="u1")
+    repo.add(t)
+    repo.add_many([Task(id="t2", title="B", owner_id="u1"), Task(id="t3", title="C", owner_id="u1")])
+    assert repo.version() == 2
+    repo.update(t, fields=("title",))
+    repo.add_many([])
+    assert repo.version() == 3
+
+# --- events ---
+def test_events_seq_after_seq_and_last_seq(db):
+    repo = SqliteEvents(db)
+    repo.add(_ev("e1", kind=EventType.CREATED))
+    repo.add_many([_ev("e2", meta={"from": None, "to": "u2"}), _ev("x1", "t2"), _ev("e3")])
+    repo.add_many([])
+    out = repo.list_for_task("t1")
+    assert [(e.id, e.seq) for e in out] == [("e1", 1), ("e2", 2), ("e3", 3)]
+    assert out[0].type is EventType.CREATED and out[0].timestamp == datetime(2025, 1, 1, 12, 0, 0, 500)
+    assert out[1].meta == {"from": None, "to": "u2"}
+    assert [e.id for e in repo.list_for_task("t1", after_seq=2)] == ["e3"]
+    assert [e.seq for e in repo.iter_for_task("t2")] == [1]
+    assert (repo.last_seq("t1"), repo.last_seq("t2"), repo.last_seq("nope")) == (3, 1, 0)
+
+def test_events_time_range_types_and_limit(db):
+    repo = SqliteEvents(db)
+    at = lambda s, us=0: datetime(2025, 1, 1, 12, 0, s, us)
+    kinds = [EventType.CREATED, EventType.UPDATED, EventType.ASSIGNED, EventType.UPDATED, EventType.UPDATED]
+    repo.add_many([TaskEvent(f"e{i}", "t1", at(i), kinds[i], {}) for i in range(5)] + [_ev("x1", "t2")])
+    ids = lambda *a, **kw: [e.id for e in repo.list_for_task("t1", *a, **kw)]
+    assert ids(after=at(1), before=at(4)) == ["e2", "e3"]
+    assert ids(after=at(0, 1)) == ["e1", "e2", "e3", "e4"]  # 12:00:00 vs 12:00:00.000001 — porównanie tekstowe
+    assert ids(types=[EventType.UPDATED]) == ["e1", "e3", "e4"]
+    assert ids(2, types=[EventType.UPDATED, EventType.ASSIGNED], limit=2) == ["e2", "e3"]
+    assert ids(limit=1) == ["e0"] and ids(types=[]) == []
+    assert [e.seq for e in repo.iter_for_task("t1", before=at(1))] == [1]
+    sql, params = _event_query_sql("t1", 0, at(1), None, [EventType.UPDATED], 10)
+    plan = db.connection().execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    assert "events_task_timestamp (task_id=? AND timestamp>?)" in plan[0][3]
+
+# --- unit of work ---
+def test_unit_of_work_commits_tasks_and_events_in_one_transaction(db):
+    tasks, events = SqliteTasks(db), SqliteEvents(db)
+    t = Task(id="t1", title="A", owner_id="u")
+    with SqliteUnitOfWork(tasks, events) as uow:
+        uow.add_task(t)
+        uow.add_event(_ev("e1", kind=EventType.CREATED))
+    t.status = TaskStatus.DONE
+    with SqliteUnitOfWork(tasks, events) as uow:
+        uow.update_task(t, fields=("status",))
+    assert tasks.get("t1").status is TaskStatus.DONE and tasks.version() == 2
+    assert [e.seq for e in events.list_for_task("t1")] == [1]
+
+def test_unit_of_work_failure_leaves_nothing_behind(db):
+    tasks, events = SqliteTasks(db), SqliteEvents(db)
+    events.add(_ev("e1"))
+    with pytest.raises(Exception):
+        with SqliteUnitOfWork(tasks, events) as uow:
+            uow.add_task(Task(id="t9", title="A", owner_id="u"))
+            uow.add_event(_ev("e1"))  # duplikat klucza głównego -> IntegrityError w połowie flush
+    assert tasks.get("t9") is None and tasks.version() == 0
+    assert [e.id for e in events.list_for_task("t1")] == ["e1"]
+
+def test_task_stats_increments_persist_and_replace(db, tmp_path):
+    stats = SqliteTaskStats(db)
+    stats.apply({})
+    stats.apply({("*", "total"): 2, ("u1", "total"): 1, ("u1", "status:NEW"): 1})
+    stats.apply({("*", "total"): 1, ("u1", "status:NEW"): -1})
+    assert stats.get("*") == {"total": 3}
+    assert stats.get("u1") == {"total": 1}
+    assert stats.get("nobody") == {}
+
+    reopened = SqliteDatabase(db.path)
+    assert SqliteTaskStats(reopened).get("*") == {"total": 3}
+    reopened.close()
+
+    stats.replace({("*", "total"): 1, ("u2", "total"): 0})
+    assert (stats.get("*"), stats.get("u1"), stats.get("u2")) == ({"total": 1}, {}, {})
+
+def test_task_stats_move_in_the_task_write_transaction(db):
+    tasks, events, stats = SqliteTasks(db), SqliteEvents(db), SqliteTaskStats(db)
+    tasks.add(Task(id="t0", title="Before stats", owner_id="u1"))
+    tasks.stats = stats
+    tasks.rebuild_stats()
+    assert stats.get("*") == {"total": 1, "status:NEW": 1, "priority:NORMAL": 1, "unassigned": 1}
+
+    # dwie kopie sprzed zmiany: delta z zapisanego stanu, więc liczy się tylko pierwszy zapis
+    first, second = tasks.get("t0"), tasks.get("t0")
+    for copy in (first, second):
+        copy.is_deleted = True
+        tasks.update(copy, fields=("is_deleted",))
+    assert stats.get("*") == {} and stats.get("u1") == {}
+
+    tasks.add_many([Task(id="t1", title="A", owner_id="u1", assignee_id="u2")])
+    assert stats.get("u2") == {"total": 1, "status:NEW": 1, "priority:NORMAL": 1, "assignee:u2": 1}
+
+    events.add(_ev("e1"))
+    with pytest.raises(Exception):
+        with SqliteUnitOfWork(tasks, events) as uow:
+            uow.add_task(Task(id="t2", title="B", owner_id="u1"))
+            uow.add_event(_ev("e1"))  # błąd w tej samej transakcji cofa też liczniki
+    assert stats.get("*")["total"] == 1
+
+    stats.apply({("*", "total"): 5})
+    stats.stale = True
+    tasks.rebuild_stats()
+    assert stats.get("*")["total"] == 1 and stats.stale is False
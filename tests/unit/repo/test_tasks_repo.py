@@ -1,4 +1,4 @@
-from src.repo.memory_repo import InMemoryTasks
+from src.repo.memory_repo import InMemoryTasks, InMemoryTaskStats
 from src.domain.task import Task, Priority, TaskStatus
 
 def test_add_get_update_list_ok():
@@ -31,4 +31,111 @@ def test_list_returns_copy_not_reference():
     repo.add(Task(id="t1", title="A", owner_id="u"))
     lst = repo.list()
     lst.clear()
-    assert len(repo.list()) == 1
\ No newline at end of file
+    assert len(repo.list()) == 1
+
+def test_query_uses_indexes_and_tracks_bucket_moves():
+    repo = InMemoryTasks()
+    t1 = Task(id="t1", title="A", owner_id="u1")
+    t2 = Task(id="t2", title="B", owner_id="u2", assignee_id="u1", priority=Priority.HIGH)
+    t3 = Task(id="t3", title="C", owner_id="u2")
+    for t in (t1, t2, t3):
+        repo.add(t)
+
+    assert [t.id for t in repo.query(visible_to="u1")] == ["t1", "t2"]
+    assert [t.id for t in repo.query(priority=Priority.HIGH)] == ["t2"]
+
+    # zmiana w miejscu + update przenosi zadanie między kubełkami
+    t3.assignee_id = "u1"
+    t3.status = TaskStatus.IN_PROGRESS
+    repo.update(t3)
+    assert [t.id for t in repo.query(visible_to="u1")] == ["t1", "t2", "t3"]
+    assert [t.id for t in repo.query(status=TaskStatus.IN_PROGRESS)] == ["t3"]
+    assert repo.query(status=TaskStatus.NEW, visible_to="u1", priority=Priority.LOW) == []
+
+    t1.is_deleted = True
+    repo.update(t1)
+    repo.update(t1)
+    assert [t.id for t in repo.query(visible_to="u1")] == ["t2", "t3"]
+    assert [t.id for t in repo.query(visible_to="u1", include_deleted=True)] == ["t1", "t2", "t3"]
+    assert repo.query(visible_to="ghost") == []
+
+
+def test_query_without_filters_returns_everything_in_insertion_order():
+    repo = InMemoryTasks()
+    for i in range(3):
+        repo.add(Task(id=f"t{i}", title="X", owner_id="u"))
+    assert [t.id for t in repo.query(include_deleted=True)] == ["t0", "t1", "t2"]
+
+
+def _paged_ids(repo, **kw):
+    pages, after = [], None
+    while True:
+        page = repo.query(after=after, limit=2, **kw)
+        if not page:
+            return pages
+        pages.append([t.id for t in page])
+        after = page[-1].id
+
+
+def test_query_keyset_pages_by_id_walking_sorted_order():
+    repo = InMemoryTasks()
+    for tid in ("t5", "t1", "t4", "t2", "t3"):
+        repo.add(Task(id=tid, title="X", owner_id="u"))
+    gone = repo.get("t4")
+    gone.is_deleted = True
+    repo.update(gone)
+
+    # duży zbiór kandydatów -> przejście po posortowanych id
+    assert _paged_ids(repo) == [["t1", "t2"], ["t3", "t5"]]
+    assert _paged_ids(repo, include_deleted=True) == [["t1", "t2"], ["t3", "t4"], ["t5"]]
+    assert [t.id for t in repo.query(after="t2")] == ["t3", "t5"]
+
+
+def test_query_keyset_pages_small_candidate_set():
+    repo = InMemoryTasks()
+    for i in range(40):
+        repo.add(Task(id=f"t{i:02d}", title="X", owner_id="bulk"))
+    for tid in ("t39x", "t05x", "t20x"):
+        repo.add(Task(id=tid, title="X", owner_id="u1"))
+
+    # mały zbiór kandydatów (u1) -> wybór najmniejszych id z kandydatów
+    assert _paged_ids(repo, visible_to="u1") == [["t05x", "t20x"], ["t39x"]]
+
+def test_version_grows_on_every_write_batch():
+    repo = InMemoryTasks()
+    assert repo.version() == 0
+    t = Task(id="t1", title="A", owner_id="u1")
+    repo.add(t)
+    repo.add_many([Task(id="t2", title="B", owner_id="u1"), Task(id="t3", title="C", owner_id="u1")])
+    assert repo.version() == 2
+    repo.update(t, fields=("title",))
+    repo.add_many([])
+    assert repo.version() == 3
+
+def test_task_stats_drop_zero_counters_and_replace():
+    stats = InMemoryTaskStats()
+    stats.apply({("*", "total"): 2, ("u1", "total"): 1})
+    stats.apply({("u1", "total"): -1, ("*", "total"): -1})
+    assert stats.get("*") == {"total": 1}
+    assert stats.get("u1") == {} and "u1" not in stats._scopes
+
+    stats.replace({("u2", "total"): 4, ("u3", "total"): 0})
+    assert (stats.get("*"), stats.get("u2"), stats.get("u3")) == ({}, {"total": 4}, {})
+
+def test_tasks_move_attached_stats_from_stored_state_and_rebuild():
+    repo, stats = InMemoryTasks(), InMemoryTaskStats()
+    repo.add(Task(id="t0", title="Before stats", owner_id="u1"))
+    repo.stats = stats
+    repo.rebuild_stats()
+    assert stats.get("*") == {"total": 1, "status:NEW": 1, "priority:NORMAL": 1, "unassigned": 1}
+
+    stale = repo.get("t0")
+    stale.status = TaskStatus.DONE
+    repo.update(stale, fields=("status",))
+    repo.update(stale, fields=("status",))  # ten sam zapis drugi raz: stan się nie zmienia
+    assert stats.get("u1")["status:DONE"] == 1 and "status:NEW" not in stats.get("u1")
+
+    stats.apply({("*", "total"): 7})
+    stats.stale = True
+    repo.rebuild_stats()
+    assert stats.get("*")["total"] == 1 and stats.stale is False
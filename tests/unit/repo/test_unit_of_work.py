@@ -0,0 +1,65 @@
+from datetime import datetime
+import pytest
+
+from src.repo.memory_repo import InMemoryTasks, InMemoryEvents, InMemoryUnitOfWork
+from src.repo.unit_of_work import RepositoryUnitOfWork
+from src.domain.task import Task, TaskStatus
+from src.domain.event import TaskEvent, EventType
+
+T0 = datetime(2025, 1, 1, 12, 0, 0)
+
+def _event(eid, tid, kind=EventType.UPDATED):
+    return TaskEvent(eid, tid, T0, kind, {})
+
+@pytest.mark.parametrize("uow_cls", [InMemoryUnitOfWork, RepositoryUnitOfWork])
+def test_commit_writes_tasks_and_events_together(uow_cls):
+    tasks, events = InMemoryTasks(), InMemoryEvents()
+    t = Task(id="t1", title="A", owner_id="u")
+    with uow_cls(tasks, events) as uow:
+        uow.add_task(t)
+        uow.add_event(_event("e1", "t1", EventType.CREATED))
+        assert tasks.get("t1") is None  # nic nie trafia do repo przed commitem
+
+    t.status = TaskStatus.IN_PROGRESS
+    with uow_cls(tasks, events) as uow:
+        uow.update_task(t, fields=("status",))
+        uow.add_event(_event("e2", "t1", EventType.STATUS_CHANGED))
+
+    assert [x.id for x in tasks.query(status=TaskStatus.IN_PROGRESS)] == ["t1"]
+    assert [(e.id, e.seq) for e in events.list_for_task("t1")] == [("e1", 1), ("e2", 2)]
+
+def test_exception_inside_block_discards_pending_writes():
+    tasks, events = InMemoryTasks(), InMemoryEvents()
+    with pytest.raises(RuntimeError):
+        with InMemoryUnitOfWork(tasks, events) as uow:
+            uow.add_task(Task(id="t1", title="A", owner_id="u"))
+            uow.add_event(_event("e1", "t1"))
+            raise RuntimeError("boom")
+    assert tasks.list() == [] and events.list_for_task("t1") == []
+    assert uow.new_tasks == [] and uow.new_events == []
+
+def test_empty_commit_does_not_touch_repositories(mocker):
+    tasks, events = InMemoryTasks(), InMemoryEvents()
+    uow = RepositoryUnitOfWork(tasks, events)
+    spy = mocker.spy(uow, "_flush")
+    uow.commit()
+    spy.assert_not_called()
+
+def test_on_commit_listeners_run_after_flush_and_not_on_rollback():
+    tasks, events = InMemoryTasks(), InMemoryEvents()
+    seen = []
+    t = Task(id="t1", title="A", owner_id="u")
+
+    uow = InMemoryUnitOfWork(tasks, events)
+    uow.on_commit(lambda ts, es: seen.append(([x.id for x in ts], [e.seq for e in es], tasks.get("t1") is not None)))
+    with uow:
+        uow.add_task(t)
+        uow.add_event(_event("e1", "t1", EventType.CREATED))
+    assert seen == [(["t1"], [1], True)]
+
+    with pytest.raises(RuntimeError):
+        with uow:
+            uow.update_task(t, fields=("title",))
+            raise RuntimeError("boom")
+    uow.commit()  # nic do zapisania -> listener nie jest wołany
+    assert len(seen) == 1
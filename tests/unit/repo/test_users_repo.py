@@ -23,4 +23,25 @@ def test_inmemory_users_find_by_email_and_nickname_hit():
 
 def test_inmemory_users_find_by_email_and_nickname_miss():
     repo = InMemoryUsers()
-    assert repo.find_by_email_and_nickname("x@x","nope") is None
\ No newline at end of file
+    assert repo.find_by_email_and_nickname("x@x","nope") is None
+
+def test_inmemory_users_login_index_follows_updates():
+    repo = InMemoryUsers()
+    u = User(id="u1", email="a@b.com", role=Role.USER, status=Status.ACTIVE,
+             first_name="A", last_name="B", nickname="abc")
+    repo.add(u)
+    moved = User(id="u1", email="new@b.com", role=Role.USER, status=Status.BLOCKED,
+                 first_name="A", last_name="B", nickname="abc")
+    repo.add(moved)
+    assert repo.find_by_email_and_nickname("a@b.com", "abc") is None
+    assert repo.find_by_email_and_nickname("new@b.com", "abc").status is Status.BLOCKED
+
+def test_inmemory_users_duplicate_login_rejected():
+    import pytest
+    repo = InMemoryUsers()
+    repo.add(User(id="u1", email="a@b.com", role=Role.USER, status=Status.ACTIVE,
+                  first_name="A", last_name="B", nickname="abc"))
+    with pytest.raises(ValueError, match="already exists"):
+        repo.add(User(id="u2", email="a@b.com", role=Role.USER, status=Status.ACTIVE,
+                      first_name="C", last_name="D", nickname="abc"))
+    assert repo.get("u2") is None
@@ -15,8 +15,8 @@ class FakeClock:
     def now(self) -> datetime:
         return self._fixed
 
-def make_service():
+def make_service(**kw):
     users, tasks, events = InMemoryUsers(), InMemoryTasks(), InMemoryEvents()
     idgen = FakeIdGen()
     clock = FakeClock(datetime(2025, 1, 1, 12, 0, 0))
-    return TaskService(users, tasks, events, idgen, clock), users, tasks, events
\ No newline at end of file
+    return TaskService(users, tasks, events, idgen, clock, **kw), users, tasks, events
\ No newline at end of file
@@ -0,0 +1,86 @@
+import json
+from datetime import datetime
+import pytest
+
+from .helper import make_service
+from src.serwis.change_feed import ChangeFeed
+from src.domain.user import User, Role, Status
+from src.domain.task import Task
+from src.domain.event import TaskEvent, EventType
+
+T0 = datetime(2025, 1, 1)
+
+def _user(uid, role=Role.USER):
+    return User(id=uid, email=f"{uid}@ex.com", role=role, status=Status.ACTIVE,
+                first_name="John", last_name="Doe", nickname=f"nick_{uid}")
+
+def _publish(feed, task, kind=EventType.UPDATED, meta=None, eid="e1"):
+    feed.publish([task], [TaskEvent(eid, task.id, T0, kind, meta or {})])
+
+class TestChangeFeed:
+    def test_fan_out_respects_visibility(self):
+        feed = ChangeFeed()
+        owner, stranger, manager = feed.subscribe("u1"), feed.subscribe("u2"), feed.subscribe("m", sees_all=True)
+        _publish(feed, Task(id="t1", title="A", owner_id="u1"))
+
+        change = owner.get(timeout=0)
+        assert change.task_id == "t1" and change.id == 1
+        body = json.loads(change.payload)
+        assert body["task"]["title"] == "A" and body["event"]["type"] == "UPDATED"
+        assert manager.get(timeout=0) is change
+        assert stranger.get(timeout=0) is None
+
+    def test_previous_assignee_is_notified_about_reassignment(self):
+        feed = ChangeFeed()
+        old = feed.subscribe("u2")
+        task = Task(id="t1", title="A", owner_id="u1", assignee_id="u3")
+        _publish(feed, task, EventType.ASSIGNED, {"from": "u2", "to": "u3", "by": "u1"})
+        assert old.get(timeout=0).audience == {"u1", "u2", "u3"}
+
+    def test_slow_subscriber_overflows_without_blocking_writer(self):
+        feed = ChangeFeed(max_queue=2)
+        slow, fast = feed.subscribe("u1"), feed.subscribe("u1")
+        task = Task(id="t1", title="A", owner_id="u1")
+        for i in range(3):
+            _publish(feed, task, eid=f"e{i}")
+            fast.get(timeout=0)
+        assert slow.overflowed and not fast.overflowed
+        _publish(feed, task, eid="e9")  # po przepełnieniu nic więcej nie trafia do kolejki
+        assert [slow.get(timeout=0).id for _ in range(2)] == [1, 2] and slow.get(timeout=0) is None
+
+        slow.close(); slow.close()
+        with fast:
+            assert feed.stats() == {"subscribers": 1, "published": 4, "overflows": 1}
+        assert feed.stats()["subscribers"] == 0
+
+    def test_publish_without_subscribers_or_task_is_noop(self):
+        feed = ChangeFeed()
+        _publish(feed, Task(id="t1", title="A", owner_id="u1"))
+        sub = feed.subscribe("u1")
+        feed.publish([], [TaskEvent("e1", "t1", T0, EventType.UPDATED, {})])
+        assert sub.get(timeout=0) is None and feed.published == 0
+
+    def test_max_queue_must_be_positive(self):
+        with pytest.raises(ValueError, match="max_queue must be >= 1"):
+            ChangeFeed(max_queue=0)
+
+class TestServiceFeed:
+    def test_committed_changes_reach_subscribers(self):
+        svc, users, *_ = make_service()
+        svc.feed = ChangeFeed()
+        users.add(_user("u1")); users.add(_user("u2")); users.add(_user("m", Role.MANAGER))
+        mine, theirs, boss = svc.subscribe_changes("u1"), svc.subscribe_changes("u2"), svc.subscribe_changes("m")
+        t = svc.create_task("u1", "T")
+        svc.change_status("u1", t.id, "IN_PROGRESS")
+        types = [json.loads(mine.get(timeout=0).payload)["event"]["type"] for _ in range(2)]
+        assert types == ["CREATED", "STATUS_CHANGED"]
+        assert theirs.get(timeout=0) is None
+        assert boss.sees_all and boss.get(timeout=0).task_id == t.id
+
+    def test_subscribe_requires_feed_and_known_actor(self):
+        svc, *_ = make_service()
+        with pytest.raises(ValueError, match="Change feed is not enabled"):
+            svc.subscribe_changes("u1")
+        svc.feed = ChangeFeed()
+        with pytest.raises(ValueError, match="Actor not found"):
+            svc.subscribe_changes("ghost")
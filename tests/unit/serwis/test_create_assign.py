@@ -105,4 +105,57 @@ class TestAssign:
         evs = [e for e in events.list_for_task(t.id) if e.type == EventType.ASSIGNED]
         assert len(evs) == 2
         assert evs[-1].meta["from"] == "a1"
-        assert evs[-1].meta["to"]   == "a2"
\ No newline at end of file
+        assert evs[-1].meta["to"]   == "a2"
+
+class TestBulkCreate:
+    def _svc(self):
+        svc, users, tasks, events = make_service()
+        users.add(User(id="u1", email="u1@ex.com", role=Role.USER, status=Status.ACTIVE, first_name="John", last_name="Doe", nickname="john_doe"))
+        return svc, tasks, events
+
+    def test_create_tasks_writes_valid_items_in_one_batch(self, mocker):
+        svc, tasks, events = self._svc()
+        tasks_spy = mocker.spy(tasks, "add_many")
+        events_spy = mocker.spy(events, "add_many")
+
+        out = svc.create_tasks("u1", [
+            {"title": "A"},
+            {"title": "", "priority": "HIGH"},
+            {"title": "B", "priority": "high", "description": "d"},
+            {"title": "C", "priority": "ULTRA"},
+            "not-a-dict",
+            {"title": 5},
+        ])
+
+        assert [type(r).__name__ for r in out] == ["Task", "ValueError", "Task", "ValueError", "ValueError", "ValueError"]
+        assert [str(out[i]) for i in (1, 3, 4, 5)] == [
+            "Invalid title", "Unknown priority", "Task spec must be an object", "Invalid task spec",
+        ]
+        assert tasks_spy.call_count == 1 and events_spy.call_count == 1
+        assert out[2].priority.name == "HIGH" and out[2].description == "d"
+        for t in (out[0], out[2]):
+            evs = events.list_for_task(t.id)
+            assert [(e.type, e.seq, e.meta) for e in evs] == [(EventType.CREATED, 1, {"owner": "u1"})]
+
+    def test_create_tasks_nothing_valid_writes_nothing(self, mocker):
+        svc, tasks, _ = self._svc()
+        spy = mocker.spy(tasks, "add_many")
+        out = svc.create_tasks("u1", [{"title": ""}])
+        assert isinstance(out[0], ValueError)
+        spy.assert_not_called()
+
+    @pytest.mark.parametrize("payload", [[], {"title": "A"}, None])
+    def test_create_tasks_rejects_non_list_or_empty(self, payload):
+        svc, *_ = self._svc()
+        with pytest.raises(ValueError, match="non-empty list"):
+            svc.create_tasks("u1", payload)
+
+    def test_create_tasks_rejects_oversized_batch(self):
+        svc, *_ = self._svc()
+        with pytest.raises(ValueError, match="max 1000"):
+            svc.create_tasks("u1", [{"title": "x"}] * 1001)
+
+    def test_create_tasks_requires_active_actor(self):
+        svc, *_ = self._svc()
+        with pytest.raises(PermissionError):
+            svc.create_tasks("ghost", [{"title": "A"}])
@@ -4,6 +4,7 @@ from src.repo.memory_repo import InMemoryUsers, InMemoryTasks, InMemoryEvents
 from src.utils.idgen import IdGenerator
 from src.utils.clock import Clock
 from src.domain.user import User, Role, Status
+from src.integrations.email_queue import EmailQueue, JobStatus
 
 @pytest.fixture
 def repos():
@@ -26,23 +27,64 @@ def owner_with_task(svc, owner, mocker):
     t = svc.create_task(actor_id=owner, title="T", description="", priority="NORMAL")
     return owner, t.id
 
-def test_email_history_calls_smtp(mocker, svc, owner_with_task):
-    actor_id, task_id = owner_with_task
-    mock_send = mocker.patch("src.integrations.emailer.SMTPClient.send", return_value=True)
-    ok = svc.email_task_history(actor_id, task_id, "a@b.c")
-    assert ok is True
-    mock_send.assert_called_once()
-    subject, body, to_ = mock_send.call_args[0]
-    assert "Task History" in subject and to_ == "a@b.c"
+@pytest.fixture
+def held_mailer(svc):
+    # długie okno digestu: zadanie czeka w kolejce, nic nie jest wysyłane
+    svc.mailer = EmailQueue(workers=1, digest_window=60)
+    yield svc.mailer
+    svc.mailer.close()
 
-def test_email_history_missing_email_raises(svc, owner_with_task):
+def test_email_history_missing_email_raises(svc, owner_with_task, held_mailer):
     actor_id, task_id = owner_with_task
     with pytest.raises(ValueError, match="Missing email"):
-        svc.email_task_history(actor_id, task_id, "")
+        svc.queue_task_history_email(actor_id, task_id, "")
 
-def test_email_history_raises_notfound_when_task_missing(mocker, svc, owner):
+def test_email_history_raises_notfound_when_task_missing(mocker, svc, owner, held_mailer):
     mocker.patch.object(svc, "get_events", return_value=[])
     mocker.patch.object(svc.tasks, "get", return_value=None)
     from werkzeug.exceptions import NotFound
     with pytest.raises(NotFound):
-        svc.email_task_history(owner, "no-such-id", "a@b.c")
\ No newline at end of file
+        svc.queue_task_history_email(owner, "no-such-id", "a@b.c")
+
+def test_email_history_reads_each_entity_once_within_scope(repos, owner):
+    from src.repo.identity_map import ScopedUsers, ScopedTasks, ScopedEvents
+    from src.repo.request_scope import request_scope
+    users, tasks, events = repos
+    svc = TaskService(ScopedUsers(users), ScopedTasks(tasks), ScopedEvents(events), IdGenerator(), Clock(),
+                      mailer=EmailQueue(workers=1, digest_window=60))
+    t = svc.create_task(actor_id=owner, title="T")
+    with request_scope() as scope:
+        svc.queue_task_history_email(owner, t.id, "a@b.c")
+    svc.mailer.close()
+    assert scope.calls["tasks.get"] == 1
+    assert scope.calls["users.get"] == 1
+    assert scope.calls["events.list_for_task"] == 1
+
+def test_queue_email_history_submits_job_for_actor(mocker, svc, owner_with_task):
+    actor_id, task_id = owner_with_task
+    send = mocker.patch("src.integrations.emailer.SMTPClient.send", return_value=True)
+    svc.mailer = EmailQueue()
+    job_id = svc.queue_task_history_email(actor_id, task_id, "a@b.c")
+    assert svc.mailer.wait_idle(5)
+    svc.mailer.close()
+    job = svc.get_email_job(actor_id, job_id)
+    assert (job.status, job.email, job.items) == (JobStatus.SENT, "a@b.c", {task_id: ("T", ["CREATED"])})
+    send.assert_called_once()
+    subject, body, to_ = send.call_args[0]
+    assert "Task History" in subject and to_ == "a@b.c"
+
+def test_email_queue_not_configured(svc, owner_with_task):
+    actor_id, task_id = owner_with_task
+    from werkzeug.exceptions import NotFound
+    with pytest.raises(RuntimeError, match="not configured"):
+        svc.queue_task_history_email(actor_id, task_id, "a@b.c")
+    with pytest.raises(NotFound):
+        svc.get_email_job(actor_id, "j1")
+
+def test_email_job_of_another_actor_is_not_found(svc, owner_with_task, held_mailer):
+    actor_id, task_id = owner_with_task
+    from werkzeug.exceptions import NotFound
+    job_id = svc.queue_task_history_email(actor_id, task_id, "a@b.c")
+    assert svc.get_email_job(actor_id, job_id).status is JobStatus.QUEUED
+    with pytest.raises(NotFound):
+        svc.get_email_job("someone-else", job_id)
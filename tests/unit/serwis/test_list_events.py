@@ -1,7 +1,9 @@
 import pytest
+from datetime import datetime
 from .helper import make_service
 from src.domain.user import User, Role, Status
 from src.domain.event import EventType
+from src.utils.cursor import encode_cursor
 
 class TestList:
     def test_list_tasks_user_sees_only_own_and_assigned(self):
@@ -91,4 +93,174 @@ class TestEvents:
         assert str(e1.value) == "Actor or task not found"
         with pytest.raises(ValueError) as e2:
             svc.get_events("u", "nope")
-        assert str(e2.value) == "Actor or task not found"
\ No newline at end of file
+        assert str(e2.value) == "Actor or task not found"
+
+class TestEventsAfterSeq:
+    def test_get_events_after_seq_returns_incremental_history(self):
+        svc, users, *_ = make_service()
+        users.add(User(id="u", email="u@ex.com", role=Role.USER, status=Status.ACTIVE, first_name="User", last_name="Example", nickname="user_e"))
+        t = svc.create_task("u", "T")
+        svc.change_status("u", t.id, "IN_PROGRESS")
+        svc.update_task("u", t.id, title="T2")
+        full = svc.get_events("u", t.id)
+        assert [e.seq for e in full] == [1, 2, 3]
+        newer = svc.get_events("u", t.id, after_seq=full[0].seq)
+        assert [e.type for e in newer] == [EventType.STATUS_CHANGED, EventType.UPDATED]
+
+    @pytest.mark.parametrize("after_seq", [-1, "2"])
+    def test_get_events_invalid_after_seq_raises(self, after_seq):
+        svc, *_ = make_service()
+        with pytest.raises(ValueError, match="after_seq must be >= 0"):
+            svc.get_events("u", "t", after_seq=after_seq)
+
+class TestEventsFilters:
+    def _service_with_history(self):
+        svc, users, *_ = make_service()
+        users.add(User(id="u", email="u@ex.com", role=Role.USER, status=Status.ACTIVE, first_name="User", last_name="Example", nickname="user_e"))
+        t = svc.create_task("u", "T")
+        svc.change_status("u", t.id, "IN_PROGRESS")
+        svc.update_task("u", t.id, title="T2")
+        svc.update_task("u", t.id, title="T3")
+        return svc, t
+
+    def test_types_limit_and_time_range(self):
+        svc, t = self._service_with_history()
+        updated = svc.get_events("u", t.id, types=["updated"], limit=1)
+        assert [(e.type, e.seq) for e in updated] == [(EventType.UPDATED, 3)]
+        assert [e.seq for e in svc.iter_events("u", t.id, 3, types=["UPDATED", "CREATED"])] == [4]
+        # FakeClock: wszystkie zdarzenia o 12:00:00
+        assert svc.get_events("u", t.id, before=datetime(2025, 1, 1, 12, 0, 0)) == []
+        assert len(svc.get_events("u", t.id, after=datetime(2025, 1, 1, 11, 0), before=datetime(2025, 1, 1, 13, 0))) == 4
+
+    @pytest.mark.parametrize("filters, message", [
+        ({"limit": 0}, "limit must be between"),
+        ({"limit": 501}, "limit must be between"),
+        ({"limit": "5"}, "limit must be between"),
+        ({"types": ["UPDATED", "NOPE"]}, "Unknown event type filter: NOPE"),
+    ])
+    def test_invalid_filters_raise_before_reading(self, filters, message):
+        svc, t = self._service_with_history()
+        with pytest.raises(ValueError, match=message):
+            svc.iter_events("u", t.id, **filters)
+
+    def test_validate_event_filters_is_public_and_repository_free(self, mocker):
+        svc, _ = self._service_with_history()
+        spy = mocker.spy(svc.events, "iter_for_task")
+        with pytest.raises(ValueError, match="Unknown event type filter: NOPE"):
+            svc.validate_event_filters(types=["NOPE"])
+        assert svc.validate_event_filters(types=["created"], limit=5) == {
+            "after": None, "before": None, "types": [EventType.CREATED], "limit": 5,
+        }
+        assert spy.call_count == 0
+
+class TestListPaging:
+    def _svc_with_tasks(self, n):
+        svc, users, *_ = make_service()
+        users.add(User(id="u", email="u@ex.com", role=Role.USER, status=Status.ACTIVE, first_name="User", last_name="Example", nickname="user_e"))
+        ids = [svc.create_task("u", f"T{i}").id for i in range(n)]
+        return svc, ids
+
+    def test_pages_follow_cursor_until_exhausted(self):
+        svc, ids = self._svc_with_tasks(5)
+        seen, cursor = [], None
+        while True:
+            items, cursor = svc.list_tasks_page("u", limit=2, cursor=cursor)
+            seen.extend(t.id for t in items)
+            if cursor is None:
+                break
+        assert seen == sorted(ids)
+
+    def test_exact_fit_page_has_no_next_cursor(self):
+        svc, ids = self._svc_with_tasks(2)
+        items, cursor = svc.list_tasks_page("u", limit=2)
+        assert len(items) == 2 and cursor is None
+
+    @pytest.mark.parametrize("limit", [0, 501, "10"])
+    def test_invalid_limit_raises(self, limit):
+        svc, _ = self._svc_with_tasks(1)
+        with pytest.raises(ValueError, match="limit must be between 1 and 500"):
+            svc.list_tasks_page("u", limit=limit)
+
+    def test_invalid_cursor_raises(self):
+        svc, _ = self._svc_with_tasks(1)
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            svc.list_tasks_page("u", cursor="%%%")
+
+    @pytest.mark.parametrize("args, message", [
+        ({"status": "nope"}, "Unknown status filter"),
+        ({"priority": "nope"}, "Unknown priority filter"),
+        ({"fields": ["password"]}, "Unknown task field: password"),
+        ({"limit": 0}, "limit must be between 1 and 500"),
+        ({"cursor": "%%%"}, "Invalid cursor"),
+    ])
+    def test_validate_list_args_without_reading(self, mocker, args, message):
+        svc, _ = self._svc_with_tasks(1)
+        spy = mocker.spy(svc.users, "get")
+        with pytest.raises(ValueError, match=message):
+            svc.validate_list_args(**args)
+        assert spy.call_count == 0
+
+    def test_validate_list_args_accepts_valid_args(self):
+        svc, _ = self._svc_with_tasks(1)
+        svc.validate_list_args(status="new", priority="high", fields=["title"], limit=10, cursor=encode_cursor("t1"))
+        svc.validate_list_args()
+
+class TestListFields:
+    def _svc(self):
+        svc, users, *_ = make_service()
+        users.add(User(id="u", email="u@ex.com", role=Role.USER, status=Status.ACTIVE, first_name="User", last_name="Example", nickname="user_e"))
+        svc.create_task("u", "T")
+        return svc
+
+    def test_fields_are_validated_and_id_always_included(self, mocker):
+        svc = self._svc()
+        spy = mocker.spy(svc.tasks, "query")
+        svc.list_tasks("u", fields=["status", "title"])
+        assert spy.call_args.kwargs["fields"] == ("id", "title", "status")
+        svc.list_tasks_page("u", limit=5, fields=["priority"])
+        assert spy.call_args.kwargs["fields"] == ("id", "priority")
+
+    def test_unknown_field_raises(self):
+        svc = self._svc()
+        with pytest.raises(ValueError, match="Unknown task field: secret"):
+            svc.list_tasks("u", fields=["title", "secret"])
+
+
+class TestStreamingIterators:
+    def _svc(self):
+        svc, users, *_ = make_service()
+        users.add(User(id="u", email="u@ex.com", role=Role.USER, status=Status.ACTIVE, first_name="User", last_name="Example", nickname="user_e"))
+        users.add(User(id="x", email="x@ex.com", role=Role.USER, status=Status.ACTIVE, first_name="Other", last_name="Example", nickname="other_e"))
+        return svc
+
+    def test_iterators_yield_same_results_as_lists(self):
+        svc = self._svc()
+        t = svc.create_task("u", "T")
+        svc.change_status("u", t.id, "IN_PROGRESS")
+        assert [x.id for x in svc.iter_tasks("u", status="in_progress")] == [x.id for x in svc.list_tasks("u", status="in_progress")]
+        assert [e.seq for e in svc.iter_events("u", t.id, after_seq=1)] == [2]
+
+    def test_iterators_validate_before_iteration(self):
+        svc = self._svc()
+        t = svc.create_task("u", "T")
+        # błędy muszą paść przy wywołaniu, a nie dopiero przy pierwszym next()
+        with pytest.raises(ValueError, match="Unknown status filter"):
+            svc.iter_tasks("u", status="nope")
+        with pytest.raises(PermissionError):
+            svc.iter_events("x", t.id)
+
+class TestVersions:
+    def test_versions_follow_writes_and_check_access(self):
+        svc, users, *_ = make_service()
+        users.add(User(id="u", email="u@ex.com", role=Role.USER, status=Status.ACTIVE, first_name="User", last_name="Example", nickname="user_e"))
+        users.add(User(id="x", email="x@ex.com", role=Role.USER, status=Status.ACTIVE, first_name="Other", last_name="Example", nickname="other_e"))
+        v0 = svc.tasks_version("u")
+        t = svc.create_task("u", "T")
+        assert svc.tasks_version("u") > v0
+        assert svc.events_version("u", t.id) == 1
+        svc.change_status("u", t.id, "IN_PROGRESS")
+        assert svc.events_version("u", t.id) == 2
+        with pytest.raises(ValueError, match="Actor not found"):
+            svc.tasks_version("ghost")
+        with pytest.raises(PermissionError):
+            svc.events_version("x", t.id)
@@ -0,0 +1,103 @@
+import pytest
+from .helper import make_service
+from src.domain.user import User, Role, Status
+from src.repo.memory_repo import InMemoryTaskStats
+from src.repo.unit_of_work import RepositoryUnitOfWork
+from src.repo.task_stats import ALL_TASKS, count_stats, stats_delta, stats_key, stats_to_dict
+
+def _users(users):
+    for uid, role in (("a", Role.USER), ("b", Role.USER), ("c", Role.USER), ("m", Role.MANAGER)):
+        users.add(User(id=uid, email=f"{uid}@ex.com", role=role, status=Status.ACTIVE,
+                       first_name="First", last_name="Last", nickname=f"nick_{uid}"))
+
+@pytest.fixture
+def env():
+    stats = InMemoryTaskStats()
+    svc, users, tasks, _ = make_service(stats=stats)
+    tasks.stats = stats  # liczniki przesuwa repozytorium przy zapisie
+    _users(users)
+    return svc, tasks, stats
+
+def _rebuilt(tasks, scope):
+    # liczniki policzone od zera — wzorzec dla wersji przyrostowej
+    return {name: n for (s, name), n in count_stats(map(stats_key, tasks.list())).items() if s == scope}
+
+class TestIncrementalStats:
+    def test_counters_follow_every_kind_of_change(self, env):
+        svc, tasks, _ = env
+        t1 = svc.create_task("a", "A1", priority="HIGH")
+        t2, t3 = svc.create_tasks("b", [{"title": "B1"}, {"title": "B2", "priority": "LOW"}])
+        svc.assign_task("a", t1.id, "b")
+        svc.assign_task("b", t2.id, "c")
+        svc.assign_task("b", t2.id, "a")  # c traci widoczność
+        svc.change_status("b", t1.id, "IN_PROGRESS")
+        svc.update_task("b", t3.id, priority="HIGH")
+        svc.update_task("b", t3.id, title="B2 renamed")  # bez wpływu na liczniki
+        svc.delete_task("b", t3.id)
+
+        for scope in (ALL_TASKS, "a", "b", "c"):
+            assert svc.stats.get(scope) == _rebuilt(tasks, scope), scope
+
+        assert stats_to_dict(svc.get_task_stats("m")) == {
+            "total": 2,
+            "by_status": {"NEW": 1, "IN_PROGRESS": 1, "DONE": 0, "CANCELED": 0},
+            "by_priority": {"LOW": 0, "NORMAL": 1, "HIGH": 1},
+            "by_assignee": {"a": 1, "b": 1},
+            "unassigned": 0,
+            "stale": False,
+        }
+        assert stats_to_dict(svc.get_task_stats("c"))["total"] == 0
+
+    def test_user_sees_owned_and_assigned_task_once(self, env):
+        svc, *_ = env
+        t = svc.create_task("a", "Own")
+        svc.assign_task("a", t.id, "a")
+        svc.create_task("b", "Other")
+        assert svc.get_task_stats("a") == {"total": 1, "status:NEW": 1, "priority:NORMAL": 1, "assignee:a": 1}
+        assert svc.get_task_stats("m")["total"] == 2
+
+    def test_failed_commit_does_not_count(self, env, mocker):
+        svc, tasks, stats = env
+        mocker.patch.object(RepositoryUnitOfWork, "_flush", side_effect=RuntimeError("db down"))
+        with pytest.raises(RuntimeError):
+            svc.create_task("a", "Lost")
+        assert stats.get(ALL_TASKS) == {}
+
+    def test_writes_from_a_stale_copy_are_counted_once(self, env):
+        # dwa równoległe żądania z tą samą kopią zadania — liczy się to, co było zapisane
+        svc, tasks, stats = env
+        t = svc.create_task("a", "T")
+        first, second = tasks.get(t.id), tasks.get(t.id)
+        svc.delete_task("a", t.id)
+        for copy in (first, second):
+            copy.is_deleted = True
+            tasks.update(copy, fields=("is_deleted",))
+        assert stats.get(ALL_TASKS) == {} == _rebuilt(tasks, ALL_TASKS)
+
+    def test_rebuild_repairs_drift_and_requires_manager(self, env):
+        svc, tasks, stats = env
+        svc.create_task("a", "A1")
+        stats.apply({(ALL_TASKS, "total"): 5, ("a", "status:DONE"): 1})
+        with pytest.raises(PermissionError):
+            svc.rebuild_task_stats("a")
+        assert svc.rebuild_task_stats("m") == _rebuilt(tasks, ALL_TASKS)
+        assert svc.get_task_stats("a") == _rebuilt(tasks, "a")
+
+    def test_errors(self, env):
+        svc, *_ = env
+        with pytest.raises(ValueError, match="Actor not found"):
+            svc.get_task_stats("ghost")
+        with pytest.raises(ValueError, match="Actor not found"):
+            svc.rebuild_task_stats("ghost")
+        plain, *_ = make_service()
+        for call in (plain.get_task_stats, plain.rebuild_task_stats):
+            with pytest.raises(ValueError, match="not enabled"):
+                call("m")
+
+def test_stats_delta_is_empty_when_key_unchanged(env):
+    svc, *_ = env
+    t = svc.create_task("a", "T")
+    assert stats_delta([(stats_key(t), stats_key(t))]) == {}
+    moved = stats_delta([(("a", None, "NEW", "NORMAL"), ("a", "b", "NEW", "NORMAL"))])
+    assert moved[("b", "total")] == 1 and ("a", "total") not in moved
+    assert moved[(ALL_TASKS, "unassigned")] == -1 and moved[(ALL_TASKS, "assignee:b")] == 1
@@ -153,4 +153,21 @@ class TestDelete:
         users.add(o)
         with pytest.raises(ValueError) as e:
             svc.delete_task("ghost", "nope")
-        assert str(e.value) == "Actor or task not found"
\ No newline at end of file
+        assert str(e.value) == "Actor or task not found"
+
+class TestChangeSets:
+    def test_mutations_pass_only_changed_fields_to_repository(self, mocker):
+        svc, users, tasks, _ = make_service()
+        users.add(User(id="m1", email="m@ex.com", role=Role.MANAGER, status=Status.ACTIVE, first_name="Manager", last_name="One", nickname="manager_m"))
+        users.add(User(id="d1", email="d@ex.com", role=Role.USER, status=Status.ACTIVE, first_name="Dev", last_name="One", nickname="dev_d"))
+        t = svc.create_task("m1", "T", "desc")
+        spy = mocker.spy(tasks, "update")
+
+        svc.assign_task("m1", t.id, "d1")
+        svc.change_status("d1", t.id, "IN_PROGRESS")
+        svc.update_task("m1", t.id, title="T2", description="desc")
+        svc.delete_task("m1", t.id)
+
+        assert [c.kwargs["fields"] for c in spy.call_args_list] == [
+            ("assignee_id",), ("status",), ("title",), ("is_deleted",),
+        ]
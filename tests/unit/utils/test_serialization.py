@@ -0,0 +1,45 @@
+import importlib
+import json
+import sys
+from datetime import datetime
+
+from src.domain.task import Task, TaskStatus, Priority
+from src.domain.event import TaskEvent, EventType
+import src.utils.serialization as ser
+
+def _task():
+    return Task(id="t1", title="Zażółć", description="d", status=TaskStatus.DONE, priority=Priority.HIGH,
+                owner_id="u1", assignee_id="u2", due_date=datetime(2025, 1, 2, 3, 4, 5))
+
+def test_task_to_dict_all_fields():
+    assert ser.task_to_dict(_task()) == {
+        "id": "t1", "title": "Zażółć", "description": "d", "status": "DONE", "priority": "HIGH",
+        "owner_id": "u1", "assignee_id": "u2", "due_date": "2025-01-02T03:04:05", "is_deleted": False,
+    }
+
+def test_task_serializer_projection_and_full_fast_path():
+    assert ser.task_serializer() is ser.task_to_dict
+    dump = ser.task_serializer(("id", "status", "due_date", "is_deleted"))
+    assert dump(_task()) == {"id": "t1", "status": "DONE", "due_date": "2025-01-02T03:04:05", "is_deleted": False}
+    no_due = Task(id="t2", title="T", owner_id="u1")
+    assert ser.task_serializer(("id", "priority", "due_date"))(no_due) == {"id": "t2", "priority": "NORMAL", "due_date": None}
+
+def test_event_to_dict():
+    e = TaskEvent("e1", "t1", datetime(2025, 1, 1), EventType.STATUS_CHANGED, {"to": "DONE"}, seq=3)
+    assert ser.event_to_dict(e) == {"id": "e1", "task_id": "t1", "timestamp": "2025-01-01T00:00:00",
+                                    "type": "STATUS_CHANGED", "meta": {"to": "DONE"}, "seq": 3}
+
+def test_dumps_returns_compact_utf8_bytes_for_both_backends(monkeypatch):
+    payload = {"a": [1, None, True], "t": "ł"}
+    out = ser.dumps(payload)
+    assert isinstance(out, bytes) and json.loads(out) == payload and ser.loads(out) == payload
+
+    monkeypatch.setitem(sys.modules, "orjson", None)  # import orjson -> ImportError
+    fallback = importlib.reload(ser)
+    try:
+        assert fallback.JSON_BACKEND == "json"
+        assert fallback.dumps(payload) == '{"a":[1,null,true],"t":"ł"}'.encode("utf-8")
+        assert fallback.loads('{"x": 1}') == {"x": 1}
+    finally:
+        monkeypatch.undo()
+        importlib.reload(ser)
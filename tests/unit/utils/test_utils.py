@@ -7,4 +7,14 @@ def test_idgen_returns_distinct_ids():
 
 def test_clock_now_returns_datetime():
     c = Clock()
-    assert hasattr(c.now(), "year")
\ No newline at end of file
+    assert hasattr(c.now(), "year")
+
+def test_cursor_roundtrip_and_invalid():
+    import pytest
+    from src.utils.cursor import encode_cursor, decode_cursor
+    c = encode_cursor("id-42")
+    assert "=" not in c
+    assert decode_cursor(c) == "id-42"
+    for bad in ("%%%", "a", "ą", ""):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor(bad)
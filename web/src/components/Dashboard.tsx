@@ -7,6 +7,7 @@ import {
   changeStatus,
   assignTask,
   updateTask,
+  subscribeTaskChanges,
 } from "../lib/api";
 import type { Task, TaskStatus, Priority } from "../lib/types";
 import { Stepper, StepperNullable } from "./Stepper";
@@ -64,6 +65,34 @@ export default function Dashboard() {
     load(); /* eslint-disable-next-line */
   }, [priority]);
 
+  // zmiany innych użytkowników na żywo; po "resync" pełne przeładowanie i nowa subskrypcja
+  const [streamGen, setStreamGen] = useState(0);
+  useEffect(() => {
+    return subscribeTaskChanges(
+      aid,
+      ({ task, event }) => {
+        // poprzedni assignee dostaje powiadomienie, ale widoczność zależy od roli —
+        // tu decyduje serwer (lista i tak jest tania dzięki ETag)
+        if (event.type === "ASSIGNED" && event.meta.from === aid) {
+          load();
+          return;
+        }
+        setItems((prev) => {
+          const keep =
+            !task.is_deleted && (!priority || task.priority === priority);
+          if (!keep) return prev.filter((t) => t.id !== task.id);
+          return prev.some((t) => t.id === task.id)
+            ? prev.map((t) => (t.id === task.id ? task : t))
+            : [...prev, task];
+        });
+      },
+      () => {
+        load();
+        setStreamGen((g) => g + 1);
+      },
+    ); /* eslint-disable-next-line */
+  }, [aid, priority, streamGen]);
+
   const groups = useMemo(() => {
     const m: Record<TaskStatus, Task[]> = {
       NEW: [],
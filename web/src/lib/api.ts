@@ -1,4 +1,4 @@
-import type { Task, TaskEvent, Priority, TaskStatus } from "./types";
+import type { Task, TaskChange, TaskEvent, Priority, TaskStatus } from "./types";
 
 const json = (r: Response) => r.json();
 
@@ -44,6 +44,26 @@ export async function createUser(p: {
   return r.json();
 }
 
+// SSE /api/stream: zmiany widocznych zadań wypychane przez serwer (zamiast odpytywania).
+// "resync" = serwer zgubił część zmian dla tego klienta — trzeba pobrać listę od nowa.
+export function subscribeTaskChanges(
+  actorId: string,
+  onChange: (change: TaskChange) => void,
+  onResync: () => void,
+): () => void {
+  const es = new EventSource(
+    `/api/stream?actor_id=${encodeURIComponent(actorId)}`,
+  );
+  es.addEventListener("task", (e) =>
+    onChange(JSON.parse((e as MessageEvent).data)),
+  );
+  es.addEventListener("resync", () => {
+    es.close();
+    onResync();
+  });
+  return () => es.close();
+}
+
 export async function listTasks(
   actorId: string,
   q?: { status?: TaskStatus; priority?: Priority },
@@ -21,4 +21,10 @@ export interface TaskEvent {
   timestamp: string;
   type: "CREATED" | "ASSIGNED" | "STATUS_CHANGED" | "UPDATED" | "DELETED";
   meta: Record<string, unknown>;
+  seq: number;
+}
+
+export interface TaskChange {
+  task: Task;
+  event: TaskEvent;
 }